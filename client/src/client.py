@@ -3,12 +3,13 @@ import logging
 import os
 import socket
 import time
+from concurrent.futures import ThreadPoolExecutor
 from io import BufferedReader, BufferedWriter
 from pathlib import Path
 from types import FrameType
 from typing import List, Optional, Tuple, Union
 
-from common.protocol.client import ClientProtocol
+from common.protocol.client import ClientProtocol, UPLOAD_FOLDERS
 
 MAX_ATTEMPTS = 3
 NO_ATTEMPTS = 0
@@ -41,11 +42,13 @@ class Client:
                     f"action: close_{socket_name_to_log} | result: fail | error: {e}"
                 )
 
-    def __init__(self, server_address: str, input_dir: str, output_dir: str) -> None:
+    def __init__(self, server_address: str, input_dir: str, output_dir: str, upload_streams: int = 1) -> None:
         self._server_address = server_address
-        self._client_socket_to_server: Optional[socket.socket]
-        self._client_socket_to_dispatcher: Optional[socket.socket]
-        self._client_socket_to_results_storage: Optional[socket.socket]
+        self._upload_streams = upload_streams
+        self._upload_sockets: List[socket.socket] = []
+        self._client_socket_to_server: Optional[socket.socket] = None
+        self._client_socket_to_dispatcher: Optional[socket.socket] = None
+        self._client_socket_to_results_storage: Optional[socket.socket] = None
         self._input_dir = Path(input_dir)
         self._output_dir = Path(output_dir)
         self._file_descriptors: List[Union[BufferedWriter, BufferedReader]] = []
@@ -98,22 +101,25 @@ class Client:
         )
 
         # 2. Subo los datos al dispatcher y obtengo mi id
-        self._client_socket_to_dispatcher = self.create_client_socket(
-            dispatcher_address
-        )
-        if not self._client_socket_to_dispatcher:
+        if self._upload_streams > 1:
+            client_id = self.__upload_in_streams(dispatcher_address)
+        else:
+            self._client_socket_to_dispatcher = self.create_client_socket(
+                dispatcher_address
+            )
+            if not self._client_socket_to_dispatcher:
+                return
+            client_protocol_to_dispatcher = ClientProtocol(
+                self._client_socket_to_dispatcher
+            )
+            client_id = client_protocol_to_dispatcher.upload_files(
+                self._input_dir, self.__open_input_file, self.__close_file
+            )
+            self._client_socket_to_dispatcher.close()
+        if not client_id:
             return
-        client_protocol_to_dispatcher = ClientProtocol(
-            self._client_socket_to_dispatcher
-        )
-        client_id = client_protocol_to_dispatcher.upload_files(
-            self._input_dir, self.__open_input_file, self.__close_file
-        )
-        self._client_socket_to_dispatcher.close()
         logging.info(f"action: data_upload | result: success | client_id: {client_id}")
 
-        time.sleep(10)  # TODO sacar
-
         # 3. Obtengo del servidor la dirección de un results storage
         self._client_socket_to_server = self.create_client_socket(self._server_address)
         if not self._client_socket_to_server:
@@ -161,6 +167,52 @@ class Client:
         if attempts <= NO_ATTEMPTS:
             logging.info("action: data_download | result: failed all attempts")
 
+    def __upload_in_streams(self, dispatcher_address: str) -> Optional[str]:
+        """
+        Upload each folder through its own dispatcher connection, up to upload_streams at a time
+        The first connection opens a session, the others join it, the dispatcher uses it as client id
+        Folders are started in UPLOAD_FOLDERS order, dimension tables first
+        """
+        first_socket = self.create_client_socket(dispatcher_address)
+        if not first_socket:
+            return None
+        self._upload_sockets.append(first_socket)
+        first_protocol = ClientProtocol(first_socket)
+        try:
+            session_id = first_protocol.open_session()
+        except Exception as e:
+            logging.error(f"action: open_session | result: fail | error: {e}")
+            self.__try_close(first_socket, "client_socket_to_dispatcher")
+            self._upload_sockets.remove(first_socket)
+            return None
+        opened: Tuple[socket.socket, ClientProtocol] = (first_socket, first_protocol)
+
+        def upload_folder(folder: str) -> Optional[str]:
+            if folder == UPLOAD_FOLDERS[0]:
+                a_socket, protocol = opened
+            else:
+                new_socket = self.create_client_socket(dispatcher_address)
+                if not new_socket:
+                    return None
+                self._upload_sockets.append(new_socket)
+                a_socket, protocol = new_socket, ClientProtocol(new_socket)
+            try:
+                return protocol.upload_files(
+                    self._input_dir, self.__open_input_file, self.__close_file,
+                    folders=[folder], session_id=session_id,
+                )
+            finally:
+                self.__try_close(a_socket, "client_socket_to_dispatcher")
+                self._upload_sockets.remove(a_socket)
+
+        with ThreadPoolExecutor(max_workers=self._upload_streams) as executor:
+            client_ids = list(executor.map(upload_folder, UPLOAD_FOLDERS))
+
+        if any(client_id != session_id for client_id in client_ids):
+            logging.error("action: data_upload | result: fail | error: a stream could not be uploaded")
+            return None
+        return session_id
+
     def graceful_shutdown(
         self, _signal_number: int, _current_stack_frame: Optional[FrameType]
     ) -> None:
@@ -175,6 +227,8 @@ class Client:
             self._client_socket_to_dispatcher.close()
         if self._client_socket_to_results_storage:
             self._client_socket_to_results_storage.close()
+        for upload_socket in list(self._upload_sockets):
+            upload_socket.close()
 
         for file_descriptor in self._file_descriptors:
             file_descriptor.close()
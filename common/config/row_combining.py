@@ -0,0 +1,61 @@
+## Partial aggregation (combiner) done before sending rows to the groupby nodes.
+# Only actions whose partials can be merged downstream are allowed:
+# sum partials are summed again, count partials are merged with the groupby "count_merge" action.
+
+COMBINE_SUM = "sum"
+COMBINE_COUNT = "count"
+
+COMBINE_KEY_FIELDS = 0
+COMBINE_FIELDS_ACTIONS = 1
+
+COMBINE_OP = 0
+COMBINE_COL_IN = 1
+COMBINE_COL_OUT = 2
+
+"""
+combiner serial is the same as the groupby grouping conf, eg:
+[["store_id", "mapped_semester"], [["sum", "revenue"]]]
+[["store_id", "user_id"], [["count", "purchase_count"]]]  count col is an out col, not read from the row.
+"""
+
+
+class RowCombiner:
+    def __init__(self, combiner_conf):
+        self.key_fields = combiner_conf[COMBINE_KEY_FIELDS]
+        self.sum_fields = []  # (col_in, col_out)
+        self.count_fields = []
+
+        for action in combiner_conf[COMBINE_FIELDS_ACTIONS]:
+            if action[COMBINE_OP] == COMBINE_COUNT:
+                self.count_fields.append(action[COMBINE_COL_IN])
+                continue
+            assert action[COMBINE_OP] == COMBINE_SUM
+            col_out = action[COMBINE_COL_OUT] if len(action) > 2 else action[COMBINE_COL_IN]
+            self.sum_fields.append((action[COMBINE_COL_IN], col_out))
+
+    # Partials of one batch, group key -> [count, sum1, sum2...]
+    def new_partials(self):
+        return {}
+
+    def add(self, partials, row):
+        key = tuple([row[field] for field in self.key_fields])
+        acc = partials.get(key, None)
+        if acc == None:
+            acc = [0] + [0.0] * len(self.sum_fields)
+            partials[key] = acc
+
+        acc[0] += 1
+        for ind, (col_in, _) in enumerate(self.sum_fields):
+            acc[ind + 1] += float(row[col_in])
+
+    # Yields a dict row per group, with key fields and aggregated cols.
+    def iterate_rows(self, partials):
+        for key, acc in partials.items():
+            row = {}
+            for ind, field in enumerate(self.key_fields):
+                row[field] = key[ind]
+            for field in self.count_fields:
+                row[field] = acc[0]
+            for ind, (_, col_out) in enumerate(self.sum_fields):
+                row[col_out] = acc[ind + 1]
+            yield row
@@ -8,6 +8,13 @@ class InnerEqualJoin:
     def should_join(self, row1, row2):
         return row1[self.col_left] == row2[self.col_right]
 
+    # Key getters, rows that should join have the same key. Used for hash joins.
+    def left_key(self, row):
+        return row[self.col_left]
+
+    def right_key(self, row):
+        return row[self.col_right]
+
     def map_cols(self, left_mapper, right_mapper):
         self.col_left = left_mapper(self.col_left)
         self.col_right = right_mapper(self.col_right)
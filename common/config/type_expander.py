@@ -1,5 +1,16 @@
 import logging
 
+# Sends what the output middlewares still hold coalesced, once per middleware.
+# Set as the before ack hook of the input, so inputs are not acked before their outputs are sent.
+def flush_outputs_of(configurations):
+	flushed = []
+	for config in configurations:
+		middleware = config.middleware
+		if middleware in flushed or not hasattr(middleware, "flush"):
+			continue # Memory and mock middlewares send right away.
+		flushed.append(middleware)
+		middleware.flush()
+
 class TypeExpander:
 	def __init__(self):
 		self.type_configurations = []
@@ -43,6 +54,9 @@ class TypeExpander:
 			for config in self.get_configurations_for(trg_headers.types[0]):
 				config.send(config.new_builder_for(trg_headers))
 
+	def flush_outputs(self):
+		flush_outputs_of(self.type_configurations)
+
 	def close(self):
 		for config in self.type_configurations:
 			try:
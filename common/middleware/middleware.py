@@ -66,7 +66,14 @@ class MessageMiddleware(ABC):
 
 
 class MessageMiddlewareExchange(MessageMiddleware):
-    def __init__(self, host: str, exchange_name: str, route_keys: List[str]):
+    def __init__(
+        self,
+        host: str,
+        exchange_name: str,
+        route_keys: List[str],
+        prefetch_count: int = 1,
+    ):
+        self.prefetch_count = prefetch_count
         self.connection = pika.BlockingConnection(pika.ConnectionParameters(host=host))
         self.channel = self.connection.channel()
         self.channel.exchange_declare(exchange=exchange_name, exchange_type="direct")
@@ -87,7 +94,7 @@ class MessageMiddlewareExchange(MessageMiddleware):
         ],
     ) -> None:
         try:
-            self.channel.basic_qos(prefetch_count=1)
+            self.channel.basic_qos(prefetch_count=self.prefetch_count)
             self.channel.basic_consume(
                 queue=self.queue_name,
                 on_message_callback=on_message_callback,
@@ -142,7 +149,8 @@ class MessageMiddlewareExchange(MessageMiddleware):
 
 
 class MessageMiddlewareQueue(MessageMiddleware):
-    def __init__(self, host: str, queue_name: str):
+    def __init__(self, host: str, queue_name: str, prefetch_count: int = 1):
+        self.prefetch_count = prefetch_count
         self.queue_name = queue_name
         self.connection = pika.BlockingConnection(pika.ConnectionParameters(host=host))
         self.channel = self.connection.channel()
@@ -159,7 +167,7 @@ class MessageMiddlewareQueue(MessageMiddleware):
         ],
     ) -> None:
         try:
-            self.channel.basic_qos(prefetch_count=1)
+            self.channel.basic_qos(prefetch_count=self.prefetch_count)
             self.channel.basic_consume(
                 queue=self.queue_name,
                 on_message_callback=on_message_callback,
@@ -0,0 +1,84 @@
+from calendar import isleap
+from datetime import datetime
+from typing import Tuple, Union
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATETIME_LEN = len("2025-01-01 12:52:56")
+
+# Zero padded field -> same value as str(int(field)), as sent downstream.
+MONTHS_UNPADDED = {f"{month:02d}".encode(): str(month).encode() for month in range(1, 13)}
+HOURS_UNPADDED = {f"{hour:02d}".encode(): str(hour).encode() for hour in range(0, 24)}
+# Zero padded month -> its last day, february is checked against leap years apart.
+MONTH_LAST_DAY = {f"{month:02d}".encode(): f"{days:02d}".encode() for month, days in
+    zip(range(1, 13), [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])}
+
+
+def is_valid_day(year: bytes, month: bytes, day: bytes) -> bool:
+    """
+    Receives zero padded date fields, with a valid month, returns whether the day exists
+    """
+    if day <= b"28":
+        return day != b"00"
+    if day > MONTH_LAST_DAY[month]:
+        return False
+    return day != b"29" or month != b"02" or isleap(int(year))
+
+
+def _split_fixed(value: bytes) -> Tuple[bytes, bytes, bytes, bytes, bytes, bytes]:
+    """
+    Splits a "YYYY-MM-DD HH:MM:SS" by fixed offsets
+    Raise ValueError if separators, lengths, digits or ranges are not the expected ones
+    """
+    if (
+        len(value) != DATETIME_LEN
+        or value[4] != 45  # -
+        or value[7] != 45
+        or value[10] != 32  # space
+        or value[13] != 58  # :
+        or value[16] != 58
+    ):
+        raise ValueError(f"Not a fixed format datetime: {value!r}")
+
+    year, month, day = value[0:4], value[5:7], value[8:10]
+    hour, minute, second = value[11:13], value[14:16], value[17:19]
+    if not (year + day + minute + second).isdigit() or year[0] == 48:  # year >= 1000
+        raise ValueError(f"Not a fixed format datetime: {value!r}")
+    if month not in MONTHS_UNPADDED or hour not in HOURS_UNPADDED or minute > b"59" or second > b"59":
+        raise ValueError(f"Datetime field out of range: {value!r}")
+
+    if not is_valid_day(year, month, day):
+        raise ValueError(f"Datetime field out of range: {value!r}")
+    return year, month, day, hour, minute, second
+
+
+def parse_year_month_hour(value: bytes) -> Tuple[bytes, bytes, bytes]:
+    """
+    Receives a created_at as bytes, returns year, month and hour as bytes without zero padding
+    Same result as formatting datetime.strptime fields, falls back to it for other layouts
+    """
+    try:
+        year, month, _, hour, _, _ = _split_fixed(value)
+        return year, MONTHS_UNPADDED[month], HOURS_UNPADDED[hour]
+    except ValueError:
+        created_at = datetime.strptime(value.decode().strip(), DATETIME_FORMAT)
+        return (
+            str(created_at.year).encode(),
+            str(created_at.month).encode(),
+            str(created_at.hour).encode(),
+        )
+
+
+def parse_datetime(value: Union[str, bytes]) -> datetime:
+    """
+    Receives a created_at as str or bytes, returns it as datetime
+    Same result as datetime.strptime, falls back to it for other layouts
+    """
+    raw = value if isinstance(value, bytes) else value.encode()
+    try:
+        year, month, day, hour, minute, second = _split_fixed(raw)
+        return datetime(
+            int(year), int(month), int(day), int(hour), int(minute), int(second)
+        )
+    except ValueError:
+        text = value.decode() if isinstance(value, bytes) else value
+        return datetime.strptime(text.strip(), DATETIME_FORMAT)
@@ -1,10 +1,16 @@
 from dataclasses import dataclass
 from .model import Model
-from typing import ClassVar, Optional
+import re
+from typing import ClassVar, Optional, Pattern
 
 @dataclass
 class MenuItem(Model):
     _ORIGINAL_HEADER: ClassVar[str] = "item_id,item_name,category,price,is_seasonal,available_from,available_to"
+    _PROJECTED_HEADER: ClassVar[str] = "item_id,item_name"
+    # item id, item name
+    _BATCH_PATTERN: ClassVar[Pattern[bytes]] = re.compile(
+        rb"^[ \t\r]*([^,\n]*),([^,\n]*?)(?:[ \t\r]*|,[^\n]*)$", re.M
+    )
 
     item_id: int
     item_name: str
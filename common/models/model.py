@@ -1,10 +1,58 @@
+import re
 from abc import ABC, abstractmethod
-from typing import Type, ClassVar, TypeVar
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Pattern, Tuple, Type, ClassVar, TypeVar
 
 T = TypeVar("T", bound="Model")
 
+# Projected columns that parse_row validates, files projected by the client must have them in the same form
+_PROJECTED_COLUMN_PATTERNS: Dict[str, bytes] = {
+    "year": rb"[1-9]\d{3}",
+    "month": rb"(?:[1-9]|1[0-2])",
+    "hour": rb"(?:1?\d|2[0-3])",
+}
+_ANY_COLUMN_PATTERN = rb"[^,\n]*"
+
+
+@lru_cache(maxsize=None)
+def _projected_row_pattern(projected_header: str) -> Pattern[bytes]:
+    columns = [_PROJECTED_COLUMN_PATTERNS.get(name, _ANY_COLUMN_PATTERN) for name in projected_header.split(",")]
+    return re.compile(b"^" + b",".join(columns) + b"$", re.M)
+
 class Model(ABC):
     _ORIGINAL_HEADER: ClassVar[str]
+    # Columns of the parse_row output, header of the files a client sends already projected
+    _PROJECTED_HEADER: ClassVar[str]
+    # One match per well formed line, groups are the projected columns (see project_matches)
+    _BATCH_PATTERN: ClassVar[Optional[Pattern[bytes]]] = None
+    # Projects a CSV line to the _PROJECTED_HEADER columns, defined by each model as a plain function
+    parse_row: ClassVar[Callable[[bytes], List[bytes]]]
+
+    @classmethod
+    def parse_batch(cls: Type[T], data: bytes) -> Tuple[bytes, int]:
+        """
+        Receives a chunk of CSV lines as bytes, returns the projected rows as a CSV payload and its row count
+        Same rows as calling parse_row on each line, but the whole chunk is matched in a single regex pass
+        If any line does not match the pattern, the chunk is parsed line by line
+        """
+        if cls._BATCH_PATTERN is not None and data and b"\n\n" not in data and not data.startswith(b"\n"):
+            matches = cls._BATCH_PATTERN.findall(data)
+            expected = data.count(b"\n") + (0 if data.endswith(b"\n") else 1)
+            if len(matches) == expected:
+                rows = cls.project_matches(matches)
+                if rows is not None:
+                    return b"\n".join(rows), len(rows)
+
+        rows = [b",".join(cls.parse_row(line)) for line in data.split(b"\n") if line != b""]
+        return b"\n".join(rows), len(rows)
+
+    @classmethod
+    def project_matches(cls: Type[T], matches: List[Tuple[bytes, ...]]) -> Optional[List[bytes]]:
+        """
+        Receives the _BATCH_PATTERN groups of each line, returns each projected row as CSV bytes
+        Returns None if some line needs the line by line parsing
+        """
+        return [b",".join(groups) for groups in matches]
 
     @classmethod
     def model_for(cls: Type[T], header: bytes) -> Type["Model"]:
@@ -17,6 +65,50 @@ class Model(ABC):
                 return subclass
         raise ValueError(f"Unknown CSV Header: {header.decode('utf-8').strip()}")
 
+    @classmethod
+    def projected_model_for(cls: Type[T], header: bytes) -> Optional[Type["Model"]]:
+        """
+        Receives a CSV header as bytes, returns the class whose projected CSV has that header
+        None if it is not the header of a projected CSV
+        """
+        text = header.decode("utf-8").strip()
+        for subclass in cls.__subclasses__():
+            if text == subclass._PROJECTED_HEADER:
+                return subclass
+        return None
+
+    @classmethod
+    def projections(cls: Type[T]) -> Dict[str, str]:
+        """
+        Returns the original header -> projected header of every model
+        """
+        return {subclass._ORIGINAL_HEADER: subclass._PROJECTED_HEADER for subclass in cls.__subclasses__()}
+
+    @classmethod
+    def project_batch(cls: Type[T], data: bytes) -> bytes:
+        """
+        Receives a chunk of an original CSV with its header first, returns it projected with the projected header
+        Chunks after the first one do not have a header, see parse_batch
+        """
+        header, _, rows = data.partition(b"\n")
+        if cls.is_header_of(header):
+            payload, _ = cls.parse_batch(rows.strip(b"\n"))
+            return cls._PROJECTED_HEADER.encode("utf-8") + b"\n" + payload + b"\n"
+        payload, _ = cls.parse_batch(data.strip(b"\n"))
+        return payload + b"\n" if payload else b""
+
+    @classmethod
+    def count_projected_rows(cls: Type[T], data: bytes) -> int:
+        """
+        Receives a chunk of a file projected by the client, without its header, returns its row count
+        Raise ValueError if a row does not have the projected columns, or a year, month or hour parse_row would reject
+        """
+        rows = _projected_row_pattern(cls._PROJECTED_HEADER).findall(data)
+        expected = data.count(b"\n") + (0 if data.endswith(b"\n") else 1)
+        if len(rows) != expected:
+            raise ValueError(f"Invalid projected {cls.__name__} rows, {expected - len(rows)} of {expected} malformed")
+        return expected
+
     @classmethod
     def is_header_of(cls: Type[T], header: bytes) -> bool:
         """
@@ -1,10 +1,16 @@
 from dataclasses import dataclass
 from .model import Model
-from typing import ClassVar
+import re
+from typing import ClassVar, Pattern
 
 @dataclass
 class Store(Model):
     _ORIGINAL_HEADER: ClassVar[str] = "store_id,store_name,street,postal_code,city,state,latitude,longitude"
+    _PROJECTED_HEADER: ClassVar[str] = "store_id,store_name"
+    # store id, store name
+    _BATCH_PATTERN: ClassVar[Pattern[bytes]] = re.compile(
+        rb"^[ \t\r]*([^,\n]*),([^,\n]*?)(?:[ \t\r]*|,[^\n]*)$", re.M
+    )
 
     store_id: int
     store_name: str
@@ -1,11 +1,21 @@
 from dataclasses import dataclass
 from datetime import datetime
 from .model import Model
-from typing import ClassVar, Optional
+from .datetime_parsing import parse_datetime, parse_year_month_hour, is_valid_day, MONTHS_UNPADDED, HOURS_UNPADDED
+import re
+from typing import ClassVar, List, Optional, Pattern, Tuple
 
 @dataclass
 class Transaction(Model):
     _ORIGINAL_HEADER: ClassVar[str] = "transaction_id,store_id,payment_method_id,voucher_id,user_id,original_amount,discount_applied,final_amount,created_at"
+    _PROJECTED_HEADER: ClassVar[str] = "transaction_id,year,store_id,user_id,month,hour,final_amount"
+    # transaction id, store id, user id (integer part), final amount, created_at year, month, day and hour
+    # Lines with leading whitespace do not match, they are left to parse_row
+    _BATCH_PATTERN: ClassVar[Pattern[bytes]] = re.compile(
+        rb"^(?![ \t\r])((?:[^,\n]*[^, \t\r\n])?)[ \t]*,([^,\n]*),[^,\n]*,[^,\n]*,(?:0*(\d+)(?:\.\d*)?)?,[^,\n]*,[^,\n]*,([^,\n]*),"
+        rb"([1-9]\d{3})-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01]) ([01]\d|2[0-3]):[0-5]\d:[0-5]\d[ \t\r]*$",
+        re.M,
+    )
 
     transaction_id: str
     store_id: int
@@ -18,18 +28,32 @@ class Transaction(Model):
 
     def parse_row(data: bytes):
         fields = data.strip().split(b",")
-        created_at = datetime.strptime(fields[8].decode(), "%Y-%m-%d %H:%M:%S")
+        year, month, hour = parse_year_month_hour(fields[8])
 
         return [
             fields[0].strip(), #transaction id
-            str(created_at.year).encode(), #
+            year, #
             fields[1], # store id
             str(int(float(fields[4]))).encode() if fields[4] else b"",#fields[4], # user id
-            str(created_at.month).encode(), #
-            str(created_at.hour).encode(), #
+            month, #
+            hour, #
             fields[7], #
         ]
 
+    @classmethod
+    def project_matches(cls, matches: List[Tuple[bytes, ...]]) -> Optional[List[bytes]]:
+        """
+        Check superclass documentation
+        Same columns as parse_row
+        """
+        rows = []
+        for transaction_id, store_id, user_id, final_amount, year, month, day, hour in matches:
+            if day > b"28" and not is_valid_day(year, month, day):
+                return None
+            rows.append(b",".join((transaction_id, year, store_id, user_id,
+                MONTHS_UNPADDED[month], HOURS_UNPADDED[hour], final_amount)))
+        return rows
+
 
     @classmethod
     def from_bytes_and_project(cls, data: bytes) -> "Transaction":
@@ -48,7 +72,7 @@ class Transaction(Model):
         user_id = int(float(fields[4])) if fields[4] else None
         original_amount = float(fields[5])
         final_amount = float(fields[7])
-        created_at = datetime.strptime(fields[8], "%Y-%m-%d %H:%M:%S")
+        created_at = parse_datetime(fields[8])
 
         return cls(
             transaction_id=transaction_id,
@@ -76,7 +100,7 @@ class Transaction(Model):
         user_id = int(fields[2]) if fields[2] else None
         original_amount = float(fields[3])
         final_amount = float(fields[4])
-        created_at = datetime.strptime(fields[5], "%Y-%m-%d %H:%M:%S")
+        created_at = parse_datetime(fields[5])
 
         return cls(
             transaction_id=transaction_id,
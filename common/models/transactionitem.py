@@ -1,11 +1,20 @@
 from dataclasses import dataclass
 from datetime import datetime
 from .model import Model
-from typing import ClassVar
+from .datetime_parsing import parse_datetime, parse_year_month_hour, is_valid_day, MONTHS_UNPADDED
+import re
+from typing import ClassVar, List, Optional, Pattern, Tuple
 
 @dataclass
 class TransactionItem(Model):
     _ORIGINAL_HEADER: ClassVar[str] = "transaction_id,item_id,quantity,unit_price,subtotal,created_at"
+    _PROJECTED_HEADER: ClassVar[str] = "item_id,year,month,subtotal,quantity"
+    # item id, quantity, subtotal, created_at year, month and day
+    _BATCH_PATTERN: ClassVar[Pattern[bytes]] = re.compile(
+        rb"^[ \t\r]*[^,\n]*,([^,\n]*),([^,\n]*),[^,\n]*,([^,\n]*),"
+        rb"([1-9]\d{3})-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01]) (?:[01]\d|2[0-3]):[0-5]\d:[0-5]\d[ \t\r]*$",
+        re.M,
+    )
 
     transaction_id: str
     item_id: int
@@ -15,16 +24,29 @@ class TransactionItem(Model):
     created_at: datetime
     def parse_row(data: bytes):
         fields = data.strip().split(b",")
-        created_at = datetime.strptime(fields[5].decode(), "%Y-%m-%d %H:%M:%S")
+        year, month, _ = parse_year_month_hour(fields[5])
 
         return [
             fields[1], #item id
-            str(created_at.year).encode(), #
-            str(created_at.month).encode(), #
+            year, #
+            month, #
             fields[4], # sub total
             fields[2], # quantity
         ]
 
+    @classmethod
+    def project_matches(cls, matches: List[Tuple[bytes, ...]]) -> Optional[List[bytes]]:
+        """
+        Check superclass documentation
+        Same columns as parse_row
+        """
+        rows = []
+        for item_id, quantity, subtotal, year, month, day in matches:
+            if day > b"28" and not is_valid_day(year, month, day):
+                return None
+            rows.append(b",".join((item_id, year, MONTHS_UNPADDED[month], subtotal, quantity)))
+        return rows
+
     @classmethod
     def from_bytes_and_project(cls, data: bytes) -> "TransactionItem":
         """
@@ -42,7 +64,7 @@ class TransactionItem(Model):
         quantity = int(fields[2])
         unit_price = float(fields[3])
         subtotal = float(fields[4])
-        created_at = datetime.strptime(fields[5], "%Y-%m-%d %H:%M:%S")
+        created_at = parse_datetime(fields[5])
 
         return cls(
             transaction_id=transaction_id,
@@ -70,7 +92,7 @@ class TransactionItem(Model):
         quantity = int(fields[2])
         unit_price = float(fields[3])
         subtotal = float(fields[4])
-        created_at = datetime.strptime(fields[5], "%Y-%m-%d %H:%M:%S")
+        created_at = parse_datetime(fields[5])
 
         return cls(
             transaction_id=transaction_id,
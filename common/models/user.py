@@ -1,11 +1,17 @@
 from dataclasses import dataclass
 from datetime import datetime, date
 from .model import Model
-from typing import ClassVar
+import re
+from typing import ClassVar, Pattern
 
 @dataclass
 class User(Model):
     _ORIGINAL_HEADER: ClassVar[str] = "user_id,gender,birthdate,registered_at"
+    _PROJECTED_HEADER: ClassVar[str] = "user_id,birthdate"
+    # user id, birthdate
+    _BATCH_PATTERN: ClassVar[Pattern[bytes]] = re.compile(
+        rb"^[ \t\r]*([^,\n]*),[^,\n]*,([^,\n]*?)(?:[ \t\r]*|,[^\n]*)$", re.M
+    )
 
     user_id: int
     birthdate: date
@@ -1,15 +1,36 @@
 import logging
 import socket
-from typing import Callable, List, Iterable
+from typing import Callable, Dict, List, Iterable, Optional, Protocol, Tuple
+
+from .byte import Buffer, ByteProtocol
+from .compression import Codec, choose_codec, codec_for
+
+
+class Reader(Protocol):
+    """
+    What send_all reads from, eg. a file opened in binary mode
+    readinto returns 0 at the end only
+    """
+
+    def readinto(self, __buffer: memoryview) -> int:
+        ...
 
-from .byte import ByteProtocol
 
 class BatchProtocol:
     _MAX_BATCH_SIZE = 256 * 1024  # 8 kB
     _MAX_BATCH_COUNT = 8196
+    # Sent instead of a first batch size, never a valid one, followed by the session id (as bytes)
+    # An empty session id asks for a new session, answered with its id
+    _SESSION_MARKER = 0xFFFFFFFF
+    # Same, followed by the compression codecs offered (as bytes), answered with the chosen one
+    _COMPRESSION_MARKER = 0xFFFFFFFE
+    # Same, answered with the projections the receiver accepts (original header;projected header lines)
+    _PROJECTION_MARKER = 0xFFFFFFFD
 
     def __init__(self, a_socket: socket.socket):
         self._byte_protocol = ByteProtocol(a_socket)
+        # Set by the compression negotiation, None sends and receives raw frames
+        self._codec: Optional[Codec] = None
 
     def close_with(self, closure_to_close: Callable[[socket.socket], None]) -> None:
         """
@@ -19,24 +40,35 @@ class BatchProtocol:
 
     def send_batch(self, batch: List[bytes]) -> None:
         """
-        Send a batch of bytes arrays:
-        - First send the batch size (as uint8)
-        - Then send each item in the batch
+        Send a batch of bytes arrays, read back by wait_batch:
+        - First send the batch size in bytes (as uint32)
+        - Then send each item in the batch, each one ended by a new line
+        Size and items are written together by a vectored send
         """
         if len(batch) > self._MAX_BATCH_COUNT:
             raise ValueError("Batch size too large for uint8")
 
-        total_size = sum(len(item) for item in batch)
+        total_size = sum(len(item) + 1 for item in batch)
         if total_size > self._MAX_BATCH_SIZE:
             raise ValueError(
                 f"Batch total size {total_size} bytes exceeds maximum {self._MAX_BATCH_SIZE}kB"
             )
+        if batch and self._codec is not None:
+            self.__send_chunk(b"".join(item + b"\n" for item in batch))
+            return
 
-        self._byte_protocol.send_uint32(len(batch))
+        buffers = [total_size.to_bytes(4, byteorder='big', signed=False)]
         for item in batch:
-            self._byte_protocol.send_all(item)
+            buffers.append(item)
+            buffers.append(b"\n")
+        self._byte_protocol.send_vectored(buffers)
 
-    def send_all(self, reader) -> None:
+    def send_all(self, reader: Reader, transform: Optional[Callable[[bytes], bytes]] = None) -> None:
+        """
+        Send the whole reader in batches of full lines, up to _MAX_BATCH_SIZE each
+        If given, transform maps each batch (lines, with the header in the first one) to the bytes sent
+        Batches transformed to nothing are not sent
+        """
         buffer = bytearray(self._MAX_BATCH_SIZE)
         cached_start = 0  # How much of the buffer is already filled
 
@@ -48,19 +80,18 @@ class BatchProtocol:
                 break  # EOF
 
             total_len = cached_start + read_len
-            tmp = buffer[:total_len]
+            # Sent as views of the buffer, without copying the chunk
+            tmp = memoryview(buffer)[:total_len]
 
             # Look for last newline within the buffer
-            split_index = tmp.rfind(b'\n')
+            split_index = buffer.rfind(b'\n', 0, total_len)
             if split_index == -1:
-                self._byte_protocol.send_uint32(total_len)
-                self._byte_protocol.send_all(tmp)
+                self.__send_transformed(tmp, transform)
                 cached_start = 0
                 continue
 
             # Send everything up to and including the last full line
-            self._byte_protocol.send_uint32(split_index+1)
-            self._byte_protocol.send_all(tmp[:split_index+1])
+            self.__send_transformed(tmp[:split_index+1], transform)
 
             # Move the remainder (after the split) to the front of the buffer
             remaining = total_len - (split_index + 1)
@@ -68,6 +99,23 @@ class BatchProtocol:
             cached_start = remaining
 
 
+    def __send_transformed(self, chunk: Buffer, transform: Optional[Callable[[bytes], bytes]]) -> None:
+        if transform is None:
+            self.__send_chunk(chunk)
+            return
+        transformed = transform(bytes(chunk))
+        if transformed:
+            self.__send_chunk(transformed)
+
+    def __send_chunk(self, chunk: Buffer) -> None:
+        """
+        Send the chunk size (as uint32) and the chunk in a single vectored send
+        The chunk is compressed first if a codec was negotiated
+        """
+        frame = chunk if self._codec is None else self._codec.compress(chunk)
+        size = len(frame).to_bytes(4, byteorder='big', signed=False)
+        self._byte_protocol.send_vectored([size, frame])
+
     def wait_batch(self) -> List[bytes]:
         """
         Wait for a batch of bytes arrays
@@ -77,6 +125,117 @@ class BatchProtocol:
         if size == 0:
             return []
 
-        batch = self._byte_protocol.recv_all(size)
+        batch = self.__recv_frame(size)
+
+        return [line for line in batch.split(b"\n") if line !=b""]
+
+    def open_session(self) -> str:
+        """
+        Ask the receiver for a new session before any batch, this connection is already part of it
+        Returns the session id, for the other connections of the upload to send_session
+        """
+        self.send_session("")
+        session_id = self._byte_protocol.wait_bytes().decode("utf-8")
+        if not session_id:
+            raise ValueError("The receiver did not open a session")
+        return session_id
+
+    def send_session(self, session_id: str) -> None:
+        """
+        Send the session id this connection belongs to, before any batch
+        Several connections with the same session are uploads of the same client
+        """
+        self._byte_protocol.send_uint32(self._SESSION_MARKER)
+        self._byte_protocol.send_bytes(session_id.encode("utf-8"))
+
+    def negotiate_compression(self, codecs: List[str]) -> Optional[str]:
+        """
+        Offer compression before the first batch, answered by wait_session_and_raw_batch
+        Returns the codec chosen by the receiver, None if it chose not to compress
+        """
+        self._byte_protocol.send_uint32(self._COMPRESSION_MARKER)
+        return self.offer_compression(codecs)
+
+    def offer_compression(self, codecs: List[str]) -> Optional[str]:
+        """
+        Send the codecs this side can use, in preference order, and wait for the chosen one
+        Both directions of the connection use it from then on
+        """
+        self._byte_protocol.send_bytes(",".join(codecs).encode("utf-8"))
+        name = self._byte_protocol.wait_bytes().decode("utf-8")
+        self._codec = codec_for(name)
+        return name or None
+
+    def accept_compression(self) -> Optional[str]:
+        """
+        Wait for the codecs offered by the other side and answer with the first one available here
+        """
+        offered = self._byte_protocol.wait_bytes().decode("utf-8").split(",")
+        self._codec = choose_codec(offered)
+        name = self._codec.name if self._codec is not None else ""
+        self._byte_protocol.send_bytes(name.encode("utf-8"))
+        return name or None
 
-        return [line for line in batch.split(b"\n") if line !=b""]
\ No newline at end of file
+    def request_projections(self) -> Dict[str, str]:
+        """
+        Ask, before the first batch, which files the receiver accepts already projected
+        Returns their original header -> projected header, answered by wait_session_and_raw_batch
+        """
+        self._byte_protocol.send_uint32(self._PROJECTION_MARKER)
+        projections = {}
+        for line in self._byte_protocol.wait_bytes().decode("utf-8").split("\n"):
+            if line:
+                original, _, projected = line.partition(";")
+                projections[original] = projected
+        return projections
+
+    def wait_session_and_raw_batch(self,
+                                   projections: Dict[str, str] = {},
+                                   open_session: Optional[Callable[[], str]] = None,
+    ) -> Tuple[Optional[str], bytes]:
+        """
+        Wait for the first batch of a connection, see wait_raw_batch
+        Answers a compression offer or a projections request sent before it, with the given projections
+        Answers a new session request with the id returned by open_session, if there is none the request fails
+        Returns the session id sent or opened before it, or None if the connection did not send one
+        """
+        size = self._byte_protocol.wait_uint32()
+        session_id = None
+        while size in (self._SESSION_MARKER, self._COMPRESSION_MARKER, self._PROJECTION_MARKER):
+            if size == self._SESSION_MARKER:
+                session_id = self._byte_protocol.wait_bytes().decode("utf-8")
+                if not session_id:
+                    session_id = open_session() if open_session is not None else ""
+                    self._byte_protocol.send_bytes(session_id.encode("utf-8"))
+                    if not session_id:
+                        raise ValueError("Can not open sessions")
+            elif size == self._COMPRESSION_MARKER:
+                self.accept_compression()
+            else:
+                lines = "".join(f"{original};{projected}\n" for original, projected in projections.items())
+                self._byte_protocol.send_bytes(lines.encode("utf-8"))
+            size = self._byte_protocol.wait_uint32()
+        if size == 0:
+            return session_id, b""
+
+        return session_id, self.__recv_frame(size).strip(b"\n")
+
+    def wait_raw_batch(self) -> bytes:
+        """
+        Wait for a batch of CSV lines, without splitting it
+        Leading and trailing empty lines are removed, returns b"" at the end of a file
+        """
+        size = self._byte_protocol.wait_uint32()
+        if size == 0:
+            return b""
+
+        return self.__recv_frame(size).strip(b"\n")
+
+    def __recv_frame(self, size: int) -> bytes:
+        """
+        Receive a frame of the given size, decompressed if a codec was negotiated
+        """
+        frame = self._byte_protocol.recv_all(size)
+        if self._codec is None:
+            return frame
+        return self._codec.decompress(frame, self._MAX_BATCH_SIZE)
\ No newline at end of file
@@ -1,10 +1,25 @@
+import os
 import socket
-from typing import Callable
+from typing import Callable, Sequence, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Most buffers a single sendmsg accepts, longer lists are sent in several calls
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+if IOV_MAX <= 0:
+    IOV_MAX = 1024
 
 
 class ByteProtocol:
+    _INITIAL_BUFFER_SIZE = 4 * 1024
+
     def __init__(self, a_socket: socket.socket) -> None:
         self._socket = a_socket
+        # Reused by every receive, grown to the biggest frame read so far
+        self._recv_buffer = bytearray(self._INITIAL_BUFFER_SIZE)
 
     def close_with(self, closure_to_close: Callable[[socket.socket], None]) -> None:
         """
@@ -54,7 +69,7 @@ class ByteProtocol:
         """
         Receive a single unsigned byte (0-255) through the socket
         """
-        return int(self.__recv_all(1)[0])
+        return int(self.recv_view(1)[0])
 
 
     def send_uint16(self, uint16: int) -> None:
@@ -62,47 +77,89 @@ class ByteProtocol:
         self.__send_all(u16_bytes)
 
     def wait_uint16(self) -> int:
-        return int.from_bytes(self.__recv_all(2), byteorder='big', signed=False)
+        return int.from_bytes(self.recv_view(2), byteorder='big', signed=False)
 
     def send_uint32(self, uint32: int) -> None:
         u32_bytes = uint32.to_bytes(4, byteorder='big', signed=False)
         self.__send_all(u32_bytes)
 
     def wait_uint32(self) -> int:
-        return int.from_bytes(self.__recv_all(4), byteorder='big', signed=False)
+        return int.from_bytes(self.recv_view(4), byteorder='big', signed=False)
 
 
-    def send_all(self, buf: bytes) -> None:
+    def send_all(self, buf: Buffer) -> None:
         self.__send_all(buf)
 
+    def send_vectored(self, buffers: Sequence[Buffer]) -> None:
+        """
+        Send the buffers one after the other as a single stream, without joining them
+
+        Uses scatter-gather sendmsg, IOV_MAX buffers per call, resuming after partial sends
+        Sockets without sendmsg send each buffer with sendall
+        Raises BrokenPipeError if the connection is closed unexpectedly
+        """
+        if not hasattr(self._socket, "sendmsg"):
+            for buf in buffers:
+                self.__send_all(buf)
+            return
+
+        views = [memoryview(buf).cast("B") for buf in buffers if len(buf) > 0]
+        first = 0
+        while first < len(views):
+            sent = self._socket.sendmsg(views[first:first + IOV_MAX])
+            if not sent:
+                raise BrokenPipeError
+            # Skip the fully sent buffers, keep the rest of a partially sent one
+            while first < len(views) and sent >= len(views[first]):
+                sent -= len(views[first])
+                first += 1
+            if sent > 0:
+                views[first] = views[first][sent:]
+
     def recv_all(self, n: int) -> bytes:
         return self.__recv_all(n)
 
-    def __send_all(self, buf: bytes) -> None:
+    def recv_view(self, n: int) -> memoryview:
+        """
+        Read exactly n bytes from the socket into the reused buffer
+
+        Returns a view of it without copying, only valid until the next receive of this protocol
+        """
+        if n > len(self._recv_buffer):
+            self._recv_buffer = bytearray(n)
+        view = memoryview(self._recv_buffer)[:n]
+        self.__recv_into(view)
+        return view
+
+    def __send_all(self, buf: Buffer) -> None:
         """
         Send the entire contents of buf through the socket
 
-        Retries until the entire buffer is sent
-        Raises BrokenPipeError if the connection is closed unexpectedly
+        The socket retries partial sends without copying the remaining buffer
+        Raises BrokenPipeError (or another OSError) if the connection is closed unexpectedly
         """
-        sz = 0
-        while sz < len(buf):
-            written = self._socket.send(buf[sz:])
-            if not written:
-                raise BrokenPipeError
-            sz += written
+        self._socket.sendall(buf)
 
     def __recv_all(self, n: int) -> bytes:
         """
         Read exactly n bytes from the socket
 
+        Reads into the reused buffer, so the payload is copied once whatever the partial reads
+        Raises BrokenPipeError if the connection is closed unexpectedly
+        """
+        return bytes(self.recv_view(n))
+
+    def __recv_into(self, view: memoryview) -> None:
+        """
+        Fill the whole view from the socket
+
         Retries until the requested number of bytes is received
         Raises BrokenPipeError if the connection is closed unexpectedly
         """
-        msg = b''
-        while len(msg) < n:
-            read = self._socket.recv(n - len(msg))
+        received = 0
+        n = len(view)
+        while received < n:
+            read = self._socket.recv_into(view[received:], n - received)
             if not read:
                 raise BrokenPipeError
-            msg += read
-        return msg
\ No newline at end of file
+            received += read
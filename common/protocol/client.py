@@ -1,15 +1,37 @@
 import logging
+import os
 import socket
 
 from io import BufferedWriter, BufferedReader
 from pathlib import Path
-from typing import Callable, Union
-
+from typing import Callable, Dict, Optional, Sequence, Set, Union
+
+# Every model is imported so Model.model_for knows them
+from common.models.menuitem import MenuItem
+from common.models.model import Model
+from common.models.store import Store
+from common.models.transaction import Transaction
+from common.models.transactionitem import TransactionItem
+from common.models.user import User
 from common.protocol.batch import BatchProtocol
 from common.protocol.byte import ByteProtocol
+from common.protocol.compression import offered_codecs
 from common.protocol.signal import SignalProtocol
 from common.protocol.server import ServerOperations
 
+# Dimension tables first, joins can build their side while the big files are still uploading
+DIMENSION_FOLDERS = ["menu_items", "stores", "users"]
+UPLOAD_FOLDERS = DIMENSION_FOLDERS + ["transaction_items", "transactions"]
+RESULT_FILE_NAMES = [
+    "query_1.csv",
+    "query_2_best_selling.csv",
+    "query_2_most_profits.csv",
+    "query_3.csv",
+    "query_4.csv",
+]
+# Project the files before uploading them, when the dispatcher accepts it
+CLIENT_PROJECTION = os.getenv("CLIENT_PROJECTION", "1") != "0"
+
 
 class ClientProtocol:
     @staticmethod
@@ -35,6 +57,7 @@ class ClientProtocol:
         self._byte_protocol = ByteProtocol(a_socket)
         self._signal_protocol = SignalProtocol(a_socket)
         self._batch_protocol = BatchProtocol(a_socket)
+        self._opened_session: Optional[str] = None
 
     def close_with(self, closure_to_close: Callable[[socket.socket], None]) -> None:
         """
@@ -42,39 +65,69 @@ class ClientProtocol:
         """
         self._byte_protocol.close_with(closure_to_close)
 
+    def open_session(self) -> str:
+        """
+        Ask the dispatcher for a new upload session, this connection is already part of it
+        Return the session id, to upload the other folders through other connections
+        """
+        self._opened_session = self._batch_protocol.open_session()
+        return self._opened_session
+
     def upload_files(self,
                      input_dir: Path,
                      open_file: Callable[[Path], BufferedReader],
-                     close_file: Callable[[Union[BufferedWriter, BufferedReader]], None]
+                     close_file: Callable[[Union[BufferedWriter, BufferedReader]], None],
+                     folders: Sequence[str] = UPLOAD_FOLDERS,
+                     session_id: Optional[str] = None,
     ) -> str:
         """
-        Upload the files to a dispatcher
+        Upload the files of the given folders to a dispatcher, in order
+        If a session_id is given, the dispatcher uses it as client_id, so uploads
+        through several connections belong to the same client
         Return the client_id assigned by the dispatcher
         """
-        folders_sent = ["transaction_items","menu_items","stores", "transactions", "users"]
-
-        for folder in folders_sent:
+        if session_id is not None and session_id != self._opened_session:
+            self._batch_protocol.send_session(session_id)
+        codecs = offered_codecs()
+        if codecs:
+            codec = self._batch_protocol.negotiate_compression(codecs)
+            logging.info(f"action: negotiate_compression | result: success | codec: {codec}")
+        projections = self._batch_protocol.request_projections() if CLIENT_PROJECTION else {}
+
+        for folder in folders:
             for file in input_dir.rglob(f"{folder}/*.csv"):
                 reader = open_file(file)
                 logging.info(f"action: upload_file | result: in-progress | file: {folder}/{file.name} | size: {file.stat().st_size}")
                 try:
-                    self._batch_protocol.send_all(reader)
+                    self._batch_protocol.send_all(reader, self.__projector_for(file, projections))
                     self._batch_protocol.send_batch([])
                 except Exception as e:
                     close_file(reader)
                     raise e
 
-        #in_parallel = ["transaction_items", "users"]
-        #trans_items = input_dir.rglob(f"{in_parallel[0]}/*.csv")
-        #users = input_dir.rglob(f"{in_parallel[1]}/*.csv")
-
-
-
         self._batch_protocol.send_batch([])
 
         user_id = self._byte_protocol.wait_bytes().decode()
+        if session_id is not None and user_id != session_id:
+            raise ValueError(f"Dispatcher assigned {user_id} instead of session {session_id}")
         return user_id
 
+    @staticmethod
+    def __projector_for(file: Path, projections: Dict[str, str]) -> Optional[Callable[[bytes], bytes]]:
+        """
+        Returns the projection of the file batches, None to send them as they are
+        Only projects if the dispatcher expects the same projected header of the file model
+        """
+        with file.open("rb") as reader:
+            header = reader.readline()
+        try:
+            model = Model.model_for(header)
+        except ValueError:
+            return None
+        if projections.get(model._ORIGINAL_HEADER) != model._PROJECTED_HEADER:
+            return None
+        return model.project_batch
+
     def download_results(self,
                          output_dir: Path,
                          client_id: str,
@@ -84,20 +137,33 @@ class ClientProtocol:
         """
         Receives a client_id from a previous upload operation
         Download the results from a results storage using the client_id
+        Each part of the result files is written as soon as the results storage pushes it
         """
         self._byte_protocol.send_bytes(client_id.encode("utf-8"))
+        self._batch_protocol.offer_compression(offered_codecs())
         self._signal_protocol.wait_signal()
 
-        dir_file_query_1 = output_dir / "query_1.csv"
-        self.__try_download_results(dir_file_query_1, open_output_file, close_file)
-        dir_file_query_2bs = output_dir / "query_2_best_selling.csv"
-        self.__try_download_results(dir_file_query_2bs, open_output_file, close_file)
-        dir_file_query_2mp = output_dir / "query_2_most_profits.csv"
-        self.__try_download_results(dir_file_query_2mp, open_output_file, close_file)
-        dir_file_query_3 = output_dir / "query_3.csv"
-        self.__try_download_results(dir_file_query_3, open_output_file, close_file)
-        dir_file_query_4 = output_dir / "query_4.csv"
-        self.__try_download_results(dir_file_query_4, open_output_file, close_file)
+        # Parts pushed as they are available, a file that got ready is not held back by a streamed one
+        # An empty file name ends the results
+        files: Dict[str, BufferedWriter] = {}
+        done: Set[str] = set()
+        try:
+            file_name = self._byte_protocol.wait_bytes().decode("utf-8")
+            while file_name:
+                if file_name not in RESULT_FILE_NAMES or file_name in done:
+                    raise ValueError(f"Unknown or already downloaded result file: {file_name}")
+                last = self._byte_protocol.wait_uint8() != 0
+                if file_name not in files:
+                    logging.info(f"action: download_result | result: in_progress | file: {file_name}")
+                    files[file_name] = open_output_file(output_dir / file_name)
+                self.__receive_result_and_store_into(files[file_name])
+                if last:
+                    close_file(files.pop(file_name))
+                    done.add(file_name)
+                file_name = self._byte_protocol.wait_bytes().decode("utf-8")
+        finally:
+            for file in files.values():
+                close_file(file)
 
     def request_dispatcher_address(self) -> str:
         """
@@ -130,19 +196,9 @@ class ClientProtocol:
             self._signal_protocol.send_error(str(e))
             raise e
 
-    def __try_download_results(self,
-                               dir_file_query: Path,
-                               open_output_file: Callable[[Path], BufferedWriter],
-                               close_file: Callable[[Union[BufferedWriter, BufferedReader]], None]
-    ) -> None:
-        file_query = open_output_file(dir_file_query)
-        try:
-            self.__receive_result_and_store_into(file_query)
-        finally:
-            close_file(file_query)
-
     def __receive_result_and_store_into(self, file: BufferedWriter) -> None:
         batch = self._batch_protocol.wait_batch()
         while batch:
             file.write(b"\n".join(batch) + b"\n")
+            file.flush() # Streamed results are visible as they arrive
             batch = self._batch_protocol.wait_batch()
\ No newline at end of file
@@ -0,0 +1,116 @@
+import os
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from .byte import Buffer
+
+try:
+    import zstandard  # type: ignore[import-not-found]
+except ImportError:  # Optional, zlib is always available
+    zstandard = None  # type: ignore[assignment]
+
+ZSTD = "zstd"
+ZLIB = "zlib"
+
+# Codecs offered by the client, in preference order. Empty disables compression
+COMPRESSION_CODECS = [
+    name.strip() for name in os.getenv("COMPRESSION_CODECS", f"{ZSTD},{ZLIB}").split(",") if name.strip()
+]
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "3"))
+
+
+class CompressionError(ValueError):
+    pass
+
+
+class Codec(ABC):
+    """
+    Compresses each batch frame on its own, so the receiver decompresses frames as they arrive
+    """
+    name = ""
+
+    @abstractmethod
+    def compress(self, data: Buffer) -> bytes:
+        pass
+
+    @abstractmethod
+    def decompress(self, data: bytes, max_size: int) -> bytes:
+        """
+        Raise CompressionError if the frame is corrupt or decompresses to more than max_size bytes
+        """
+        pass
+
+
+class ZlibCodec(Codec):
+    name = ZLIB
+
+    def __init__(self, level: int = COMPRESSION_LEVEL) -> None:
+        self._level = max(-1, min(level, 9))
+
+    def compress(self, data: Buffer) -> bytes:
+        return zlib.compress(data, self._level)
+
+    def decompress(self, data: bytes, max_size: int) -> bytes:
+        decompressor = zlib.decompressobj()
+        try:
+            result = decompressor.decompress(data, max_size)
+        except zlib.error as e:
+            raise CompressionError(f"Corrupt {self.name} frame: {e}")
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            raise CompressionError(f"Invalid {self.name} frame, bigger than {max_size} bytes or truncated")
+        return result
+
+
+class ZstdCodec(Codec):
+    name = ZSTD
+
+    def __init__(self, level: int = COMPRESSION_LEVEL) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: Buffer) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes, max_size: int) -> bytes:
+        try:
+            if zstandard.frame_content_size(data) > max_size:
+                raise CompressionError(f"Invalid {self.name} frame, bigger than {max_size} bytes")
+            return self._decompressor.decompress(data, max_output_size=max_size)
+        except zstandard.ZstdError as e:
+            raise CompressionError(f"Corrupt {self.name} frame: {e}")
+
+
+def available_codecs() -> Dict[str, type]:
+    codecs: Dict[str, type] = {ZLIB: ZlibCodec}
+    if zstandard is not None:
+        codecs[ZSTD] = ZstdCodec
+    return codecs
+
+
+def offered_codecs(preferred: List[str] = COMPRESSION_CODECS) -> List[str]:
+    """
+    Returns the preferred codecs this process can use, in the same order
+    """
+    codecs = available_codecs()
+    return [name for name in preferred if name in codecs]
+
+
+def choose_codec(offered: List[str]) -> Optional[Codec]:
+    """
+    Returns the first offered codec this process can use, None if there is none
+    """
+    codecs = available_codecs()
+    for name in offered:
+        if name in codecs:
+            return codecs[name]()
+    return None
+
+
+def codec_for(name: str) -> Optional[Codec]:
+    if not name:
+        return None
+    codec = available_codecs().get(name)
+    if codec is None:
+        raise CompressionError(f"Unknown codec {name}")
+    return codec()
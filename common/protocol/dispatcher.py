@@ -1,7 +1,7 @@
 import logging
+import os
 import socket
-import threading
-from typing import Callable, List, Union, Optional
+from typing import Callable, List, Union, Optional, Type
 
 from common.models.menuitem import MenuItem
 from common.models.model import Model
@@ -13,9 +13,12 @@ from common.models.user import User
 from common.protocol.byte import ByteProtocol
 from common.protocol.signal import SignalProtocol
 from common.protocol.batch import BatchProtocol
+from common.protocol.pipeline import IngestionPipeline, parse_pool
+from common.protocol.sessions import UploadSessions
 
 from middleware.src.join_tasks_middleware import JoinTasksMiddleware
-from middleware.src.routing.csv_message import CSVMessageBuilder, CSVHashedMessageBuilder
+from middleware.src.middleware_pool import MiddlewarePool
+from middleware.src.routing.csv_message import CSVMessageBuilder, CSVHashedMessageBuilder, CSVBytesMessageBuilder, CSVBytesHashedMessageBuilder
 from middleware.src.select_tasks_middleware import SelectTasksMiddleware
 
 from common.utils import new_uuid, QueryId
@@ -25,6 +28,24 @@ class OutMiddleware:
         self.select_middleware = SelectTasksMiddleware()
         self.join_middleware = JoinTasksMiddleware(2)
 
+    def is_healthy(self) -> bool:
+        return self.select_middleware.is_healthy() and self.join_middleware.is_healthy()
+
+    def flush(self) -> None:
+        self.select_middleware.flush()
+        self.join_middleware.flush()
+
+    def close(self) -> None:
+        try:
+            self.select_middleware.close()
+        finally:
+            self.join_middleware.close()
+
+
+# Connections to the broker are kept open between clients, each connection thread leases one.
+OUT_MIDDLEWARE_POOL_IDLE = int(os.getenv("OUT_MIDDLEWARE_POOL_IDLE", "8"))
+OUT_MIDDLEWARE_POOL = MiddlewarePool(OutMiddleware, OUT_MIDDLEWARE_POOL_IDLE)
+
 
 class Counter:
     def __init__(self):
@@ -36,19 +57,20 @@ class Counter:
         self.counter_store = 0
 
 
+UPLOADED_MODELS = (Transaction, TransactionItem, MenuItem, User, Store)
+# Sessions of the multi stream uploads handled by this dispatcher
+UPLOAD_SESSIONS = UploadSessions(UPLOADED_MODELS)
+# Offer clients to send files already projected, see Model.projections
+CLIENT_PROJECTION = os.getenv("CLIENT_PROJECTION", "1") != "0"
+
+
 class DispatcherProtocol:
     def __init__(self, a_socket: socket.socket):
         self._byte_protocol = ByteProtocol(a_socket)
         self._signal_protocol = SignalProtocol(a_socket)
         self._batch_protocol = BatchProtocol(a_socket)
 
-        self._pending_threads = {
-            Transaction: [],
-            TransactionItem: [],
-        }
-
-        self._select_lock = threading.Lock()
-        self.out_middleware = OutMiddleware()
+        self.out_middleware: Optional[OutMiddleware] = None
 
     def close_with(self, closure_to_close: Callable[[socket.socket], None]) -> None:
         """
@@ -56,138 +78,172 @@ class DispatcherProtocol:
         """
         self._byte_protocol.close_with(closure_to_close)
 
-    def _join_pending_threads(self, model: Optional[Model]) -> None:
-        if model in (Transaction, TransactionItem):
-            threads = self._pending_threads.get(model, [])
-            for t in threads:
-                t.join()
-            threads.clear()
+    def handle_requests(self) -> None:
+        # Connections of a multi stream upload share the session opened by the first one.
+        session_id, batch = self._batch_protocol.wait_session_and_raw_batch(
+            Model.projections() if CLIENT_PROJECTION else {}, UPLOAD_SESSIONS.open
+        )
+        if session_id is None:
+            user_id = new_uuid()
+        else:
+            UPLOAD_SESSIONS.join(session_id)
+            user_id = session_id
 
+        counter = Counter()
 
-    def handle_requests(self) -> None:
-        user_id = new_uuid()
+        # Chunks are read here, parsed by the pool and published in order by the pipeline thread.
+        def publish_data(model: Type[Model], payload: bytes, rows: int) -> None:
+            self.__send_task_for(self.__leased_middleware(), user_id, model, payload, rows, counter)
+
+        def publish_eof(model: Type[Model]) -> None:
+            self.__send_EOF_for(self.__leased_middleware(), user_id, model, counter)
+
+        # Blocking connections are not thread safe, the middleware is leased, used and released
+        # by the publisher thread only.
+        def lease() -> None:
+            self.out_middleware = OUT_MIDDLEWARE_POOL.lease()
+
+        def release(failed: bool) -> None:
+            if self.out_middleware is None:
+                return
+            # A client that failed half way may leave the connection unusable, it is not reused.
+            OUT_MIDDLEWARE_POOL.release(self.out_middleware, failed)
+            self.out_middleware = None
+
+        try:
+            pipeline = IngestionPipeline(publish_data, publish_eof, parse_pool(),
+                                         on_publisher_start=lease, on_publisher_end=release)
+            try:
+                self.__read_files(pipeline, batch, session_id)
+            finally:
+                pipeline.close()
+        finally:
+            if session_id is not None:
+                UPLOAD_SESSIONS.leave(session_id)
 
+        self._byte_protocol.send_bytes(user_id.encode())
 
-        #select_middleware = SelectTasksMiddleware()
-        #join_middleware = JoinTasksMiddleware(1)
-        counter = Counter()
-        batch = self._batch_protocol.wait_batch()
-        last_model: Optional[Model] = None
-        
-        while batch: # While files
-            header = batch.pop(0)
-            model = Model.model_for(header)
+    def __leased_middleware(self) -> OutMiddleware:
+        """
+        The middleware leased by the publisher thread, raise if it publishes without one
+        """
+        if self.out_middleware is None:
+            raise RuntimeError("Publishing without a leased out middleware")
+        return self.out_middleware
 
+    def __read_files(self, pipeline: IngestionPipeline, batch: bytes, session_id: Optional[str]) -> None:
+        # Batches are kept as received, each model projects the whole chunk at once.
+        last_model: Optional[Type[Model]] = None
+
+        while batch: # While files
+            header, _, batch = batch.partition(b"\n")
+            batch = batch.strip(b"\n")
+            # Files projected by the client have the projected header, their rows are not parsed again.
+            model = Model.projected_model_for(header)
+            projected = model is not None
+            if not projected:
+                model = Model.model_for(header)
+            if model not in UPLOADED_MODELS:
+                raise Exception(f"Unknown model: {model}")
+
+            if model != last_model and session_id is not None:
+                UPLOAD_SESSIONS.claim(session_id, model) # Other connections of the session can not send it
             if last_model is None:
                 last_model = model # Initialize it
             elif model != last_model:
-                self._join_pending_threads(last_model)
-                self.__send_EOF_for(user_id, last_model, counter)
+                pipeline.end_of(last_model)
                 last_model = model # Only change it If it is new.
 
             logging.info(f"action: receive_file | result: in_progress | data_type: {model.__name__}")
 
             while batch: # While batch of file
-                if model is Transaction:
-                    #self.__send_task_to_select_transaction(user_id, model, batch)
-
-                    self.__send_task_to_select_transaction(user_id, model, batch)
-                    counter.counter_transactions_rows += len(batch)
-                    counter.counter_transactions+=1
-                elif model is TransactionItem:
-                    #self.__send_task_to_select_transaction_item(user_id, model, batch)
-                    self.__send_task_to_select_transaction_item(user_id, model, batch)
-                    counter.counter_transaction_items+=1
-                elif model is MenuItem:
-                    self.__send_task_to_join_menu_item(user_id, model, batch)
-                    counter.counter_menu_items += 1
-                elif model is User:
-                    self.__send_task_to_join_user(user_id, model, batch)
-                    counter.counter_user += 1
-                elif model is Store:
-                    self.__send_task_to_join_store(user_id, model, batch)
-                    counter.counter_store += 1
-                else:
-                    raise Exception(f"Unknown model: {model}")
-
-                batch = self._batch_protocol.wait_batch() # End of batch
-            batch = self._batch_protocol.wait_batch() # End of file
-
-        self._join_pending_threads(last_model)
-        # Allegedly not sent eof for very last model. 
-        self.__send_EOF_for(user_id, last_model, counter)
+                pipeline.submit(model, batch, projected)
+                batch = self._batch_protocol.wait_raw_batch() # End of batch
+            batch = self._batch_protocol.wait_raw_batch() # End of file
 
-        self._byte_protocol.send_bytes(user_id.encode())
+        # Allegedly not sent eof for very last model. 
+        if last_model is not None: # None If no file was uploaded
+            pipeline.end_of(last_model)
 
-    def __send_task_to_select_transaction(self, user_id: str, model: Transaction, batch: List[bytes]) -> None:
-        transaction_task = CSVMessageBuilder.with_credentials([user_id], ["transactions"])
+    def __send_task_for(self, out_middleware: OutMiddleware, user_id: str, model: Type[Model], payload: bytes, rows: int, counter: Counter) -> None:
+        if model is Transaction:
+            self.__send_task_to_select_transaction(out_middleware, user_id, payload, rows)
+            counter.counter_transactions_rows += rows
+            counter.counter_transactions+=1
+        elif model is TransactionItem:
+            self.__send_task_to_select_transaction_item(out_middleware, user_id, payload, rows)
+            counter.counter_transaction_items+=1
+        elif model is MenuItem:
+            self.__send_task_to_join_menu_item(out_middleware, user_id, payload, rows)
+            counter.counter_menu_items += 1
+        elif model is User:
+            self.__send_task_to_join_user(out_middleware, user_id, payload, rows)
+            counter.counter_user += 1
+        elif model is Store:
+            self.__send_task_to_join_store(out_middleware, user_id, payload, rows)
+            counter.counter_store += 1
 
-        for line in batch:
-            transaction_task.add_row_bytes(model.parse_row(line))
-        self.out_middleware.select_middleware.send(transaction_task)
+    def __send_task_to_select_transaction(self, out_middleware: OutMiddleware, user_id: str, payload: bytes, rows: int) -> None:
+        transaction_task = CSVBytesMessageBuilder.with_credentials([user_id], ["transactions"])
+        transaction_task.add_payload_bytes(payload, rows)
+        out_middleware.select_middleware.send(transaction_task)
 
 
-    def __send_task_to_select_transaction_item(self, user_id: str, model: TransactionItem, batch: List[bytes]) -> None:
-        transaction_item_task = CSVMessageBuilder.with_credentials([user_id], ["query_2"])
-        for line in batch:
-            transaction_item_task.add_row_bytes(model.parse_row(line))
+    def __send_task_to_select_transaction_item(self, out_middleware: OutMiddleware, user_id: str, payload: bytes, rows: int) -> None:
+        transaction_item_task = CSVBytesMessageBuilder.with_credentials([user_id], ["query_2"])
+        transaction_item_task.add_payload_bytes(payload, rows)
 
         #logging.info(f"-->Sending len transaction item {transaction_item_task.len_payload()}")
-        self.out_middleware.select_middleware.send(transaction_item_task)
+        out_middleware.select_middleware.send(transaction_item_task)
 
     
-    def __send_task_to_join_menu_item(self, user_id: str, model: MenuItem, batch: List[bytes]) -> None:
-        menu_item_task = CSVHashedMessageBuilder.with_credentials([user_id], ["query_product_names"], user_id)
-        for line in batch:
-            menu_item_task.add_row_bytes(model.parse_row(line))
-        self.out_middleware.join_middleware.send(menu_item_task)
+    def __send_task_to_join_menu_item(self, out_middleware: OutMiddleware, user_id: str, payload: bytes, rows: int) -> None:
+        menu_item_task = CSVBytesHashedMessageBuilder.with_credentials([user_id], ["query_product_names"], user_id)
+        menu_item_task.add_payload_bytes(payload, rows)
+        out_middleware.join_middleware.send(menu_item_task)
 
     
-    def __send_task_to_join_user(self, user_id: str, model: User,
-                                  batch: List[bytes]) -> None:
-        user_task = CSVHashedMessageBuilder.with_credentials([user_id], ["query_users"], user_id)
-        for line in batch:
-            user_task.add_row_bytes(model.parse_row(line))
-            
-        self.out_middleware.join_middleware.send(user_task)
+    def __send_task_to_join_user(self, out_middleware: OutMiddleware, user_id: str, payload: bytes, rows: int) -> None:
+        user_task = CSVBytesHashedMessageBuilder.with_credentials([user_id], ["query_users"], user_id)
+        user_task.add_payload_bytes(payload, rows)
+
+        out_middleware.join_middleware.send(user_task)
 
     
-    def __send_task_to_join_store(self, user_id: str, model: Store, batch: List[bytes]) -> None:
-        store_task = CSVHashedMessageBuilder.with_credentials([user_id], ["query_store_names"], user_id)
-        for line in batch:
-            store: Store = model.from_bytes_and_project(line)
-            store_task.add_row_bytes(model.parse_row(line))
-        self.out_middleware.join_middleware.send(store_task)
+    def __send_task_to_join_store(self, out_middleware: OutMiddleware, user_id: str, payload: bytes, rows: int) -> None:
+        store_task = CSVBytesHashedMessageBuilder.with_credentials([user_id], ["query_store_names"], user_id)
+        store_task.add_payload_bytes(payload, rows)
+        out_middleware.join_middleware.send(store_task)
 
     
-    def __send_EOF_for(self, user_id: str, model: Model, counter: Counter):
+    def __send_EOF_for(self, out_middleware: OutMiddleware, user_id: str, model: Type[Model], counter: Counter) -> None:
         if model is Transaction:
             logging.info(f"EOF FOR TRANSACTIONS sent message count {counter.counter_transactions}  rows sent: {counter.counter_transactions_rows}")
             eof_task = CSVMessageBuilder.with_credentials([user_id, user_id, user_id],
                                          ["query_1", "query_3", "query_4"])
             eof_task.set_as_eof(count= counter.counter_transactions) # If set as 0 assumes all messages were sent. Since it checks if msg received < expected. If it is > then fine
-            self.out_middleware.select_middleware.send(eof_task)
+            out_middleware.select_middleware.send(eof_task)
         elif model is TransactionItem:
             logging.info(f"EOF FOR TRANSACTIONS_ITEMS sent message count {counter.counter_transaction_items}")
             eof_task = CSVMessageBuilder.with_credentials([user_id],
                                          ["query_2"])
             eof_task.set_as_eof(counter.counter_transaction_items)
-            self.out_middleware.select_middleware.send(eof_task)
+            out_middleware.select_middleware.send(eof_task)
 
         elif model is MenuItem:
             logging.info(f"EOF FOR MENU_ITEMS message count {counter.counter_menu_items}")
             eof_product_task = CSVHashedMessageBuilder.with_credentials([user_id], ["query_product_names"], user_id)
             eof_product_task.set_as_eof(counter.counter_menu_items)
-            self.out_middleware.join_middleware.send(eof_product_task)
+            out_middleware.join_middleware.send(eof_product_task)
     
         elif model is User:
             logging.info(f"EOF FOR USER message count {counter.counter_user}")
             eof_user_task = CSVHashedMessageBuilder.with_credentials([user_id], ["query_users"], user_id)
             eof_user_task.set_as_eof(counter.counter_user)
-            self.out_middleware.join_middleware.send(eof_user_task)
+            out_middleware.join_middleware.send(eof_user_task)
 
         elif model is Store:
             logging.info(f"EOF FOR STORES message count {counter.counter_store}")
             eof_store_task = CSVHashedMessageBuilder.with_credentials([user_id], ["query_store_names"], user_id)
             eof_store_task.set_as_eof(counter.counter_store)
-            self.out_middleware.join_middleware.send(eof_store_task)
\ No newline at end of file
+            out_middleware.join_middleware.send(eof_store_task)
\ No newline at end of file
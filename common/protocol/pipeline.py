@@ -0,0 +1,143 @@
+import os
+import queue
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Optional, Tuple, Type
+
+from common.models.model import Model
+
+# Processes parsing the received chunks, shared by every connection of the dispatcher.
+# 0 parses on the publisher thread, still overlapped with the socket reads.
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))
+# Chunks read ahead of the publisher, the reader blocks when it is full.
+PIPELINE_DEPTH = int(os.getenv("PIPELINE_DEPTH", "8"))
+
+_DATA = 0
+_EOF = 1
+_END = 2
+_PROJECTED = 3
+
+_parse_pool: Optional[Executor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def parse_pool() -> Optional[Executor]:
+    """
+    Returns the parser process pool, created on first use. None if PARSE_WORKERS is 0
+    Spawned instead of forked, the dispatcher has threads and open broker connections by then
+    """
+    global _parse_pool
+    if PARSE_WORKERS <= 0:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=get_context("spawn"))
+        return _parse_pool
+
+
+def parse_chunk(model: Type[Model], batch: bytes) -> Tuple[bytes, int]:
+    return model.parse_batch(batch)
+
+
+class IngestionPipeline:
+    """
+    Reader -> parser pool -> publisher stages of a connection
+
+    The reader submits chunks and end of files in the order they were received, the publisher
+    handles them in that same order, so message counts are final when an eof is published
+    on_publisher_start and on_publisher_end(failed) run on the publisher thread before its first
+    and after its last publish, eg. to lease and release the connection it publishes on
+    """
+
+    def __init__(
+        self,
+        publish_data: Callable[[Type[Model], bytes, int], None],
+        publish_eof: Callable[[Type[Model]], None],
+        pool: Optional[Executor] = None,
+        depth: int = PIPELINE_DEPTH,
+        on_publisher_start: Optional[Callable[[], None]] = None,
+        on_publisher_end: Optional[Callable[[bool], None]] = None,
+    ) -> None:
+        self._publish_data = publish_data
+        self._publish_eof = publish_eof
+        self._pool = pool
+        self._on_publisher_start = on_publisher_start
+        self._on_publisher_end = on_publisher_end
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, depth))
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._publisher = threading.Thread(target=self.__run_publisher, daemon=True)
+        self._publisher.start()
+
+    def submit(self, model: Type[Model], batch: bytes, projected: bool = False) -> None:
+        """
+        Queue a chunk of the given model, blocks while the publisher is PIPELINE_DEPTH chunks behind
+        Projected chunks were already parsed by the client, they are only validated and published as received
+        """
+        self.__raise_if_failed()
+        if projected:
+            self._queue.put((_PROJECTED, model, batch))
+        elif self._pool is None:
+            self._queue.put((_DATA, model, batch))
+        else:
+            self._queue.put((_DATA, model, self._pool.submit(parse_chunk, model, batch)))
+
+    def end_of(self, model: Type[Model]) -> None:
+        """
+        Queue the eof of a model, published after all its chunks
+        """
+        self.__raise_if_failed()
+        self._queue.put((_EOF, model, None))
+
+    def close(self) -> None:
+        """
+        Wait until everything queued was published
+        Raise the error of the publisher if it failed
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((_END, None, None))
+        self._publisher.join()
+        self.__raise_if_failed()
+
+    def __raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def __run_publisher(self) -> None:
+        try:
+            if self._on_publisher_start is not None:
+                self._on_publisher_start()
+        except BaseException as e:
+            self._error = e # Nothing is published, the queue is still drained
+        self.__publish_loop()
+        try:
+            if self._on_publisher_end is not None:
+                self._on_publisher_end(self._error is not None)
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+
+    def __publish_loop(self) -> None:
+        while True:
+            kind, model, item = self._queue.get()
+            if kind == _END:
+                return
+            if self._error is not None:
+                if kind == _DATA and self._pool is not None:
+                    item.cancel()
+                continue # Keep draining so the reader does not block
+
+            try:
+                if kind == _EOF:
+                    self._publish_eof(model)
+                    continue
+                if kind == _PROJECTED:
+                    self._publish_data(model, item, model.count_projected_rows(item))
+                    continue
+                payload, rows = item.result() if self._pool is not None else parse_chunk(model, item)
+                self._publish_data(model, payload, rows)
+            except BaseException as e:
+                self._error = e
@@ -1,11 +1,10 @@
 import logging
 import socket
-from io import BufferedReader
 from typing import Callable, List
 
 from .byte import ByteProtocol
 from .signal import SignalProtocol
-from .batch import BatchProtocol
+from .batch import BatchProtocol, Reader
 
 class ResultsProtocol:
     def __init__(self, a_socket: socket.socket) -> None:
@@ -21,18 +20,30 @@ class ResultsProtocol:
 
     def handle_requests(
             self,
-            assert_exists: Callable[[str], None],
-            do_with_results_when_ready: Callable[[str, Callable[[BufferedReader], None]], None]
+            subscribe: Callable[[str], None],
+            do_with_results_as_ready: Callable[[str, Callable[[str, Reader, bool], None]], None]
     ) -> None:
+        """
+        Receives a client_id and pushes each part of the result files as soon as it is available:
+        the file name (as bytes), whether it is the last part of the file (uint8), its batches and an empty batch
+        Files are a single part sent once their query is ready, streamed queries are sent in parts
+        while their rows arrive, interleaved with the others. An empty file name ends the results
+        """
         client_id = self._byte_protocol.wait_bytes().decode("utf-8")
+        self._batch_protocol.accept_compression()
         try:
-            assert_exists(client_id)
+            subscribe(client_id)
             self._signal_protocol.send_ack()
-            do_with_results_when_ready(client_id, self._send_in_batches_and_eof)
         except Exception as err:
             self._signal_protocol.send_error(str(err))
+            return
+
+        do_with_results_as_ready(client_id, self._send_part)
+        self._byte_protocol.send_bytes(b"")
 
 
-    def _send_in_batches_and_eof(self, reader: BufferedReader) -> None:
+    def _send_part(self, file_name: str, reader: Reader, last: bool) -> None:
+        self._byte_protocol.send_bytes(file_name.encode("utf-8"))
+        self._byte_protocol.send_uint8(1 if last else 0)
         self._batch_protocol.send_all(reader)
-        self._batch_protocol.send_batch([])
\ No newline at end of file
+        self._batch_protocol.send_batch([])
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Set
+
+from common.utils import is_uuid, new_uuid
+
+# Sessions without connections are forgotten after it, joining them fails from then on
+SESSION_TTL_S = float(os.getenv("SESSION_TTL_S", "3600"))
+
+
+class SessionError(ValueError):
+    pass
+
+
+class _Session:
+    def __init__(self, now: float) -> None:
+        self.models: Set[type] = set()  # Models already uploaded, or being uploaded
+        self.connections = 0
+        self.last_seen = now
+
+
+class UploadSessions:
+    """
+    Sessions of multi stream uploads, the session id is the client id of all its connections
+
+    Session ids are issued by this dispatcher, a client can not choose one, so only the client
+    that opened a session can join it. Each model of a session is uploaded by a single connection,
+    a session with every model uploaded can not be joined and is forgotten when its last connection ends
+    """
+
+    def __init__(self, models: Iterable[type], ttl_s: float = SESSION_TTL_S,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self._models = frozenset(models)
+        self._ttl_s = ttl_s
+        self._clock = clock
+        self._sessions: Dict[str, _Session] = {}
+        self._lock = threading.Lock()
+
+    def open(self) -> str:
+        """
+        Issue a new session id, the connection that asked for it joins it afterwards
+        """
+        session_id = new_uuid()
+        with self._lock:
+            self.__expire()
+            self._sessions[session_id] = _Session(self._clock())
+        return session_id
+
+    def join(self, session_id: str) -> None:
+        """
+        Raise SessionError if the session was not issued here, expired or has every model uploaded
+        """
+        if not is_uuid(session_id):
+            raise SessionError(f"Invalid session id: {session_id!r}")
+        with self._lock:
+            self.__expire()
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise SessionError(f"Unknown or finished session: {session_id}")
+            if session.models >= self._models:
+                raise SessionError(f"Session {session_id} has every file uploaded")
+            session.connections += 1
+            session.last_seen = self._clock()
+
+    def claim(self, session_id: str, model: type) -> None:
+        """
+        Mark the model as uploaded by the calling connection
+        Raise SessionError if another connection of the session already uploads it
+        """
+        with self._lock:
+            session = self._sessions[session_id]
+            if model in session.models:
+                raise SessionError(f"Session {session_id} already uploads {model.__name__}")
+            session.models.add(model)
+
+    def leave(self, session_id: str) -> None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session.connections -= 1
+            session.last_seen = self._clock()
+            if session.connections == 0 and session.models >= self._models:
+                del self._sessions[session_id]  # Finished
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __expire(self) -> None:
+        now = self._clock()
+        expired = [
+            session_id for session_id, session in self._sessions.items()
+            if session.connections == 0 and now - session.last_seen > self._ttl_s
+        ]
+        for session_id in expired:
+            del self._sessions[session_id]
@@ -14,6 +14,15 @@ from common.results.query4 import QueryResult4
 def new_uuid() -> str:
     return str(uuid.uuid4())
 
+def is_uuid(value: str) -> bool:
+    """
+    Whether the value is a uuid in the canonical form given by new_uuid, eg. safe to use as a path
+    """
+    try:
+        return str(uuid.UUID(value)) == value
+    except ValueError:
+        return False
+
 class QueryId(str, Enum):
     Query1 = "1"
     Query2BestSelling = "2BS"
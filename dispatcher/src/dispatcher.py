@@ -5,7 +5,7 @@ import threading
 from types import FrameType
 from typing import List, Optional, Tuple
 
-from common.protocol.dispatcher import DispatcherProtocol
+from common.protocol.dispatcher import DispatcherProtocol, OUT_MIDDLEWARE_POOL
 
 
 class DispatcherServer:
@@ -59,12 +59,14 @@ class DispatcherServer:
         On a signal, gracefully shutdown the server
 
         Stops the main loop and closes the server socket finally close and join the clients
+        and close the pooled middleware connections
         """
         self._was_stopped = True
         self.__try_close(self._server_socket, "server_socket")
         for client_thread, client_socket in self._clients:
             self.__try_close(client_socket, "client_socket")
             client_thread.join()
+        OUT_MIDDLEWARE_POOL.close()
         logging.info("action: exit | result: success")
 
     def __handle_client_connection(self, client_socket: socket.socket) -> None:
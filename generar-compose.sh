@@ -40,6 +40,7 @@ echo "  results:
     environment:
       - PYTHONUNBUFFERED=1
       - DIR_PATH=/storage
+      - PREFETCH_COUNT=16
     networks:
       - testing_net
     depends_on:
@@ -122,6 +123,7 @@ for ((i=1; i<=result_node_number; i++)); do
     entrypoint: python3 /resultnode/main.py
     environment:
       - RESULT_NODE_ID=$i
+      - PREFETCH_COUNT=8
     networks:
       - testing_net
     depends_on:
@@ -142,6 +144,8 @@ for ((i=1; i<=select_node_number; i++)); do
       - SELECT_NODE_ID=$i
       - GROUPBY_NODE_COUNT=1
       - JOIN_NODE_COUNT=1
+      - PREFETCH_COUNT=16
+      - ACK_BATCH_MSGS=8
     networks:
       - testing_net
     depends_on:
@@ -161,6 +165,8 @@ echo "  groupbynode1:
       - NODE_IND=0
       - NODE_COUNT=1
       - JOIN_NODE_COUNT=1
+      - PREFETCH_COUNT=8
+      - PREFETCH_ADAPTIVE=1
     networks:
       - testing_net
     depends_on:
@@ -179,6 +185,8 @@ echo "  joinnode1:
       - NODE_IND=0
       - NODE_COUNT=1
       - NODE_ID=0
+      - PREFETCH_COUNT=8
+      - PREFETCH_ADAPTIVE=1
     networks:
       - testing_net
     depends_on:
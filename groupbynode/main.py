@@ -14,6 +14,7 @@ from middleware.groupby_middleware import *
 from middleware.join_tasks_middleware import * 
 
 
+from common.config.type_expander import flush_outputs_of
 from src.groupbynode import GroupbyNode 
 from src.groupby_initialize import * 
 from src.topk_initialize import * 
@@ -105,13 +106,17 @@ def main() -> None:
 
         #types_config_groupby = configure_types_groupby(join_middleware, topk_middleware)
         types_config_groupby = configure_types_groupby(
-                join_middleware, topk_middleware, topk_middleware_type = HashedMemoryMessageBuilder)
+                join_middleware, topk_middleware, topk_middleware_type = HashedMemoryMessageBuilder,
+                node_ind = node_ind, node_count = node_count)
 
         # In memory it doesnt actually connect to network nor block for messeging
         types_config_topk = configure_types_topk(join_middleware)
         node_topk = GroupbyNode(topk_middleware, MemoryMessage, types_config_topk)
         node_topk.start()
 
+        # Outputs are sent before inputs are acked, the in memory topk node sends to the same join middleware.
+        middleware_group.set_before_ack(lambda: flush_outputs_of(
+            list(types_config_groupby.values()) + list(types_config_topk.values())))
         node = GroupbyNode(middleware_group, CSVMessage, types_config_groupby)
 
         def close_handler(sig, frame):
@@ -13,6 +13,7 @@ from middleware.topk_middleware import *
 from middleware.routing.csv_message import CSVMessage
 
 
+from common.config.type_expander import flush_outputs_of
 from src.groupbynode import GroupbyNode 
 from src.groupby_initialize import * 
 
@@ -105,8 +106,10 @@ def main() -> None:
         join_middleware = JoinTasksMiddleware(join_node_count)
         middleware_group = GroupbyTasksMiddleware(node_count, ind = node_ind)
 
-        types_config_groupby = configure_types_groupby(join_middleware, topk_middleware)
+        types_config_groupby = configure_types_groupby(join_middleware, topk_middleware, node_ind = node_ind, node_count = node_count)
 
+        # Outputs are sent before inputs are acked
+        middleware_group.set_before_ack(lambda: flush_outputs_of(types_config_groupby.values()))
         node = GroupbyNode(middleware_group, CSVMessage, types_config_groupby)
 
         restart = True
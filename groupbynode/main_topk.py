@@ -9,6 +9,7 @@ from middleware.result_node_middleware import *
 from middleware.join_tasks_middleware import * 
 
 
+from common.config.type_expander import flush_outputs_of
 from src.groupbynode import GroupbyNode 
 from src.topk_initialize import * 
 from middleware.topk_middleware import * 
@@ -100,6 +101,8 @@ def main() -> None:
 
         types_config_topk = configure_types_topk(join_middleware)
         
+        # Outputs are sent before inputs are acked
+        topk_middleware.set_before_ack(lambda: flush_outputs_of(types_config_topk.values()))
         node = GroupbyNode(topk_middleware, CSVMessage, types_config_topk)
 
         restart = True
@@ -17,7 +17,7 @@ def create_diverged_message_memory(msg, ind):
 
 
 
-def configure_types_groupby(join_middleware, topk_middleware, topk_middleware_type = CSVHashedMessageBuilder):
+def configure_types_groupby(join_middleware, topk_middleware, topk_middleware_type = CSVHashedMessageBuilder, node_ind = 0, node_count = 1):
     types_config = {}
 
     types_config[QUERY_2] = GroupbyTypeConfiguration(topk_middleware, 
@@ -39,12 +39,14 @@ def configure_types_groupby(join_middleware, topk_middleware, topk_middleware_ty
                 #[COUNT_ACTION, "transaction_count"],
             ]],
             out_conf={ROW_CONFIG_OUT_COLS: ["store_id","mapped_semester", "tpv"]},
+            # Select node partitions q3 rows by group key, so each store/semester is in a single groupby node.
+            key_partition = (int(node_ind), int(node_count)),
     )
 
     types_config[QUERY_4] = GroupbyTypeConfiguration(topk_middleware, topk_middleware_type.simple_creator(),
-            in_fields= ["store_id", "user_id"],
+            in_fields= ["store_id", "user_id", "purchase_count"], # Partial counts from select node combiner
             grouping_conf= [["store_id", "user_id"], [
-                [COUNT_ACTION,"purchase_count"] 
+                [COUNT_MERGE_ACTION,"purchase_count"] 
             ]],
             out_conf={ROW_CONFIG_OUT_COLS: ["store_id","user_id", "purchase_count"]},
     )
@@ -2,17 +2,30 @@
 from common.config.row_mapping import DictConvertWrapperMapper,NoActionRowMapper, ROW_CONFIG_OUT_COLS
 
 #from .row_grouping import load_grouper
-from .row_aggregate import RowAggregator
+from .row_aggregate import RowAggregator, COUNT_ACTION, ACTION_OP, ACTION_COL_IN, ACTION_COL_OUT
 from .row_key_parsing import *
 import logging
 
 GROUPED_KEY_FIELDS = 0
 GROUPED_FIELDS_ACTIONS = 1
 
+# Same actions but reading input columns by position, so rows can be aggregated without converting them to dict.
+def map_actions_to_index(in_fields, group_actions):
+	res = []
+	for action in group_actions:
+		if action[ACTION_OP] == COUNT_ACTION:
+			res.append(action) # Count col is the out col, not read from the row.
+			continue
+		col_out = action[ACTION_COL_OUT] if len(action)>2 else action[ACTION_COL_IN]
+		res.append([action[ACTION_OP], in_fields.index(action[ACTION_COL_IN]), col_out])
+	return res
+
 class GroupbyTypeConfiguration:
-	def __init__(self, out_middleware, builder_creator, in_fields, grouping_conf, out_conf=None):
+	def __init__(self, out_middleware, builder_creator, in_fields, grouping_conf, out_conf=None, key_partition=None):
 		self.middleware = out_middleware
 		self.new_builder_for = builder_creator
+		# (node_ind, node_count) If input rows are partitioned by group key between all groupby nodes.
+		self.key_partition = key_partition
 
 		self.mapper = DictConvertWrapperMapper(
 			in_fields, NoActionRowMapper(), out_conf[ROW_CONFIG_OUT_COLS]
@@ -21,6 +34,10 @@ class GroupbyTypeConfiguration:
 		self.key_parser = KeyGroupParser(grouping_conf[GROUPED_KEY_FIELDS])
 		self.grouper = RowAggregator(grouping_conf[GROUPED_FIELDS_ACTIONS])
 
+		# Columnar aggregation directly over the received vector rows.
+		self.vec_key_parser = KeyGroupParser([in_fields.index(field) for field in grouping_conf[GROUPED_KEY_FIELDS]])
+		self.vec_grouper = RowAggregator(map_actions_to_index(in_fields, grouping_conf[GROUPED_FIELDS_ACTIONS]))
+
 	def map_input_row(self, row):
 		return self.mapper.map_input(row)
 
@@ -30,6 +47,30 @@ class GroupbyTypeConfiguration:
 		
 		msg_builder.add_row(self.mapper.project_out(base))
 
+	# Count for the eof sent after the single data message, None If this node should not send it.
+	def eof_msg_count(self):
+		if self.key_partition == None:
+			return 1
+		node_ind, node_count = self.key_partition
+		# Every partition sends its data message, only the first one sends the eof counting all of them.
+		return node_count if node_ind == 0 else None
+
+	def new_groups(self):
+		return self.vec_grouper.new_columns()
+
+	def add_row_to(self, groups, row):
+		self.vec_grouper.add_row_columns(groups, self.vec_key_parser.get_group_key(row), row)
+
+	# Whole message at once, rows must be a list since each column is read in its own pass.
+	def add_rows_to(self, groups, rows):
+		self.vec_grouper.add_rows_columns(groups, self.vec_key_parser.get_group_keys(rows), rows)
+
+	def add_outputs(self, msg_builder, groups):
+		for gid, group_key in groups.items():
+			base = self.key_parser.get_base_key(group_key)
+			self.vec_grouper.add_aggregated_columns_to(base, groups, gid)
+			msg_builder.add_row(self.mapper.project_out(base))
+
 
 	def send(self, builder):
 		logging.info(f"GROUPBY SENDING TO {builder.headers.types} {builder.headers.ids} len: {builder.len_payload()} eof? {builder.headers.is_eof()}")
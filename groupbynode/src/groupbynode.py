@@ -1,5 +1,6 @@
 #from .type_config import TypeConfiguration
 import logging
+from middleware.routing.columnar_message import deserialize_with
 
 
 
@@ -7,34 +8,27 @@ class QueryAccumulator:
 	def __init__(self, type_conf, msg_builder):
 		self.type_conf = type_conf
 		self.msg_builder = msg_builder
-		self.groups = {}
+		self.groups = type_conf.new_groups() # State of all groups, layout depends on the type config
 		self.messages_received=0
 		self.known_message_len= -1
 		self.rows_recv = 0
 		self.msg_builder.reset_eof() # Ensure its not copying the eof flag from input sender
 
-	def check(self, row):
-		self.rows_recv+=1
-		row = self.type_conf.map_input_row(row)
-		key = self.type_conf.key_parser.get_group_key(row)
-
-		acc = self.groups.get(key, None)
-		if acc == None:
-			acc = self.type_conf.grouper.new_group_acc(row)
-			self.groups[key] = acc
-		else:
-			self.type_conf.grouper.add_group_acc(acc, row)
-			#acc.add_row(row) # Better in design? who knows
-		#print(f"{self.msg_builder.headers.types} HANDLED ", key, row,  acc)
+	def check_batch(self, rows):
+		self.rows_recv+=len(rows)
+		self.type_conf.add_rows_to(self.groups, rows)
 
 	def send_built(self): # What happens If the groupbynode fails here/shutdowns here?
-		for group, acc in self.groups.items():
-			self.type_conf.add_output(self.msg_builder, group, acc)
+		self.type_conf.add_outputs(self.msg_builder, self.groups)
 
-		logging.info(f"Grouper node sending EOF rows processed {self.rows_recv} msg sent 1")
 		self.type_conf.send(self.msg_builder)
+		eof_count = self.type_conf.eof_msg_count()
+		if eof_count == None:
+			logging.info(f"Grouper node sent partition result rows processed {self.rows_recv}, eof is sent by first partition")
+			return
+		logging.info(f"Grouper node sending EOF rows processed {self.rows_recv} msg sent {eof_count}")
 		eof_signal = self.msg_builder.clone()
-		eof_signal.set_as_eof(1)
+		eof_signal.set_as_eof(eof_count)
 		self.type_conf.send(eof_signal)
 
 	def len_grouped(self):
@@ -42,9 +36,9 @@ class QueryAccumulator:
 
 	def describe(self):
 		if len(self.groups) < 100:
-			logging.info(f"curr status accumulator topk len {self.groups}:")
-			for group, acc in self.groups.items():
-				logging.info(f"key {group} acc : {acc}")
+			logging.info(f"curr status accumulator len {len(self.groups)}:")
+			for group in self.groups.items():
+				logging.info(f"group {group}")
 
 	def add_msg_count(self):
 		self.messages_received+=1
@@ -107,7 +101,7 @@ class GroupbyNode:
 			
 			return
 			
-		msg = self.payload_deserializer(msg)
+		msg = deserialize_with(headers, msg, self.payload_deserializer)
 		outputs = []
 		for new_headers in headers.split():
 			q_type = new_headers.types[0]
@@ -122,9 +116,9 @@ class GroupbyNode:
 				self.accumulators[query_id] = acc
 			outputs.append(acc)
 
-		for row in msg.stream_rows():
-			for output in outputs:
-				output.check(row)
+		rows = list(msg.stream_rows()) # Payload is a stream, read it once for all outputs.
+		for output in outputs:
+			output.check_batch(rows)
 
 		for ind, acc in enumerate(outputs):
 			if acc.add_msg_count():
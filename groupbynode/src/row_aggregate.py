@@ -1,9 +1,11 @@
-
+from array import array
+from operator import itemgetter
 
 SUM_ACTION = "sum"
 AVG_ACTION = "avg"
 MAX_ACTION = "max"
 COUNT_ACTION = "count"
+COUNT_MERGE_ACTION = "count_merge" # Sums partial counts, eg counted by a select node combiner
 
 class CountAction:
 	def new(self): # By default it doesnt do anything? just return 1
@@ -23,6 +25,16 @@ class SumAction:
 	def get_result(self, acc):
 		return acc
 
+	# Columnar state, one float per group in column
+	col_identity = 0.0
+	def col_add(self, column, gid, value):
+		column[gid]+= float(value)
+	def col_reduce(self, column, gids, values): # Whole batch, values already parsed
+		for gid, value in zip(gids, values):
+			column[gid]+= value
+	def col_result(self, column, gid, count):
+		return column[gid]
+
 class MaxAction:
 	def new(self, value):
 		return float(value)
@@ -33,6 +45,18 @@ class MaxAction:
 	def get_result(self, acc):
 		return acc
 
+	col_identity = float("-inf")
+	def col_add(self, column, gid, value):
+		value = float(value)
+		if value > column[gid]:
+			column[gid] = value
+	def col_reduce(self, column, gids, values):
+		for gid, value in zip(gids, values):
+			if value > column[gid]:
+				column[gid] = value
+	def col_result(self, column, gid, count):
+		return column[gid]
+
 
 class AvgAction:
 	def new(self, value):
@@ -47,10 +71,38 @@ class AvgAction:
 	def get_result(self, acc):
 		return acc[1]
 
+	# Columnar avg keeps only the sum, count is the group row count.
+	col_identity = 0.0
+	def col_add(self, column, gid, value):
+		column[gid]+= float(value)
+	def col_reduce(self, column, gids, values):
+		for gid, value in zip(gids, values):
+			column[gid]+= value
+	def col_result(self, column, gid, count):
+		return column[gid]/count
+
+class CountMergeAction:
+	def new(self, value):
+		return int(value)
+	def add_value(self, acc, value):
+		return acc+int(value)
+	def get_result(self, acc):
+		return acc
+
+	col_identity = 0.0
+	def col_add(self, column, gid, value):
+		column[gid]+= float(value)
+	def col_reduce(self, column, gids, values):
+		for gid, value in zip(gids, values):
+			column[gid]+= value
+	def col_result(self, column, gid, count):
+		return int(column[gid])
+
 NUMBER_ACTIONS = {
 	SUM_ACTION: SumAction,
 	MAX_ACTION: MaxAction,
 	AVG_ACTION: AvgAction,
+	COUNT_MERGE_ACTION: CountMergeAction,
 }
 
 
@@ -108,4 +160,65 @@ class RowAggregator:
 
 	# Expands to a list of rows, this only throws one row, the aggregate result, but its better if it has the same contract as row grouping
 	def iterate_rows(self, acc):
-		return iter([acc]) # acc is the list of rows basically
\ No newline at end of file
+		return iter([acc]) # acc is the list of rows basically
+
+	def new_columns(self):
+		return GroupColumns([action.col_identity for _, action, _ in self.group_actions])
+
+	# Columnar mode, group state lives in typed columns indexed by the group dense id.
+	def add_row_columns(self, groups, key, row):
+		gid = groups.gid_for(key)
+		groups.counts[gid]+= 1
+		for ind, (col_in, action, _) in enumerate(self.group_actions):
+			action.col_add(groups.columns[ind], gid, row[col_in])
+
+	# Batch mode, rows is a list. Keys are resolved once, then each column is parsed in one pass and reduced by gid.
+	def add_rows_columns(self, groups, keys, rows):
+		ids = groups.ids
+		gids = array("q", [ids[key] if key in ids else groups.new_group(key) for key in keys])
+		counts = groups.counts
+		for gid in gids:
+			counts[gid]+= 1
+
+		for ind, (col_in, action, _) in enumerate(self.group_actions):
+			values = array("d", map(float, map(itemgetter(col_in), rows)))
+			action.col_reduce(groups.columns[ind], gids, values)
+
+	def add_aggregated_columns_to(self, base, groups, gid):
+		count = groups.counts[gid]
+		for field in self.count_out_fields:
+			base[field] = count
+		for ind, (_, action, col_out) in enumerate(self.group_actions):
+			base[col_out] = action.col_result(groups.columns[ind], gid, count)
+
+
+# Groups interned to dense ids, keys kept in arrival order.
+# Counts are shared by every count action and by avg, each other action has its own float column.
+class GroupColumns:
+	def __init__(self, identities):
+		self.ids = {}
+		self.keys = []
+		self.counts = array("q")
+		self.identities = identities # Initial value of each column, sum 0 max -inf
+		self.columns = [array("d") for _ in identities]
+
+	def __len__(self):
+		return len(self.keys)
+
+	def new_group(self, key):
+		gid = len(self.keys)
+		self.ids[key] = gid
+		self.keys.append(key)
+		self.counts.append(0)
+		for column, identity in zip(self.columns, self.identities):
+			column.append(identity)
+		return gid
+
+	def gid_for(self, key):
+		gid = self.ids.get(key, None)
+		if gid == None:
+			return self.new_group(key)
+		return gid
+
+	def items(self):
+		return enumerate(self.keys) # (gid, key)
\ No newline at end of file
@@ -1,3 +1,5 @@
+from operator import itemgetter
+
 ### Simple key parsing
 class KeyGroupParser:
 	def __init__(self, fields_key):
@@ -11,6 +13,12 @@ class KeyGroupParser:
 
 		return tuple(key) 
 
+	def get_group_keys(self, rows):
+		if len(self.fields_key) == 1: # itemgetter of one field does not return a tuple
+			field = self.fields_key[0]
+			return [(row[field],) for row in rows]
+		return list(map(itemgetter(*self.fields_key), rows))
+
 	def get_base_key(self, key):
 		base = {}
 		ind = 0
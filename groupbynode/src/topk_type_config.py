@@ -27,6 +27,31 @@ class TopKTypeConfiguration:
 		for row in self.grouper.iterate_rows(acc):
 			msg_builder.add_row(self.mapper.project_out(row))
 
+	def eof_msg_count(self):
+		return 1
+
+	# Top k keeps rows per group, state is a dict of group key -> grouper acc.
+	def new_groups(self):
+		return {}
+
+	def add_row_to(self, groups, row):
+		row = self.map_input_row(row)
+		key = self.key_parser.get_group_key(row)
+
+		acc = groups.get(key, None)
+		if acc == None:
+			groups[key] = self.grouper.new_group_acc(row)
+		else:
+			self.grouper.add_group_acc(acc, row)
+
+	def add_rows_to(self, groups, rows):
+		for row in rows:
+			self.add_row_to(groups, row)
+
+	def add_outputs(self, msg_builder, groups):
+		for group_key, acc in groups.items():
+			self.add_output(msg_builder, group_key, acc)
+
 	def send(self, builder):
 		logging.info(f"TOPK SENDING TO {builder.headers.types} {builder.headers.ids} len: {builder.len_payload()} eof? {builder.headers.is_eof()}")
 		#for itm in builder.payload:
@@ -234,3 +234,37 @@ class TestGroupbyNode(unittest.TestCase):
 
         self.assertEqual(node.len_in_progress(), 0)
         self.assertEqual(node.len_total_groups(), 0)
+
+    def test_key_partitioned_groupby_only_first_partition_sends_eof(self):
+        in_cols = ["store_id", "mapped_semester", "revenue"]
+        out_cols = ["store_id", "mapped_semester", "tpv"]
+
+        def run_partition(node_ind):
+            result_grouper = MockMiddleware()
+            type_conf = GroupbyTypeConfiguration(result_grouper, BareMockMessageBuilder, 
+                    in_fields = in_cols,
+                    grouping_conf = [["store_id", "mapped_semester"], [
+                        [SUM_ACTION, "revenue", "tpv"],
+                    ]],
+                    out_conf={ROW_CONFIG_OUT_COLS: out_cols},
+                    key_partition = (node_ind, 3),
+            )
+            in_middle = MockMiddleware()
+            node = GroupbyNode(in_middle, MockMessage, {"t1": type_conf})
+            node.start()
+
+            in_middle.push_msg(BareMockMessageBuilder.for_payload(["query_3323"], ["t1"], [["str1", "0", "10"]], lambda r: r))
+            eof_message = BareMockMessageBuilder.for_payload(["query_3323"],["t1"],[], lambda r: r) 
+            eof_message.set_as_eof(1)
+            in_middle.push_msg(eof_message)
+            return result_grouper.msgs
+
+        msgs = run_partition(0)
+        self.assertEqual(len(msgs), 2)
+        self.assertEqual(msgs[0].payload, [["str1", "0", "10.0"]])
+        self.assertEqual(msgs[1].is_eof(), True)
+        self.assertEqual(msgs[1].headers.msg_count, 3) # Data message of each partition
+
+        msgs = run_partition(1)
+        self.assertEqual(len(msgs), 1)
+        self.assertEqual(msgs[0].is_eof(), False)
@@ -257,3 +257,81 @@ class TestRowAggregator(unittest.TestCase):
         grouper.add_aggregated_to(res, acc)
         expected = {"year":2025,"store_id":1,"user_id":1,"total_cost":27, "purchase_count":2, "avg_cost":float(12+15)/2, "max_cost":15 }
         self.assertEqual(res, expected)
+
+    def test_columns_aggregate_by_dense_group_id(self):
+        key_parser = KeyGroupParser(["store_id"])
+        grouper = RowAggregator([
+                [SUM_ACTION, "cost", "total_cost"],
+                [MAX_ACTION, "cost", "max_cost"],
+                [AVG_ACTION, "cost", "avg_cost"],
+                [COUNT_ACTION,"purchase_count"]
+        ])
+        groups = grouper.new_columns()
+
+        rows = [
+            {"store_id": 1, "cost": "12"},
+            {"store_id": 2, "cost": "5"},
+            {"store_id": 1, "cost": "15"},
+            {"store_id": 1, "cost": "3"},
+        ]
+        for row in rows:
+            grouper.add_row_columns(groups, key_parser.get_group_key(row), row)
+
+        self.assertEqual(len(groups), 2)
+        self.assertEqual(list(groups.items()), [(0, (1,)), (1, (2,))]) # Arrival order
+
+        res = key_parser.get_base_key((1,))
+        grouper.add_aggregated_columns_to(res, groups, groups.ids[(1,)])
+        self.assertEqual(res, {"store_id": 1, "total_cost": 30.0, "max_cost": 15.0, "avg_cost": 10.0, "purchase_count": 3})
+
+        res = key_parser.get_base_key((2,))
+        grouper.add_aggregated_columns_to(res, groups, groups.ids[(2,)])
+        self.assertEqual(res, {"store_id": 2, "total_cost": 5.0, "max_cost": 5.0, "avg_cost": 5.0, "purchase_count": 1})
+
+    def test_batch_columns_same_as_row_by_row(self):
+        key_parser = KeyGroupParser([0, 1])
+        actions = [
+                [SUM_ACTION, 2, "total"],
+                [MAX_ACTION, 2, "max"],
+                [AVG_ACTION, 2, "avg"],
+                [COUNT_ACTION, "count"]
+        ]
+        grouper = RowAggregator(actions)
+        rows = [["s1", "u1", "1.5"], ["s1", "u2", "-4"], ["s1", "u1", "7"], ["s2", "u1", "3"], ["s1", "u2", "2"]]
+
+        by_row = grouper.new_columns()
+        for row in rows:
+            grouper.add_row_columns(by_row, key_parser.get_group_key(row), row)
+
+        batch = grouper.new_columns()
+        grouper.add_rows_columns(batch, key_parser.get_group_keys(rows[:2]), rows[:2])
+        grouper.add_rows_columns(batch, key_parser.get_group_keys(rows[2:]), rows[2:])
+
+        self.assertEqual(batch.keys, by_row.keys)
+        for gid, key in batch.items():
+            res_batch = {}
+            res_row = {}
+            grouper.add_aggregated_columns_to(res_batch, batch, gid)
+            grouper.add_aggregated_columns_to(res_row, by_row, gid)
+            self.assertEqual(res_batch, res_row)
+
+        res = {}
+        grouper.add_aggregated_columns_to(res, batch, batch.ids[("s1", "u2")])
+        self.assertEqual(res, {"total": -2.0, "max": 2.0, "avg": -1.0, "count": 2})
+
+    def test_count_merge_sums_partial_counts(self):
+        grouper = RowAggregator([[COUNT_MERGE_ACTION, "purchase_count"]])
+
+        acc = grouper.new_group_acc({"purchase_count": "2"})
+        grouper.add_group_acc(acc, {"purchase_count": "3"})
+        self.assertEqual(acc["purchase_count"], 5)
+
+        key_parser = KeyGroupParser([0])
+        rows = [["us1", "2"], ["us1", "3"], ["us2", "1"]]
+        grouper_vec = RowAggregator([[COUNT_MERGE_ACTION, 1, "purchase_count"]])
+        groups = grouper_vec.new_columns()
+        grouper_vec.add_rows_columns(groups, key_parser.get_group_keys(rows), rows)
+
+        res = {}
+        grouper_vec.add_aggregated_columns_to(res, groups, groups.ids[("us1",)])
+        self.assertEqual(res, {"purchase_count": 5})
@@ -82,7 +82,7 @@ class MockChannel:
             {"exchange": exchange, "body": body, "props": properties}
         )
 
-    def basic_ack(self, delivery_tag):
+    def basic_ack(self, delivery_tag, multiple = False):
         self.acked_tags.add(delivery_tag)
     def basic_nack(self, delivery_tag, requeue = False):
         self.nacked_tags.add((delivery_tag, requeue))
@@ -105,5 +105,5 @@ class PropHeaders:
     def __init__(self, headers):
         self.headers = headers
 
-def wait_middleware_init_nothing():
+def wait_middleware_init_nothing(host = None):
     pass
@@ -0,0 +1,63 @@
+import socket
+import time
+import unittest
+
+from middleware.rabbitmq import utils as rbmq_utils
+# Imported before other tests replace it on the module.
+from middleware.rabbitmq.utils import wait_middleware_init, backoff_delay, is_broker_ready, mark_broker_ready, try_open_connection
+
+
+class TestBrokerReadiness(unittest.TestCase):
+    def test_backoff_grows_and_is_capped(self):
+        for attempt in range(20):
+            delay = backoff_delay(attempt, 0.1, 5)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(5, 0.1 * 2 ** attempt))
+
+    def test_probe_marks_host_ready_once(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1)
+        port = listener.getsockname()[1]
+        host = "127.0.0.1"
+
+        probes = []
+        real_probe = rbmq_utils.probe_broker
+        rbmq_utils.probe_broker = lambda host: probes.append(host) or real_probe(host, port)
+        try:
+            self.assertFalse(is_broker_ready(host))
+            start = time.monotonic()
+            wait_middleware_init(host)
+            self.assertTrue(is_broker_ready(host))
+            wait_middleware_init(host) # Latched, not probed again
+            self.assertLess(time.monotonic() - start, 1)
+            self.assertEqual(probes, [host])
+        finally:
+            rbmq_utils.probe_broker = real_probe
+            listener.close()
+
+    def test_connection_retried_until_deadline_and_latch_cleared(self):
+        host = "broker_restarting"
+        mark_broker_ready(host)
+        attempts = []
+
+        def failing_open(host):
+            attempts.append(time.monotonic())
+            raise ConnectionError("refused")
+
+        real_open, real_backoff = rbmq_utils._open_connection, rbmq_utils.backoff_delay
+        rbmq_utils._open_connection = failing_open
+        rbmq_utils.backoff_delay = lambda attempt: 0.01
+        try:
+            start = time.monotonic()
+            with self.assertRaises(ConnectionError):
+                try_open_connection(host, 2, timeout=0.2)
+            self.assertGreaterEqual(attempts[-1] - start, 0.2) # Not only 2 attempts
+            self.assertGreater(len(attempts), 2)
+            self.assertFalse(is_broker_ready(host)) # Probed again by the next manager
+
+            rbmq_utils._open_connection = lambda host: "connection"
+            self.assertEqual(try_open_connection(host, 2, timeout=0.2), "connection")
+            self.assertTrue(is_broker_ready(host))
+        finally:
+            rbmq_utils._open_connection, rbmq_utils.backoff_delay = real_open, real_backoff
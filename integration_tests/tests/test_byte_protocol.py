@@ -0,0 +1,196 @@
+import io
+import socket
+import threading
+import unittest
+
+from common.protocol.batch import BatchProtocol
+from common.protocol.byte import ByteProtocol, IOV_MAX
+from common.protocol.compression import ZlibCodec, CompressionError, ZLIB
+
+
+class PartialSocket:
+    """Accepts at most 7 bytes and IOV_MAX buffers per sendmsg"""
+    def __init__(self):
+        self.sent = bytearray()
+        self.calls = 0
+
+    def sendmsg(self, buffers):
+        assert len(buffers) <= IOV_MAX
+        self.calls += 1
+        data = b"".join(buffers)[:7]
+        self.sent += data
+        return len(data)
+
+
+class TestByteProtocol(unittest.TestCase):
+    def setUp(self):
+        self.sender, self.receiver = socket.socketpair()
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def test_frames_bigger_than_buffer(self):
+        payload = bytes(range(256)) * 4096 # 1 MiB, received in many partial reads
+        sender = threading.Thread(target=lambda: ByteProtocol(self.sender).send_all(payload))
+        sender.start()
+        protocol = ByteProtocol(self.receiver)
+        self.assertEqual(protocol.recv_all(len(payload)), payload)
+        sender.join()
+
+    def test_views_reuse_buffer(self):
+        ByteProtocol(self.sender).send_all(b"\x00\x00\x00\x05abc")
+        protocol = ByteProtocol(self.receiver)
+        self.assertEqual(protocol.wait_uint32(), 5)
+        view = protocol.recv_view(3)
+        self.assertEqual(bytes(view), b"abc")
+        self.assertIs(view.obj, protocol._recv_buffer)
+
+    def test_batches_split_by_line(self):
+        data = b"".join(b"row%d,a,b\n" % ind for ind in range(50000))
+
+        def send():
+            BatchProtocol(self.sender).send_all(io.BytesIO(data))
+            ByteProtocol(self.sender).send_uint32(0)
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        protocol = BatchProtocol(self.receiver)
+        chunks = []
+        chunk = protocol.wait_raw_batch()
+        while chunk:
+            chunks.append(chunk)
+            chunk = protocol.wait_raw_batch()
+        sender.join()
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b"\n".join(chunks) + b"\n", data)
+
+    def test_vectored_send_resumes_partial_sends(self):
+        fake = PartialSocket()
+        buffers = [b"abc", b"", bytearray(b"defghij"), memoryview(b"klmnopqrstu")[2:]]
+        ByteProtocol(fake).send_vectored(buffers)
+        self.assertEqual(bytes(fake.sent), b"abcdefghijmnopqrstu")
+        self.assertEqual(fake.calls, 3)
+
+    def test_send_batch_with_more_items_than_iov_max(self):
+        batch = [b"line%d" % ind for ind in range(IOV_MAX + 10)]
+        sender = threading.Thread(target=lambda: BatchProtocol(self.sender).send_batch(batch))
+        sender.start()
+        self.assertEqual(BatchProtocol(self.receiver).wait_batch(), batch)
+        sender.join()
+
+    def test_session_sent_before_first_batch(self):
+        def send():
+            protocol = BatchProtocol(self.sender)
+            protocol.send_session("c0ffee")
+            protocol.send_all(io.BytesIO(b"header\na,b\n"))
+            protocol.send_batch([])
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        protocol = BatchProtocol(self.receiver)
+        self.assertEqual(protocol.wait_session_and_raw_batch(), ("c0ffee", b"header\na,b"))
+        self.assertEqual(protocol.wait_raw_batch(), b"")
+        sender.join()
+
+        BatchProtocol(self.sender).send_all(io.BytesIO(b"header\n"))
+        self.assertEqual(protocol.wait_session_and_raw_batch(), (None, b"header"))
+
+    def test_projections_requested_before_first_batch(self):
+        requested = []
+        def send():
+            protocol = BatchProtocol(self.sender)
+            protocol.send_session("c0ffee")
+            requested.append(protocol.request_projections())
+            protocol.send_all(io.BytesIO(b"item_id,item_name\n1,Espresso\n"))
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        protocol = BatchProtocol(self.receiver)
+        projections = {"original,header": "projected", "other": "o"}
+        self.assertEqual(protocol.wait_session_and_raw_batch(projections), ("c0ffee", b"item_id,item_name\n1,Espresso"))
+        sender.join()
+        self.assertEqual(requested, [projections])
+
+        # Nothing accepted projected, files are sent as they are
+        def send_without_files():
+            protocol = BatchProtocol(self.sender)
+            requested.append(protocol.request_projections())
+            protocol.send_batch([])
+
+        sender = threading.Thread(target=send_without_files)
+        sender.start()
+        self.assertEqual(protocol.wait_session_and_raw_batch({}), (None, b""))
+        sender.join()
+        self.assertEqual(requested[-1], {})
+
+    def test_session_opened_by_receiver(self):
+        opened = []
+        def send():
+            protocol = BatchProtocol(self.sender)
+            opened.append(protocol.open_session())
+            protocol.send_all(io.BytesIO(b"header\na,b\n"))
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        protocol = BatchProtocol(self.receiver)
+        self.assertEqual(protocol.wait_session_and_raw_batch({}, lambda: "new-session"), ("new-session", b"header\na,b"))
+        sender.join()
+        self.assertEqual(opened, ["new-session"])
+
+        # A receiver that can not open sessions answers with an empty id
+        errors = []
+        def refused():
+            try:
+                BatchProtocol(self.sender).open_session()
+            except ValueError as e:
+                errors.append(e)
+
+        sender = threading.Thread(target=refused)
+        sender.start()
+        with self.assertRaises(ValueError):
+            protocol.wait_session_and_raw_batch()
+        sender.join()
+        self.assertEqual(len(errors), 1)
+
+    def test_negotiated_compression(self):
+        data = b"".join(b"86652dc6-f350-%d,10,3,,13060.0,9.5,0.0,9.5,2025-01-01 12:52:56\n" % ind for ind in range(20000))
+        sent = []
+
+        def send():
+            protocol = BatchProtocol(self.sender)
+            sent.append(protocol.negotiate_compression(["lz4", ZLIB]))
+            protocol.send_all(io.BytesIO(data))
+            protocol.send_batch([])
+            protocol.send_batch([b"a,b", b"c,d"])
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        protocol = BatchProtocol(self.receiver)
+        session_id, chunk = protocol.wait_session_and_raw_batch()
+        chunks = []
+        while chunk:
+            chunks.append(chunk)
+            chunk = protocol.wait_raw_batch()
+        self.assertEqual(protocol.wait_batch(), [b"a,b", b"c,d"])
+        sender.join()
+
+        self.assertEqual(sent, [ZLIB])
+        self.assertIsNone(session_id)
+        self.assertEqual(b"\n".join(chunks) + b"\n", data)
+
+    def test_no_common_codec_sends_raw(self):
+        sender = threading.Thread(target=lambda: BatchProtocol(self.receiver).accept_compression())
+        sender.start()
+        self.assertIsNone(BatchProtocol(self.sender).offer_compression(["lz4"]))
+        sender.join()
+
+    def test_decompression_is_bounded(self):
+        codec = ZlibCodec()
+        frame = codec.compress(bytes(1024 * 1024))
+        self.assertLess(len(frame), 8 * 1024)
+        with self.assertRaises(CompressionError):
+            codec.decompress(frame, 256 * 1024)
+        with self.assertRaises(CompressionError):
+            codec.decompress(frame[:-4], 2 * 1024 * 1024)
+        self.assertEqual(codec.decompress(frame, 1024 * 1024), bytes(1024 * 1024))
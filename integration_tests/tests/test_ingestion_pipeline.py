@@ -0,0 +1,102 @@
+import threading
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from common.models.menuitem import MenuItem
+from common.models.transaction import Transaction
+from common.protocol.pipeline import IngestionPipeline
+
+TRANSACTIONS = b"86652dc6-f350,10,3,,13060.0,9.5,0.0,9.5,2025-01-01 12:52:56\n86652dc6-f351,2,3,,,9.5,0.0,19.5,2024-02-29 00:02:56"
+MENU_ITEMS = b"1,Espresso,coffee,6.0,,,\n2,Americano,coffee,7.0,,,"
+
+
+class TestIngestionPipeline(unittest.TestCase):
+
+    def run_pipeline(self, pool, depth):
+        published = []
+        pipeline = IngestionPipeline(
+            lambda model, payload, rows: published.append((model, payload, rows)),
+            lambda model: published.append((model, "eof")),
+            pool, depth)
+        for _ in range(5):
+            pipeline.submit(Transaction, TRANSACTIONS)
+        pipeline.end_of(Transaction)
+        pipeline.submit(MenuItem, MENU_ITEMS)
+        pipeline.end_of(MenuItem)
+        pipeline.close()
+        return published
+
+    def expected(self):
+        transactions = (Transaction,) + Transaction.parse_batch(TRANSACTIONS)
+        menu_items = (MenuItem,) + MenuItem.parse_batch(MENU_ITEMS)
+        return [transactions] * 5 + [(Transaction, "eof"), menu_items, (MenuItem, "eof")]
+
+    def test_inline_keeps_order(self):
+        self.assertEqual(self.run_pipeline(None, 1), self.expected())
+
+    def test_pool_keeps_order(self):
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            self.assertEqual(self.run_pipeline(pool, 3), self.expected())
+
+    def test_publish_error_is_raised(self):
+        def fail(model, payload, rows):
+            raise BrokenPipeError
+
+        eofs = []
+        pipeline = IngestionPipeline(fail, eofs.append, None, 1)
+        with self.assertRaises(BrokenPipeError):
+            try:
+                for _ in range(10): # Raised on a later submit or on close, never blocks
+                    pipeline.submit(MenuItem, MENU_ITEMS)
+                pipeline.end_of(MenuItem)
+            finally:
+                pipeline.close()
+        self.assertEqual(eofs, []) # No eof after a failed chunk
+
+    def test_publisher_start_and_end_run_on_publisher_thread(self):
+        threads = []
+        events = []
+        def publish(model, payload, rows):
+            threads.append(threading.current_thread())
+            events.append("publish")
+        def start():
+            threads.append(threading.current_thread())
+            events.append("start")
+        def end(failed):
+            threads.append(threading.current_thread())
+            events.append(("end", failed))
+
+        pipeline = IngestionPipeline(publish, lambda model: events.append("eof"), None, 1,
+                                     on_publisher_start=start, on_publisher_end=end)
+        pipeline.submit(MenuItem, MENU_ITEMS)
+        pipeline.end_of(MenuItem)
+        pipeline.close()
+        self.assertEqual(events, ["start", "publish", "eof", ("end", False)])
+        self.assertEqual(len(set(threads)), 1)
+        self.assertNotEqual(threads[0], threading.current_thread())
+
+    def test_publisher_start_error_is_raised(self):
+        def start():
+            raise ConnectionError
+        ends = []
+        pipeline = IngestionPipeline(lambda model, payload, rows: None, lambda model: None, None, 1,
+                                     on_publisher_start=start, on_publisher_end=ends.append)
+        with self.assertRaises(ConnectionError):
+            try:
+                for _ in range(10):
+                    pipeline.submit(MenuItem, MENU_ITEMS)
+            finally:
+                pipeline.close()
+        self.assertEqual(ends, [True]) # Ended as failed, the connection is not reused
+
+    def test_projected_chunks_validated(self):
+        published = []
+        pipeline = IngestionPipeline(
+            lambda model, payload, rows: published.append((payload, rows)), lambda model: None, None, 1)
+        pipeline.submit(MenuItem, b"1,Espresso\n2,Americano", projected=True)
+        with self.assertRaises(ValueError):
+            try:
+                pipeline.submit(MenuItem, b"3,Latte,coffee", projected=True)
+            finally:
+                pipeline.close()
+        self.assertEqual(published, [(b"1,Espresso\n2,Americano", 2)])
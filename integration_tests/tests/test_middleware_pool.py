@@ -0,0 +1,59 @@
+import unittest
+
+from middleware.middleware_pool import MiddlewarePool
+
+
+class FakeMiddleware:
+    def __init__(self):
+        self.healthy = True
+        self.closed = False
+        self.flushes = 0
+
+    def is_healthy(self):
+        return self.healthy and not self.closed
+
+    def flush(self):
+        self.flushes += 1
+
+    def close(self):
+        self.closed = True
+
+
+class TestMiddlewarePool(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+    def factory(self):
+        middleware = FakeMiddleware()
+        self.created.append(middleware)
+        return middleware
+
+    def test_released_middleware_is_reused(self):
+        pool = MiddlewarePool(self.factory, 2)
+        first = pool.lease()
+        pool.release(first)
+        self.assertEqual(first.flushes, 1)
+        self.assertIs(pool.lease(), first)
+        self.assertEqual(len(self.created), 1)
+
+    def test_closed_connection_is_replaced(self):
+        pool = MiddlewarePool(self.factory, 2)
+        first = pool.lease()
+        pool.release(first)
+        first.healthy = False # Connection dropped while idle
+
+        second = pool.lease()
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(len(self.created), 2)
+
+    def test_broken_and_extra_middlewares_are_closed(self):
+        pool = MiddlewarePool(self.factory, 1)
+        leased = [pool.lease() for _ in range(3)]
+        pool.release(leased[0], broken=True)
+        pool.release(leased[1])
+        pool.release(leased[2])
+        self.assertEqual([m.closed for m in leased], [True, False, True])
+
+        pool.close()
+        self.assertTrue(leased[1].closed)
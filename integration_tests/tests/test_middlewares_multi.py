@@ -21,7 +21,7 @@ def map_dict_to_vect(row):
 def map_vect_to_dict(row):
     return {"year": int(row[0]), "hour": int(row[1]), "sum": int(row[2])}
 
-def wait_middleware_init_nothing():
+def wait_middleware_init_nothing(host = None):
     pass
 
 class MethodClass:
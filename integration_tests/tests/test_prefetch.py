@@ -0,0 +1,56 @@
+import unittest
+
+from middleware.rabbitmq.prefetch import *
+from middleware.rabbitmq.blocking_manager import RabbitMQChannel
+from integration_tests.src.mocks_rabbit import *
+
+
+class TestAdaptivePrefetch(unittest.TestCase):
+    def observe_n(self, prefetch, count, latency_s, msg_bytes):
+        changes = []
+        for _ in range(count):
+            new_count = prefetch.observe(latency_s, msg_bytes)
+            if new_count != None:
+                changes.append(new_count)
+        return changes
+
+    def test_fast_small_messages_grow_window(self):
+        prefetch = AdaptivePrefetch(2, 1, 64, target_ms = 100, max_bytes = 1024 * 1024)
+        changes = self.observe_n(prefetch, ADJUST_EVERY_MSGS, 0.005, 100)
+        self.assertEqual(changes, [20]) # 100ms / 5ms
+        self.assertEqual(prefetch.metrics()["prefetch"], 20)
+
+    def test_bounded_by_max_and_bytes(self):
+        prefetch = AdaptivePrefetch(2, 1, 64, target_ms = 100, max_bytes = 1024 * 1024)
+        self.observe_n(prefetch, ADJUST_EVERY_MSGS, 0.0001, 100)
+        self.assertEqual(prefetch.current, 64)
+
+        prefetch = AdaptivePrefetch(2, 1, 64, target_ms = 100, max_bytes = 1024 * 1024)
+        self.observe_n(prefetch, ADJUST_EVERY_MSGS, 0.0001, 256 * 1024)
+        self.assertEqual(prefetch.current, 4)
+
+    def test_slow_messages_shrink_window(self):
+        prefetch = AdaptivePrefetch(16, 1, 64, target_ms = 100, max_bytes = 1024 * 1024)
+        self.observe_n(prefetch, ADJUST_EVERY_MSGS, 0.5, 100)
+        self.assertEqual(prefetch.current, 1)
+
+    def test_small_changes_ignored(self):
+        prefetch = AdaptivePrefetch(20, 1, 64, target_ms = 100, max_bytes = 1024 * 1024)
+        changes = self.observe_n(prefetch, ADJUST_EVERY_MSGS * 2, 0.0045, 100)
+        self.assertEqual(changes, [])
+
+    def test_channel_applies_prefetch(self):
+        mock = MockChannel("test_prefetch")
+        applied = []
+        mock.basic_qos = lambda prefetch_count: applied.append(prefetch_count)
+        channel = RabbitMQChannel(mock)
+        channel.adaptive_prefetch = AdaptivePrefetch(2, 1, 64, target_ms = 100, max_bytes = 1024 * 1024)
+
+        callback = channel._timed_callback(lambda ch, method, properties, body: None)
+        callback(mock, MethodClass("m_0"), PropHeaders({}), b"a,b\n")
+        self.assertEqual(channel.prefetch_metrics()["observed"], 1)
+
+        for _ in range(ADJUST_EVERY_MSGS - 1):
+            channel.observe_delivery(0.005, 100)
+        self.assertEqual(len(applied), 1)
+        self.assertEqual(channel.prefetch_count, applied[0])
@@ -0,0 +1,174 @@
+import unittest
+
+from middleware.rabbitmq.publish_batching import *
+from middleware.rabbitmq.ack_batching import *
+from middleware.rabbitmq.blocking_manager import RabbitMQChannel
+from middleware.routing.header_fields import *
+from middleware.rabbitmq import utils as rbmq_utils
+from integration_tests.src.mocks_rabbit import *
+
+QUEUE_NAME = "test_batch_queue"
+
+class FakeTimer:
+    def __init__(self):
+        self.scheduled = []
+
+    def call_later(self, delay_s, callback):
+        self.scheduled.append((delay_s, callback))
+        return len(self.scheduled)
+
+    def fire(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for _, callback in scheduled:
+            callback()
+
+class TestPublishBatching(unittest.TestCase):
+    def setUp(self):
+        rbmq_utils.build_headers = PropHeaders
+
+    def new_channel(self, max_bytes, max_msgs = PUBLISH_BATCH_MSGS):
+        mock = MockChannel("test_batching")
+        mock.queue_declare(QUEUE_NAME)
+        channel = RabbitMQChannel(mock)
+        channel.batcher = PublishBatcher(channel._publish, max_bytes, max_msgs)
+        return mock, channel
+
+    def test_channel_disabled_publishes_each(self):
+        mock, channel = self.new_channel(0)
+        self.assertFalse(channel.batcher.is_enabled())
+        channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1]}, b"a,b\n")
+        channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1]}, b"c,d\n")
+        self.assertEqual(len(mock.queues[QUEUE_NAME].msgs), 2)
+
+    def test_batcher_coalesces_and_splits(self):
+        sent = []
+        batcher = PublishBatcher(lambda key, headers, body: sent.append((key, headers, body)), 1000, 3)
+        for ind in range(3):
+            batcher.add("a", {"ind": ind}, f"row{ind}\n".encode())
+        batcher.add("b", {"ind": 10}, b"single")
+
+        self.assertEqual(len(sent), 1) # Flushed by msg count
+        self.assertTrue(batcher.has_pending())
+        batcher.flush()
+        self.assertFalse(batcher.has_pending())
+        self.assertEqual(len(sent), 2)
+
+        key, headers, body = sent[0]
+        self.assertEqual(key, "a")
+        self.assertTrue(is_coalesced(headers))
+        parts = list(iter_coalesced(headers, body))
+        self.assertEqual(parts, [({"ind": ind}, f"row{ind}\n".encode()) for ind in range(3)])
+
+        # A lone message is sent unchanged
+        self.assertEqual(sent[1], ("b", {"ind": 10}, b"single"))
+        self.assertFalse(is_coalesced(sent[1][1]))
+
+    def test_batcher_flushes_before_overflow(self):
+        sent = []
+        batcher = PublishBatcher(lambda key, headers, body: sent.append((key, headers, body)), 10, 64)
+        batcher.add("a", {"ind": 0}, b"123456")
+        batcher.add("a", {"ind": 1}, b"123456")
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(sent[0], ("a", {"ind": 0}, b"123456"))
+        batcher.flush()
+        self.assertEqual(sent[1], ("a", {"ind": 1}, b"123456"))
+
+    def test_channel_eof_flushes_and_consumer_splits(self):
+        mock, channel = self.new_channel(1000)
+        received = []
+        channel.declare_consume(QUEUE_NAME, lambda headers, body: received.append((headers, body)))
+        channel.clock = lambda: 0.0 # Never past the deadline, flushes come from eof only
+
+        channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1]}, b"a,b\n")
+        channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1]}, b"c,d\n")
+        channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1], FIELD_PARTITION_IND: 2}, b"")
+
+        self.assertEqual(len(mock.queues[QUEUE_NAME].msgs), 1) # A single delivery
+        self.assertEqual(len(mock.acked_tags), 1)
+        self.assertEqual([body for _, body in received], [b"a,b\n", b"c,d\n", b""])
+        self.assertEqual(received[2][0].msg_count, 2)
+        self.assertFalse(channel.batcher.has_pending())
+
+    def test_channel_flushes_past_deadline(self):
+        mock, channel = self.new_channel(1000)
+        now = [0.0]
+        channel.clock = lambda: now[0]
+
+        channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1]}, b"a,b\n")
+        now[0] += PUBLISH_FLUSH_MS/1000 / 2
+        channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1]}, b"c,d\n")
+        self.assertEqual(len(mock.queues[QUEUE_NAME].msgs), 0) # Still within the deadline
+
+        now[0] += PUBLISH_FLUSH_MS/1000
+        channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1]}, b"e,f\n")
+        self.assertEqual(len(mock.queues[QUEUE_NAME].msgs), 1) # Every pending send in one message
+        self.assertFalse(channel.batcher.has_pending())
+        self.assertIsNone(channel.flush_deadline)
+
+        channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1]}, b"g,h\n")
+        self.assertEqual(channel.flush_deadline, now[0] + PUBLISH_FLUSH_MS/1000) # Restarts with the next send
+
+    def test_channel_batched_acks(self):
+        mock, channel = self.new_channel(0)
+        acks = []
+        nacks = []
+        mock.basic_ack = lambda delivery_tag, multiple = False: acks.append((delivery_tag, multiple))
+        mock.basic_nack = lambda delivery_tag, requeue = False: nacks.append((delivery_tag, requeue))
+        channel.acks = AckBatcher(channel._ack_multiple, 3)
+        timer = FakeTimer()
+        channel.call_later = timer.call_later
+
+        failed = set(["fail\n"])
+        channel.declare_consume(QUEUE_NAME, lambda headers, body: body.decode() in failed)
+        for body in [b"a\n", b"b\n", b"c\n", b"d\n", b"fail\n", b"e\n"]:
+            channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1]}, body)
+
+        # Three acked with a single multiple ack, then pending one acked before the nack
+        self.assertEqual(acks, [("m_2", True), ("m_3", True)])
+        self.assertEqual(nacks, [("m_4", True)])
+
+        channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1], FIELD_PARTITION_IND: 6}, b"")
+        self.assertEqual(acks[-1], ("m_6", True)) # Eof flushes
+        channel.flush()
+        self.assertEqual(len(acks), 3)
+
+        channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1]}, b"f\n")
+        self.assertEqual(len(acks), 3)
+        self.assertEqual(timer.scheduled[-1][0], ACK_FLUSH_MS/1000)
+        timer.fire()
+        self.assertEqual(acks[-1], ("m_7", True)) # Pending ack sent by the timer
+
+    def test_outputs_flushed_before_batched_ack(self):
+        in_mock, in_channel = self.new_channel(0)
+        out_mock, out_channel = self.new_channel(1000)
+        out_channel.clock = lambda: 0.0
+        out_mock.queue_declare("output")
+        events = []
+        in_mock.basic_ack = lambda delivery_tag, multiple = False: events.append(("ack", delivery_tag))
+        out_publish = out_mock.basic_publish
+        def publish(exchange, routing_key, body, properties):
+            events.append(("publish", routing_key))
+            out_publish(exchange, routing_key, body, properties)
+        out_mock.basic_publish = publish
+
+        in_channel.acks = AckBatcher(in_channel._ack_multiple, 2)
+        in_channel.call_later = FakeTimer().call_later
+        in_channel.before_ack = out_channel.flush
+        def handle(headers, body):
+            out_channel.send("output", {FIELD_QUERY_TYPE: [1]}, body)
+            return False
+        in_channel.declare_consume(QUEUE_NAME, handle)
+
+        in_channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1]}, b"a\n")
+        self.assertEqual(events, []) # Output coalesced, input not acked yet
+        in_channel.send(QUEUE_NAME, {FIELD_QUERY_TYPE: [1]}, b"b\n")
+        self.assertEqual(events, [("publish", "output"), ("ack", "m_1")])
+        self.assertEqual(len(out_mock.queues["output"].msgs), 1)
+
+    def test_ack_batch_bounded_by_prefetch(self):
+        batcher = AckBatcher(lambda delivery_tag: None, 32)
+        batcher.set_prefetch(8)
+        self.assertEqual(batcher.limit, 4)
+        batcher.set_prefetch(1)
+        self.assertEqual(batcher.limit, 1)
+        self.assertTrue(batcher.is_enabled())
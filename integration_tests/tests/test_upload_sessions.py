@@ -0,0 +1,57 @@
+import unittest
+
+from common.models.menuitem import MenuItem
+from common.models.store import Store
+from common.protocol.sessions import SessionError, UploadSessions
+from common.utils import is_uuid, new_uuid
+
+
+class TestUploadSessions(unittest.TestCase):
+    def setUp(self):
+        self.now = [0.0]
+        self.sessions = UploadSessions([MenuItem, Store], ttl_s=10, clock=lambda: self.now[0])
+
+    def test_only_issued_uuids_can_be_joined(self):
+        for session_id in ["../x", "c0ffee", "", new_uuid().upper(), new_uuid()]:
+            with self.assertRaises(SessionError):
+                self.sessions.join(session_id)
+        session_id = self.sessions.open()
+        self.assertTrue(is_uuid(session_id))
+        self.sessions.join(session_id)
+        self.sessions.join(session_id)
+
+    def test_model_uploaded_by_a_single_connection(self):
+        session_id = self.sessions.open()
+        self.sessions.join(session_id)
+        self.sessions.join(session_id)
+        self.sessions.claim(session_id, MenuItem)
+        with self.assertRaises(SessionError):
+            self.sessions.claim(session_id, MenuItem)
+        self.sessions.claim(session_id, Store)
+
+    def test_finished_session_can_not_be_joined(self):
+        session_id = self.sessions.open()
+        self.sessions.join(session_id)
+        self.sessions.claim(session_id, MenuItem)
+        self.sessions.claim(session_id, Store)
+        with self.assertRaises(SessionError):
+            self.sessions.join(session_id) # Every model uploaded
+        self.sessions.leave(session_id)
+        self.assertEqual(len(self.sessions), 0)
+        with self.assertRaises(SessionError):
+            self.sessions.join(session_id)
+
+    def test_sessions_without_connections_expire(self):
+        idle = self.sessions.open()
+        active = self.sessions.open()
+        self.sessions.join(active)
+        self.now[0] = 11
+        self.sessions.open()
+        with self.assertRaises(SessionError):
+            self.sessions.join(idle)
+        self.sessions.join(active) # Still uploading
+        self.sessions.leave(active)
+        self.sessions.leave(active)
+        self.now[0] = 22
+        with self.assertRaises(SessionError):
+            self.sessions.join(active)
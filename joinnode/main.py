@@ -50,6 +50,10 @@ def initialize_config():  # type: ignore[no-untyped-def]
         config_params["logging_level"] = os.getenv(
             "LOGGING_LEVEL", config["DEFAULT"]["LOGGING_LEVEL"]
         )
+        # Max rows buffered in memory by this node before joins spill to disk, 0 means unbounded.
+        config_params["memory_budget_rows"] = int(os.getenv(
+            "MEMORY_BUDGET_ROWS", config["DEFAULT"]["MEMORY_BUDGET_ROWS"]
+        ))
     except KeyError as e:
         raise KeyError("Key was not found. Error: {} .Aborting selectnode".format(e))
     except ValueError as e:
@@ -81,11 +85,12 @@ def main() -> None:
     logging_level = config_params["logging_level"]
     join_node_count = config_params["node_count"]
     join_node_ind = config_params["node_ind"]
+    memory_budget_rows = config_params["memory_budget_rows"]
     initialize_log(logging_level)
 
     # Log config parameters at the beginning of the program to verify the configuration of the component
     logging.debug(
-        f"action: config | result: success | port: {port} | node_id: {node_id} | logging_level: {logging_level} | join_node_count: {join_node_count}"
+        f"action: config | result: success | port: {port} | node_id: {node_id} | logging_level: {logging_level} | join_node_count: {join_node_count} | memory_budget_rows: {memory_budget_rows}"
     )
 
     try:
@@ -98,7 +103,11 @@ def main() -> None:
 
         add_joinnode_config(types_expander, result_middleware, nested_joins_middleware)
 
-        node = JoinNode(JoinTasksMiddleware(join_node_count, ind = join_node_ind), CSVMessage, types_expander)
+        join_middleware = JoinTasksMiddleware(join_node_count, ind = join_node_ind)
+        join_middleware.set_before_ack(types_expander.flush_outputs) # Outputs are sent before inputs are acked
+        node = JoinNode(join_middleware, CSVMessage, types_expander,
+            memory_budget = memory_budget_rows if memory_budget_rows > 0 else None,
+        )
 
 
         def close_handler(sig, frame):
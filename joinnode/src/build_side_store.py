@@ -0,0 +1,90 @@
+import logging
+
+# Build side (left/dimension table) rows of a client, shared by every join config that uses that left type.
+# Rows are hashed once per distinct join key column and stored as tuples.
+class BuildSideEntry:
+    def __init__(self, left_type, configs):
+        self.left_type = left_type
+        self.indexes = {}
+        for config in configs:
+            if config.left_key_id() not in self.indexes:
+                self.indexes[config.left_key_id()] = config.new_left_index()
+
+        self.pending_joins = set(config.join_id for config in configs)
+        self.subscribers = []
+        self.finished = False
+
+        self.msg_expected = -1
+        self.msg_count = 0
+
+    def __len__(self):
+        for index in self.indexes.values():
+            return len(index)
+        return 0
+
+    def index_for(self, config):
+        return self.indexes[config.left_key_id()]
+
+    def add_row(self, row):
+        row = tuple(row) # Compact, rows are never modified.
+        for index in self.indexes.values():
+            index.add(row)
+
+    def subscribe(self, joiner):
+        self.subscribers.append(joiner)
+
+    def add_check_msg(self):
+        self.msg_count+=1
+        return self.msg_expected >=0 and self.msg_count >= self.msg_expected
+
+    def handle_eof(self, msg_count_expected):
+        self.msg_expected = msg_count_expected
+        if self.msg_expected > self.msg_count:
+            logging.info(f"Build side {self.left_type} received eof without receiving all messages {self.msg_count} < {self.msg_expected}(expected)")
+            return False
+        return True
+
+    # Returns the subscribed joiners that finished with the build side eof.
+    def finish(self):
+        self.finished = True
+        done = []
+        for joiner in self.subscribers:
+            if joiner._trigger_eof_left():
+                done.append(joiner)
+        self.subscribers = []
+        return done
+
+    # Returns true when no more joins will probe this entry.
+    def release(self, join_id):
+        self.pending_joins.discard(join_id)
+        return self.finished and len(self.pending_joins) == 0
+
+
+class BuildSideStore:
+    def __init__(self):
+        self.entries = {}
+
+    def len_rows(self):
+        total = 0
+        for _, entry in self.entries.items():
+            total+= len(entry)
+        return total
+
+    def len_entries(self):
+        return len(self.entries)
+
+    def get(self, ide, left_type):
+        return self.entries.get(ide+left_type, None)
+
+    def get_or_create(self, ide, left_type, configs):
+        entry = self.entries.get(ide+left_type, None)
+        if entry == None:
+            entry = BuildSideEntry(left_type, configs)
+            self.entries[ide+left_type] = entry
+        return entry
+
+    def release(self, ide, left_type, join_id):
+        entry = self.entries.get(ide+left_type, None)
+        if entry != None and entry.release(join_id):
+            logging.info(f"Freeing build side {ide+left_type}, all joins done.")
+            del self.entries[ide+left_type]
@@ -21,7 +21,8 @@ def add_joinnode_config(types_expander, result_middleware, join_middleware):
             in_fields_left=["product_id","product_name"],  # ..product names
             in_fields_right=["top_product_id", "month", "revenue"],
             join_conf=[INNER_ON_EQ, {"col_left":"product_id", "col_right":"top_product_id"}],
-            out_cols= ["product_name", "month", "revenue",]
+            out_cols= ["product_name", "month", "revenue",],
+            shared_left= True, # Dimension table, buffered once per client for all joins on it.
         ),
         # Add the config to all these types... but.. internal join will separate/group content as needed
         QUERY_2_REVENUE,
@@ -38,7 +39,8 @@ def add_joinnode_config(types_expander, result_middleware, join_middleware):
             in_fields_left=["product_id","product_name"],  # ..product names
             in_fields_right=["top_product_id", "month", "quantity_sold"],
             join_conf=[INNER_ON_EQ, {"col_left":"product_id", "col_right":"top_product_id"}],
-            out_cols= ["product_name", "month", "quantity_sold"]
+            out_cols= ["product_name", "month", "quantity_sold"],
+            shared_left= True, # Dimension table, buffered once per client for all joins on it.
         ),
         # Add the config to all these types... but.. internal join will separate/group content as needed
         QUERY_2_QUANTITY,
@@ -58,7 +60,8 @@ def add_joinnode_config(types_expander, result_middleware, join_middleware):
             in_fields_left=["store_id","store_name"],  # ..store names
             in_fields_right=["store_id","mapped_semester", "tpv"],
             join_conf=[INNER_ON_EQ, {"col_left":"store_id", "col_right":"store_id"}],
-            out_cols= ["store_name", "mapped_semester","tpv",]
+            out_cols= ["store_name", "mapped_semester","tpv",],
+            shared_left= True, # Dimension table, buffered once per client for all joins on it.
         ),
         # Add the config to all these types... but.. internal join will separate/group content as needed
         QUERY_3,
@@ -93,7 +96,8 @@ def add_joinnode_config(types_expander, result_middleware, join_middleware):
             in_fields_left=["store_id","store_name"],  # ..store names
             in_fields_right=["store_id","birthday"],
             join_conf=[INNER_ON_EQ, {"col_left":"store_id", "col_right":"store_id"}],
-            out_cols= ["store_name", "birthday"]
+            out_cols= ["store_name", "birthday"],
+            shared_left= True, # Dimension table, buffered once per client for all joins on it.
         ),
         # Add the config to all these types... but.. internal join will separate/group content as needed
         QUERY_4_JOIN_STORE_NAMES,
@@ -2,14 +2,27 @@
 import logging
 DEFAULT_LIMIT= 10000
 class JoinAccumulator:
-    def __init__(self, type_conf, msg_builder, limit = DEFAULT_LIMIT):
+    def __init__(self, type_conf, msg_builder, limit = DEFAULT_LIMIT, build_side = None):
         self.type_conf = type_conf
         self.msg_builder = msg_builder#type_conf.new_builder_for(msg, ind)
         self.msg_builder.reset_eof()# Ensure its not copying the eof flag from input sender
 
-        self.left_rows = []
-        self.right_rows = []
+        # Buffered rows are hashed by join key as they arrive, joins probe the other side index.
+        self.left_index = type_conf.new_left_index()
+        self.right_index = type_conf.new_right_index()
         self.left_finished = False
+
+        # Shared build side, left rows and left eof are handled by the entry, not by this accumulator.
+        self.build_side = build_side
+        if build_side != None:
+            self.left_index = build_side.index_for(type_conf)
+            self.left_finished = build_side.finished
+            if not self.left_finished:
+                build_side.subscribe(self)
+
+        # Set when the node runs out of memory budget, from then on both sides are buffered on disk.
+        self.left_spill = None
+        self.right_spill = None
         self.right_finished = False
         self.limit = limit
         self.msg_sent = 0
@@ -21,10 +34,17 @@ class JoinAccumulator:
         self.msg_count_right = 0
 
     def len_left(self):
-        return len(self.left_rows)
+        if self.build_side != None:
+            return 0 # Counted once on the build side store.
+        return len(self.left_index)
 
     def len_right(self):
-        return len(self.right_rows)
+        return len(self.right_index)
+
+    def len_spilled(self):
+        if not self.is_spilled():
+            return 0
+        return len(self.left_spill) + len(self.right_spill)
 
     def len_joined(self):
         return self.msg_builder.len_payload()
@@ -39,36 +59,82 @@ class JoinAccumulator:
     def _trigger_eof_right(self):
         self.right_finished = True
         logging.info(f"HANDLING EOF RIGHT out types: {self.msg_builder.headers.types} left finished? {self.left_finished}")
+        if self.is_spilled():
+            return self._check_join_spilled()
+
         if self.left_finished:
             self.send_eof()
             return True
+
+        if self.build_side != None:
+            # Shared left index is still being built and other joins use it, keep right rows until left eof.
+            return False
         
         # Not finished, then try join all left rows.
-        for left_row in self.left_rows:
-            self.type_conf.do_join_left_row(self.right_rows, left_row, self.add_joined)
+        self.type_conf.join_left_index(self.right_index, self.left_index, self.add_joined)
         
-        self.left_rows = [] # Empty it since already used.
+        self.left_index.clear() # Empty it since already used.
         return False
 
 
     def _trigger_eof_left(self):
         self.left_finished = True
         logging.info(f"HANDLING EOF LEFT {self.type_conf.left_type} out types: {self.msg_builder.headers.types} right finished? {self.right_finished}")
+        if self.is_spilled():
+            return self._check_join_spilled()
 
         if self.right_finished:
+            if self.build_side != None:
+                # Right side was kept buffered waiting for the shared left side.
+                self.type_conf.join_right_index(self.left_index, self.right_index, self.add_joined)
+                self.right_index.clear()
             self.send_eof()
             return True
         
         # Not finished, then try join all right rows.
-        for right_row in self.right_rows:
-            self.type_conf.do_join_right_row(self.left_rows, right_row, self.add_joined)
+        self.type_conf.join_right_index(self.left_index, self.right_index, self.add_joined)
 
-        self.right_rows = [] # Empty it since already used.            
+        self.right_index.clear() # Empty it since already used.            
         return False
 
+    def is_shared_left(self):
+        return self.build_side != None
+
+    def is_spilled(self):
+        return self.left_spill != None
+
+    def can_spill(self):
+        # Shared left sides are small dimension tables used by other joins, they stay in memory.
+        return not self.is_spilled() and self.build_side == None
+
+    def spill(self):
+        # Move whatever is buffered to disk, rows already joined are not buffered anymore so nothing is repeated.
+        logging.info(f"Join {self.type_conf.join_id} spilling to disk left: {len(self.left_index)} right: {len(self.right_index)}")
+        self.left_spill = self.type_conf.new_left_spill()
+        self.right_spill = self.type_conf.new_right_spill()
+
+        self.left_spill.add_index(self.left_index)
+        self.right_spill.add_index(self.right_index)
+        self.left_index.clear()
+        self.right_index.clear()
+
+    def _check_join_spilled(self):
+        if not (self.left_finished and self.right_finished):
+            return False
+        self.type_conf.join_spilled(self.left_spill, self.right_spill, self.add_joined)
+        self.left_spill.close()
+        self.right_spill.close()
+        self.send_eof()
+        return True
+
 
 
     def get_action_for_type(self,type):
+        if self.is_spilled():
+            if type == self.type_conf.left_type:
+                return (self.left_spill.add)
+            return (self.right_spill.add)
+
         if type == self.type_conf.left_type:
             # Left message actions
             if self.right_finished:
@@ -80,6 +146,11 @@ class JoinAccumulator:
         return (self.add_row_right)
 
     def get_actions_for_type(self,type):
+        if self.is_spilled():
+            if type == self.type_conf.left_type:
+                return (self.add_check_msg_left, self.left_spill.add)
+            return (self.add_check_msg_right, self.right_spill.add)
+
         if type == self.type_conf.left_type:
             # Left message actions
             if self.right_finished:
@@ -133,19 +204,19 @@ class JoinAccumulator:
         #self.describe()
 
     def do_join_right_row(self, right_row):
-        self.type_conf.do_join_right_row(self.left_rows, right_row, self.add_joined)
+        self.type_conf.probe_right_row(self.left_index, right_row, self.add_joined)
         #self.describe()
 
     def do_join_left_row(self, left_row):
-        self.type_conf.do_join_left_row(self.right_rows, left_row, self.add_joined)
+        self.type_conf.probe_left_row(self.right_index, left_row, self.add_joined)
         #self.describe()
 
     def add_row_left(self, left_row):
-        self.left_rows.append(left_row)
+        self.left_index.add(left_row)
         #self.describe()
 
     def add_row_right(self, right_row):
-        self.right_rows.append(right_row)
+        self.right_index.add(right_row)
         #self.describe()
 
 
@@ -169,5 +240,5 @@ class JoinAccumulator:
 
     def describe(self):
         logging.info(f"curr status join finished left:{self.left_finished} right: {self.right_finished}")
-        logging.info(f"row len left:{len(self.left_rows)} right: {len(self.right_rows)}")
+        logging.info(f"row len left:{len(self.left_index)} right: {len(self.right_index)} shared left: {self.build_side != None} spilled: {self.len_spilled()}")
         logging.info(f"joined payload len:{self.msg_builder.len_payload()}")
\ No newline at end of file
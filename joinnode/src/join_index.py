@@ -0,0 +1,36 @@
+
+# Hash index of buffered rows, keyed by the join column of its side.
+# Rows with the same key are kept in arrival order inside its bucket.
+EMPTY_BUCKET = ()
+
+class JoinIndex:
+    def __init__(self, key_of):
+        self.key_of = key_of # row -> join key, eg InnerEqualJoin.left_key
+        self.buckets = {}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, row):
+        key = self.key_of(row)
+        bucket = self.buckets.get(key, None)
+        if bucket == None:
+            self.buckets[key] = [row]
+        else:
+            bucket.append(row)
+        self.count += 1
+
+    def get(self, key):
+        return self.buckets.get(key, EMPTY_BUCKET)
+
+    def get_for(self, row, key_of):
+        # Probe with a row of the other side, using the other side key.
+        return self.buckets.get(key_of(row), EMPTY_BUCKET)
+
+    def items(self):
+        return self.buckets.items()
+
+    def clear(self):
+        self.buckets = {}
+        self.count = 0
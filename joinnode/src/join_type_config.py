@@ -5,6 +5,8 @@ from common.config.base_type_config import (
     BaseTypeConfiguration,
 )
 from common.config.row_joining import *
+from .join_index import JoinIndex
+from .spill_partitions import SpillPartitions
 
 
 JOIN_ACTION_ID = 0
@@ -44,7 +46,7 @@ class JoinTypeConfiguration:
     def __init__(
         self, out_middleware, builder_creator, 
         left_type,in_fields_left,in_fields_right, 
-        join_id,join_conf, out_cols = None
+        join_id,join_conf, out_cols = None, shared_left = False
     ):
         self.joiner = load_joiner(join_conf)
 
@@ -55,6 +57,9 @@ class JoinTypeConfiguration:
 
         self.join_id = join_id
         self.left_type = left_type
+        # Left side is a small dimension table, buffered once per client on the node build side store
+        # and probed by every shared config with the same left type.
+        self.shared_left = shared_left
 
 
         if out_cols == None:
@@ -70,13 +75,56 @@ class JoinTypeConfiguration:
     def send(self, builder):
         return self.middleware.send(builder)
 
-    def do_join_left_row(self, right_rows, left_row, join_receiver):
-        for right_row in right_rows:
-            if self.joiner.should_join(left_row, right_row):
-                join_receiver(self.out_mapper(left_row, right_row))
-                #return # If join is only once per row then this
-
-    def do_join_right_row(self, left_rows, right_row, join_receiver):
-        for left_row in left_rows:
-            if self.joiner.should_join(left_row, right_row):
-                join_receiver(self.out_mapper(left_row, right_row))
\ No newline at end of file
+    def left_key_id(self):
+        return self.joiner.col_left
+
+    def new_left_index(self):
+        return JoinIndex(self.joiner.left_key)
+
+    def new_right_index(self):
+        return JoinIndex(self.joiner.right_key)
+
+    def new_left_spill(self):
+        return SpillPartitions(self.joiner.left_key)
+
+    def new_right_spill(self):
+        return SpillPartitions(self.joiner.right_key)
+
+    # Grace hash join, both sides spilled with the same partitioning. Only one left partition is loaded at a time.
+    def join_spilled(self, left_spill, right_spill, join_receiver):
+        for ind in range(left_spill.len_partitions()):
+            left_index = self.new_left_index()
+            for left_row in left_spill.stream_partition(ind):
+                left_index.add(left_row)
+            if len(left_index) == 0:
+                continue
+            for right_row in right_spill.stream_partition(ind):
+                self.probe_right_row(left_index, right_row, join_receiver)
+
+    # Hash join probes, O(1) lookup of the rows of the other side that share the join key.
+    def probe_left_row(self, right_index, left_row, join_receiver):
+        for right_row in right_index.get_for(left_row, self.joiner.left_key):
+            join_receiver(self.out_mapper(left_row, right_row))
+
+    def probe_right_row(self, left_index, right_row, join_receiver):
+        for left_row in left_index.get_for(right_row, self.joiner.right_key):
+            join_receiver(self.out_mapper(left_row, right_row))
+
+    # Join a whole buffered left side against the right index, bucket by bucket.
+    def join_left_index(self, right_index, left_index, join_receiver):
+        for key, left_rows in left_index.items():
+            right_rows = right_index.get(key)
+            if not right_rows:
+                continue
+            for left_row in left_rows:
+                for right_row in right_rows:
+                    join_receiver(self.out_mapper(left_row, right_row))
+
+    def join_right_index(self, left_index, right_index, join_receiver):
+        for key, right_rows in right_index.items():
+            left_rows = left_index.get(key)
+            if not left_rows:
+                continue
+            for right_row in right_rows:
+                for left_row in left_rows:
+                    join_receiver(self.out_mapper(left_row, right_row))
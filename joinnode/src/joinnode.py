@@ -1,12 +1,16 @@
 # from .type_config import TypeConfiguration
 import logging
+from middleware.routing.columnar_message import deserialize_with
 from .join_accumulator import JoinAccumulator
+from .build_side_store import BuildSideStore
 class JoinNode:
-    def __init__(self, join_middleware, payload_deserializer, type_expander):
+    def __init__(self, join_middleware, payload_deserializer, type_expander, memory_budget = None):
         self.middleware = join_middleware
         self.type_expander = type_expander
         self.payload_deserializer = payload_deserializer
         self.joiners = {}
+        self.build_sides = BuildSideStore() # Shared left sides (dimension tables) per client
+        self.memory_budget = memory_budget # Max buffered rows in memory before spilling joins to disk, None is unbounded.
 
 
     def len_in_progress(self):
@@ -16,7 +20,7 @@ class JoinNode:
         total =0 
         for _, joiner in self.joiners.items():
             total+= joiner.len_left() + joiner.len_right()
-        return total
+        return total + self.build_sides.len_rows()
 
     def len_out_rows(self):
         total =0 
@@ -28,8 +32,69 @@ class JoinNode:
         total =0 
         for _, joiner in self.joiners.items():
             total+= joiner.len_left()
+        return total + self.build_sides.len_rows()
+
+    def len_spilled_rows(self):
+        total =0 
+        for _, joiner in self.joiners.items():
+            total+= joiner.len_spilled()
         return total
 
+    def len_spillable_rows(self):
+        # Shared left sides and the joins probing them stay in memory, spilling others does not free them.
+        total =0 
+        for _, joiner in self.joiners.items():
+            if joiner.can_spill():
+                total+= joiner.len_left() + joiner.len_right()
+        return total
+
+    def check_memory_budget(self):
+        if self.memory_budget == None:
+            return
+        buffered = self.len_spillable_rows()
+        while buffered > self.memory_budget:
+            # Spill the biggest join first, freeing as much as possible with less open files.
+            biggest = None
+            for _, joiner in self.joiners.items():
+                if joiner.can_spill() and (biggest == None or joiner.len_left() + joiner.len_right() > biggest.len_left() + biggest.len_right()):
+                    biggest = joiner
+            if biggest == None or biggest.len_left() + biggest.len_right() == 0:
+                return # Nothing else can be moved to disk.
+            buffered -= biggest.len_left() + biggest.len_right()
+            biggest.spill()
+
+    def shared_configs_for(self, left_type):
+        return [config for config in self.type_expander.get_configurations_for(left_type) if config.shared_left and config.left_type == left_type]
+
+    def new_joiner(self, ide, config, headers, ind):
+        build_side = None
+        if config.shared_left:
+            build_side = self.build_sides.get_or_create(ide, config.left_type, self.shared_configs_for(config.left_type))
+        joiner = JoinAccumulator(config, config.new_builder_for(headers.sub_for(ind)), build_side = build_side)
+        self.joiners[ide+config.join_id] = joiner
+        return joiner
+
+    def free_joiner(self, ide, joiner):
+        logging.info(f"Freeing {ide+joiner.type_conf.join_id}, handling done.")
+        del self.joiners[ide+joiner.type_conf.join_id]
+        if joiner.is_shared_left():
+            self.build_sides.release(ide, joiner.type_conf.left_type, joiner.type_conf.join_id)
+
+    def free_finished(self, ide, finished):
+        for joiner in finished:
+            self.free_joiner(ide, joiner)
+
+    def handle_shared_left_eof(self, ide, type, msg_count):
+        entry = self.shared_left_entry(ide, type)
+        if entry != None and entry.handle_eof(msg_count):
+            self.free_finished(ide, entry.finish())
+
+    def shared_left_entry(self, ide, type):
+        configs = self.shared_configs_for(type)
+        if len(configs) == 0:
+            return None
+        return self.build_sides.get_or_create(ide, type, configs)
+
 
 
     def handle_task(self, headers, msg):
@@ -44,24 +109,26 @@ class JoinNode:
             type = headers.types[ind]
             ide = headers.ids[ind]
             
+            # Shared left sides count and handle the eof once for all its joins.
+            self.handle_shared_left_eof(ide, type, headers.msg_count)
+
             for config in self.type_expander.get_configurations_for(type):
+                if config.shared_left and config.left_type == type:
+                    continue
+
                 joiner = self.joiners.get(ide+config.join_id, None)
                 if joiner == None:
                     logging.info(f"For type {type}, eof was the first message to be received")
-
-                    joiner = JoinAccumulator(config, config.new_builder_for(headers.sub_for(ind)))
-                    self.joiners[ide+config.join_id] = joiner
+                    joiner = self.new_joiner(ide, config, headers, ind)
                 
                 if config.left_type == type:
                     if joiner.handle_eof_left(headers.msg_count): #check wether count msgs is all for left or eof reached before.
-                        logging.info(f"Freeing {ide+config.join_id}, handling done.")
-                        del self.joiners[ide+config.join_id]
+                        self.free_joiner(ide, joiner)
                 elif joiner.handle_eof_right(headers.msg_count): #Finished
-                        logging.info(f"Freeing {ide+config.join_id}, handling done.")
-                        del self.joiners[ide+config.join_id]
+                        self.free_joiner(ide, joiner)
             
             return
-        msg = self.payload_deserializer(msg) 
+        msg = deserialize_with(headers, msg, self.payload_deserializer)
 
         row_actions = []
         checkers = []
@@ -70,16 +137,23 @@ class JoinNode:
         ide = headers.ids[ind]
 
         for config in self.type_expander.get_configurations_for(type):
+            if config.shared_left and config.left_type == type:
+                continue
+
             joiner = self.joiners.get(ide+config.join_id, None)
 
             if joiner == None:
-                joiner = JoinAccumulator(config, config.new_builder_for(headers.sub_for(ind)))
-                self.joiners[ide+config.join_id] = joiner
+                joiner = self.new_joiner(ide, config, headers, ind)
 
             #count_checker, row_action = joiner.get_action_for_type(type)
             row_actions.append(joiner.get_action_for_type(type))
             checkers.append(joiner)
 
+        # Shared left rows are stored once, for all joins using them.
+        build_side = self.shared_left_entry(ide, type)
+        if build_side != None:
+            row_actions.append(build_side.add_row)
+
         for row in msg.stream_rows():
             for action in row_actions:
                 action(row)
@@ -87,8 +161,13 @@ class JoinNode:
 
         for joiner in checkers:
             if joiner.add_check_msg_for_type(type):
-                logging.info(f"Freeing {ide+config.join_id}, handling done.")
-                del self.joiners[ide+joiner.type_conf.join_id]
+                self.free_joiner(ide, joiner)
+
+        if build_side != None and build_side.add_check_msg():
+            logging.info(f"Build side {ide+type} received final msg after eof")
+            self.free_finished(ide, build_side.finish())
+
+        self.check_memory_budget()
 
 
     def start(self):
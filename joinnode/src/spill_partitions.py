@@ -0,0 +1,55 @@
+import csv
+import tempfile
+
+# Grace hash join layout, rows spilled to disk split in partitions by join key hash.
+# Rows with the same key always land on the same partition, so partitions can be joined one at a time.
+DEFAULT_PARTITIONS = 16
+EMPTY_PARTITION = ()
+
+class SpillPartitions:
+    def __init__(self, key_of, partitions = DEFAULT_PARTITIONS):
+        self.key_of = key_of # row -> join key, same as its JoinIndex
+        self.files = [None] * partitions
+        self.writers = [None] * partitions
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def len_partitions(self):
+        return len(self.files)
+
+    def partition_for(self, key):
+        return hash(key) % len(self.files) # Only needs to be stable inside this process.
+
+    def add(self, row):
+        ind = self.partition_for(self.key_of(row))
+        writer = self.writers[ind]
+        if writer == None:
+            # Opened lazily, removed by the os when closed.
+            self.files[ind] = tempfile.TemporaryFile(mode="w+", newline="", encoding="utf-8")
+            writer = csv.writer(self.files[ind])
+            self.writers[ind] = writer
+        writer.writerow(row)
+        self.count += 1
+
+    def add_index(self, index):
+        for _, rows in index.items():
+            for row in rows:
+                self.add(row)
+
+    def stream_partition(self, ind):
+        file = self.files[ind]
+        if file == None:
+            return EMPTY_PARTITION
+        file.flush()
+        file.seek(0)
+        return csv.reader(file)
+
+    def close(self):
+        for file in self.files:
+            if file != None:
+                file.close()
+        self.files = [None] * len(self.files)
+        self.writers = [None] * len(self.writers)
+        self.count = 0
@@ -20,6 +20,12 @@ def map_vect_to_dict_cols(cols, row):
         res[cols[i]] = row[i]
     return res
 
+
+def index_rows(index, rows):
+    for row in rows:
+        index.add(row)
+    return index
+
 class TestJoinAccumulator(unittest.TestCase):
     def build_simple_join_config(self,  result_grouper):
         in_left = ["product_id","product_name"]
@@ -71,7 +77,7 @@ class TestJoinAccumulator(unittest.TestCase):
 
         out_right = []
         for row_right in rows_right:
-            config.do_join_right_row(rows_left, row_right, out_right.append)
+            config.probe_right_row(index_rows(config.new_left_index(), rows_left), row_right, out_right.append)
 
         self.assertEqual(len(out_right), len(expected_out))
         for i in range(len(expected_out)):
@@ -111,7 +117,7 @@ class TestJoinAccumulator(unittest.TestCase):
 
         out_right = []
         for row_right in rows_right:
-            config.do_join_right_row(rows_left, row_right, out_right.append)
+            config.probe_right_row(index_rows(config.new_left_index(), rows_left), row_right, out_right.append)
 
         self.assertEqual(len(out_right), len(expected_out))
         for i in range(len(expected_out)):
@@ -147,14 +153,14 @@ class TestJoinAccumulator(unittest.TestCase):
 
         out_right = []
         for row_right in rows_right:
-            config.do_join_right_row(rows_left, row_right, out_right.append)
+            config.probe_right_row(index_rows(config.new_left_index(), rows_left), row_right, out_right.append)
         self.assertEqual(len(out_right), len(expected_out))
         for i in range(len(expected_out)):
             self.assertEqual(out_right[i], expected_out[i])
 
         out_left = []
         for row_left in rows_left:
-            config.do_join_left_row(rows_right, row_left, out_left.append)
+            config.probe_left_row(index_rows(config.new_right_index(), rows_right), row_left, out_left.append)
 
         self.assertEqual(len(out_left), len(expected_out))
         for i in range(len(expected_out)):
@@ -374,3 +380,46 @@ class TestJoinAccumulator(unittest.TestCase):
         payloads = [msg.payload for msg in result_grouper.msgs if not msg.is_eof()]
         self.assertEqual(len(payloads), 1)  # One message 
         self.assertEqual(len(payloads[0]), 1)  # One joined row
+
+    def test_hash_join_matches_nested_loop_join(self):
+        result_grouper = MockCopyMiddleware()
+        in_left, in_right, out_cols, config = self.build_simple_join_config(result_grouper)
+
+        rows_left = [{"product_name": f"P{i}", "product_id": f"id{i % 4}"} for i in range(8)]
+        rows_right = [{"top_product_id": f"id{i % 5}", "month": i, "revenue": i * 10} for i in range(10)]
+
+        rows_left = [map_dict_to_vect_cols(in_left, r) for r in rows_left]
+        rows_right = [map_dict_to_vect_cols(in_right, r) for r in rows_right]
+
+        expected = [ # Nested loop join
+            config.out_mapper(left_row, right_row)
+            for right_row in rows_right for left_row in rows_left
+            if config.joiner.should_join(left_row, right_row)
+        ]
+
+        for left_finishes_first in (True, False):
+            result_grouper.msgs = []
+            acc = JoinAccumulator(config, BareMockMessageBuilder.default())
+            for left_row in rows_left[:4]:
+                acc.get_action_for_type("LEFT")(left_row)
+            for right_row in rows_right[:5]:
+                acc.get_action_for_type("RIGHT")(right_row)
+
+            if left_finishes_first:
+                for left_row in rows_left[4:]:
+                    acc.get_action_for_type("LEFT")(left_row)
+                acc.handle_eof_left(0)
+                for right_row in rows_right[5:]:
+                    acc.get_action_for_type("RIGHT")(right_row)
+                acc.handle_eof_right(0)
+            else:
+                for right_row in rows_right[5:]:
+                    acc.get_action_for_type("RIGHT")(right_row)
+                acc.handle_eof_right(0)
+                for left_row in rows_left[4:]:
+                    acc.get_action_for_type("LEFT")(left_row)
+                acc.handle_eof_left(0)
+
+            self.assertTrue(result_grouper.msgs[-1].is_eof())
+            got = [row for msg in result_grouper.msgs[:-1] for row in msg.payload]
+            self.assertEqual(sorted(got), sorted(expected))
@@ -0,0 +1,44 @@
+import unittest
+
+from common.config.row_joining import *
+from joinnode.src.join_index import *
+
+
+class TestJoinIndex(unittest.TestCase):
+    def test_add_and_get_keeps_arrival_order_in_bucket(self):
+        joiner = InnerEqualJoin(0, 1)
+        index = JoinIndex(joiner.left_key)
+
+        index.add(["id1", "A"])
+        index.add(["id2", "B"])
+        index.add(["id1", "C"])
+
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.get("id1"), [["id1", "A"], ["id1", "C"]])
+        self.assertEqual(index.get("id2"), [["id2", "B"]])
+
+    def test_get_missing_key_is_empty(self):
+        index = JoinIndex(lambda row: row[0])
+        index.add(["id1", "A"])
+
+        self.assertEqual(len(index.get("idX")), 0)
+
+    def test_probe_with_other_side_key(self):
+        joiner = InnerEqualJoin(0, 1)
+        left_index = JoinIndex(joiner.left_key)
+        left_index.add(["match", "L"])
+
+        self.assertEqual(left_index.get_for(["X", "match"], joiner.right_key), [["match", "L"]])
+        self.assertEqual(len(left_index.get_for(["match", "X"], joiner.right_key)), 0)
+
+    def test_clear(self):
+        index = JoinIndex(lambda row: row[0])
+        index.add(["id1", "A"])
+        index.clear()
+
+        self.assertEqual(len(index), 0)
+        self.assertEqual(len(index.get("id1")), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -414,3 +414,161 @@ class TestJoinAccumulator(unittest.TestCase):
             self.assertEqual(rows_out[i], expected_out_q[i])
 
 
+    def test_shared_left_is_buffered_once_and_freed_after_all_joins(self):
+        result_grouper = MockCopyMiddleware()
+        result_grouper2 = MockCopyMiddleware()
+        in_left = ["product_id","product_name"]
+        in_right = ["top_product_id","month","revenue",]
+        in_right_q = ["top_product_id","month","quantity_sold",]
+        out_cols = ["product_name","month","revenue",]
+        out_cols_q = ["product_name","month","quantity_sold",]
+
+        types_expander = TypeExpander()
+        types_expander.add_configuration_to_many(JoinTypeConfiguration(result_grouper, BareMockMessageBuilder,
+            left_type= "LEFT",
+            in_fields_left=in_left,
+            in_fields_right=in_right,
+            join_id = "join_id",
+            join_conf=[INNER_ON_EQ, {"col_left":"product_id", "col_right":"top_product_id"}],
+            out_cols= out_cols,
+            shared_left= True,
+        ), "LEFT", "RIGHT")
+        types_expander.add_configuration_to_many(JoinTypeConfiguration(result_grouper2, BareMockMessageBuilder,
+            left_type= "LEFT",
+            in_fields_left=in_left,
+            in_fields_right=in_right_q,
+            join_id = "join_id_q",
+            join_conf=[INNER_ON_EQ, {"col_left":"product_id", "col_right":"top_product_id"}],
+            out_cols= out_cols_q,
+            shared_left= True,
+        ), "LEFT", "RIGHT2")
+
+        rows_left = [["prod_1", "PRODUCT NAME 1"], ["prod_2", "PRODUCT NAME 2"], ["prod_3", "PRODUCT NAME 3"]]
+        rows_right = [["prod_1", "1", "10"], ["prod_2", "3", "30"], ["prod_4", "4", "40"]]
+        rows_right_q = [["prod_1", "1", "2"], ["prod_3", "2", "3"]]
+
+        in_middle = MockMiddleware()
+        node = JoinNode(in_middle, MockMessage, types_expander)
+        node.start()
+
+        in_middle.push_msg(BareMockMessageBuilder.for_payload(["user_id"], ["LEFT"], rows_left, lambda r: r))
+        # Left rows stored once, not once per join.
+        self.assertEqual(node.len_left_rows(), len(rows_left))
+        self.assertEqual(node.build_sides.len_entries(), 1)
+
+        # Right side finishes before left eof, it waits for the shared left side.
+        in_middle.push_msg(BareMockMessageBuilder.for_payload(["user_id"], ["RIGHT"], rows_right, lambda r: r))
+        eof_message = BareMockMessageBuilder.for_payload(["user_id"],["RIGHT"],[], lambda r: r)
+        eof_message.set_as_eof(1)
+        in_middle.push_msg(eof_message)
+        self.assertEqual(len(result_grouper.msgs), 0)
+
+        eof_message = BareMockMessageBuilder.for_payload(["user_id"],["LEFT"],[], lambda r: r)
+        eof_message.set_as_eof(1)
+        in_middle.push_msg(eof_message)
+
+        self.assertEqual(len(result_grouper.msgs), 2)
+        self.assertEqual(result_grouper.msgs[-1].is_eof(), True)
+        self.assertEqual(result_grouper.msgs[0].payload, [["PRODUCT NAME 1", "1", "10"], ["PRODUCT NAME 2", "3", "30"]])
+
+        # Second join still probes the shared left side.
+        self.assertEqual(node.build_sides.len_entries(), 1)
+        in_middle.push_msg(BareMockMessageBuilder.for_payload(["user_id"], ["RIGHT2"], rows_right_q, lambda r: r))
+        eof_message = BareMockMessageBuilder.for_payload(["user_id"],["RIGHT2"],[], lambda r: r)
+        eof_message.set_as_eof(1)
+        in_middle.push_msg(eof_message)
+
+        self.assertEqual(len(result_grouper2.msgs), 2)
+        self.assertEqual(result_grouper2.msgs[0].payload, [["PRODUCT NAME 1", "1", "2"], ["PRODUCT NAME 3", "2", "3"]])
+
+        self.assertEqual(node.len_in_progress(), 0)
+        self.assertEqual(node.build_sides.len_entries(), 0)
+        self.assertEqual(node.len_input_rows(), 0)
+
+    def test_join_spilled_to_disk_gives_same_output_and_eof_count(self):
+        in_left = ["user_id","birthday"]
+        in_right = ["store_id","top_user_id","purchase_count",]
+        out_cols = ["store_id","birthday"]
+
+        rows_left = [[f"user_{i}", f"bday_{i}"] for i in range(30)]
+        rows_right = [[f"store_{i%3}", f"user_{i%40}", str(i)] for i in range(50)]
+
+        def run(memory_budget):
+            result_grouper = MockCopyMiddleware()
+            types_expander = TypeExpander()
+            types_expander.add_configuration_to_many(JoinTypeConfiguration(result_grouper, BareMockMessageBuilder,
+                left_type= "LEFT",
+                in_fields_left=in_left,
+                in_fields_right=in_right,
+                join_id = "join_id",
+                join_conf=[INNER_ON_EQ, {"col_left":"user_id", "col_right":"top_user_id"}],
+                out_cols= out_cols,
+            ), "LEFT", "RIGHT")
+
+            in_middle = MockMiddleware()
+            node = JoinNode(in_middle, MockMessage, types_expander, memory_budget = memory_budget)
+            node.start()
+
+            # Left in two messages, right before and after left eof.
+            in_middle.push_msg(BareMockMessageBuilder.for_payload(["user_id"], ["LEFT"], rows_left[:15], lambda r: r))
+            in_middle.push_msg(BareMockMessageBuilder.for_payload(["user_id"], ["RIGHT"], rows_right[:25], lambda r: r))
+            in_middle.push_msg(BareMockMessageBuilder.for_payload(["user_id"], ["LEFT"], rows_left[15:], lambda r: r))
+            spilled = node.len_spilled_rows()
+
+            eof_message = BareMockMessageBuilder.for_payload(["user_id"],["LEFT"],[], lambda r: r)
+            eof_message.set_as_eof(2)
+            in_middle.push_msg(eof_message)
+
+            in_middle.push_msg(BareMockMessageBuilder.for_payload(["user_id"], ["RIGHT"], rows_right[25:], lambda r: r))
+            eof_message = BareMockMessageBuilder.for_payload(["user_id"],["RIGHT"],[], lambda r: r)
+            eof_message.set_as_eof(2)
+            in_middle.push_msg(eof_message)
+
+            self.assertEqual(node.len_in_progress(), 0)
+            self.assertEqual(result_grouper.msgs[-1].is_eof(), True)
+            self.assertEqual(result_grouper.msgs[-1].headers.msg_count, len(result_grouper.msgs) - 1)
+
+            rows_out = []
+            for msg in result_grouper.msgs[:-1]:
+                rows_out.extend(msg.payload)
+            return spilled, sorted(rows_out)
+
+        spilled_mem, rows_mem = run(None)
+        spilled_disk, rows_disk = run(20)
+
+        self.assertEqual(spilled_mem, 0)
+        self.assertTrue(spilled_disk > 0)
+        self.assertEqual(len(rows_mem), 40)
+        self.assertEqual(rows_disk, rows_mem)
+
+    def test_shared_left_rows_do_not_force_spills(self):
+        types_expander = TypeExpander()
+        types_expander.add_configuration_to_many(JoinTypeConfiguration(MockCopyMiddleware(), BareMockMessageBuilder,
+            left_type= "LEFT",
+            in_fields_left=["product_id","product_name"],
+            in_fields_right=["top_product_id","month","revenue",],
+            join_id = "join_id_shared",
+            join_conf=[INNER_ON_EQ, {"col_left":"product_id", "col_right":"top_product_id"}],
+            shared_left= True,
+        ), "LEFT", "RIGHT")
+        types_expander.add_configuration_to_many(JoinTypeConfiguration(MockCopyMiddleware(), BareMockMessageBuilder,
+            left_type= "LEFT2",
+            in_fields_left=["user_id","birthday"],
+            in_fields_right=["store_id","top_user_id","purchase_count",],
+            join_id = "join_id",
+            join_conf=[INNER_ON_EQ, {"col_left":"user_id", "col_right":"top_user_id"}],
+        ), "LEFT2", "RIGHT2")
+
+        in_middle = MockMiddleware()
+        node = JoinNode(in_middle, MockMessage, types_expander, memory_budget = 5)
+        node.start()
+
+        # Shared left side alone over the budget, it can not be spilled.
+        in_middle.push_msg(BareMockMessageBuilder.for_payload(["user_id"], ["LEFT"], [[f"prod_{i}", f"P{i}"] for i in range(10)], lambda r: r))
+        in_middle.push_msg(BareMockMessageBuilder.for_payload(["user_id"], ["LEFT2"], [[f"user_{i}", f"bday_{i}"] for i in range(3)], lambda r: r))
+        self.assertEqual(node.len_spilled_rows(), 0) # Spilling the other join would not free the shared rows
+        self.assertEqual(node.len_spillable_rows(), 3)
+
+        in_middle.push_msg(BareMockMessageBuilder.for_payload(["user_id"], ["LEFT2"], [[f"user_{i}", f"bday_{i}"] for i in range(3, 6)], lambda r: r))
+        self.assertEqual(node.len_spilled_rows(), 6) # Over the budget with its own rows
+        self.assertEqual(node.len_spillable_rows(), 0)
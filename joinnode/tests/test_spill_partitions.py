@@ -0,0 +1,36 @@
+import unittest
+
+from common.config.row_joining import *
+from joinnode.src.spill_partitions import *
+
+
+class TestSpillPartitions(unittest.TestCase):
+    def test_same_key_lands_on_same_partition(self):
+        joiner = InnerEqualJoin(0, 1)
+        spill = SpillPartitions(joiner.left_key, partitions = 4)
+
+        spill.add(["id1", "A"])
+        spill.add(["id2", "B"])
+        spill.add(["id1", "C"])
+        self.assertEqual(len(spill), 3)
+
+        ind = spill.partition_for("id1")
+        rows = [row for row in spill.stream_partition(ind) if row[0] == "id1"]
+        self.assertEqual(rows, [["id1", "A"], ["id1", "C"]])
+        spill.close()
+
+    def test_all_rows_are_read_back(self):
+        joiner = InnerEqualJoin(0, 1)
+        spill = SpillPartitions(joiner.left_key, partitions = 3)
+        rows = [[f"id{i}", str(i)] for i in range(20)]
+        for row in rows:
+            spill.add(row)
+
+        read = []
+        for ind in range(spill.len_partitions()):
+            read.extend(spill.stream_partition(ind))
+        self.assertEqual(sorted(read), sorted(rows))
+
+        spill.close()
+        self.assertEqual(len(spill), 0)
+        self.assertEqual(list(spill.stream_partition(0)), [])
@@ -0,0 +1,64 @@
+import logging
+import threading
+
+# Process wide pool of open middlewares, so a short lived user (a client connection) does not pay
+# the broker connection setup each time. Blocking connections are not thread safe, a leased
+# middleware must only be used by one thread at a time, from lease to release (release checks
+# its health and flushes it). The dispatcher leases, publishes and releases on the publisher thread of its pipeline.
+class MiddlewarePool:
+	def __init__(self, factory, max_idle):
+		self.factory = factory # () -> middleware with is_healthy(), flush() and close()
+		self.max_idle = max_idle
+		self.idle = []
+		self.lock = threading.Lock()
+
+	def _pop_idle(self):
+		with self.lock:
+			if len(self.idle) == 0:
+				return None
+			return self.idle.pop() # Most recently used first, the least likely to be stale.
+
+	def lease(self):
+		middleware = self._pop_idle()
+		while middleware != None:
+			if self._is_healthy(middleware):
+				return middleware
+			logging.warning("action: middleware_pool_lease | result: in_progress | msg: discarded closed connection")
+			self._discard(middleware)
+			middleware = self._pop_idle()
+
+		return self.factory() # Reconnect, every idle one was closed.
+
+	# Broken middlewares, or the ones that do not fit in the pool, are closed instead of kept.
+	def release(self, middleware, broken = False):
+		if not broken:
+			try:
+				middleware.flush()
+			except Exception as e:
+				logging.warning(f"action: middleware_pool_release | result: fail | error: {e}")
+				broken = True
+
+		if not broken and self._is_healthy(middleware):
+			with self.lock:
+				if len(self.idle) < self.max_idle:
+					self.idle.append(middleware)
+					return
+		self._discard(middleware)
+
+	def _is_healthy(self, middleware):
+		try:
+			return middleware.is_healthy()
+		except Exception:
+			return False
+
+	def _discard(self, middleware):
+		try:
+			middleware.close()
+		except Exception as e:
+			logging.debug(f"action: middleware_pool_discard | result: fail | error: {e}")
+
+	def close(self):
+		with self.lock:
+			idle, self.idle = self.idle, []
+		for middleware in idle:
+			self._discard(middleware)
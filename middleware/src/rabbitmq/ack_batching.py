@@ -0,0 +1,40 @@
+import os
+
+# Acks of handled deliveries can be sent as a single basic.ack with multiple=True.
+# Deliveries on a channel are handled in order, so acking the last tag covers every one before it.
+# 1 acks each delivery right away.
+ACK_BATCH_MSGS = int(os.getenv("ACK_BATCH_MSGS", "1"))
+ACK_FLUSH_MS = int(os.getenv("ACK_FLUSH_MS", "100"))
+
+
+class AckBatcher:
+	def __init__(self, ack_multiple, max_msgs = ACK_BATCH_MSGS):
+		self.ack_multiple = ack_multiple # (delivery_tag), acks all deliveries up to it
+		self.max_msgs = max_msgs
+		self.limit = max_msgs
+		self.last_tag = None
+		self.pending = 0
+
+	def is_enabled(self):
+		return self.max_msgs > 1
+
+	# The broker sends no more than prefetch unacked deliveries, holding that many acks would stall the consumer.
+	def set_prefetch(self, prefetch_count):
+		self.limit = max(1, min(self.max_msgs, prefetch_count // 2))
+
+	def has_pending(self):
+		return self.last_tag != None
+
+	def add(self, delivery_tag):
+		self.last_tag = delivery_tag
+		self.pending += 1
+		if self.pending >= self.limit:
+			self.flush()
+
+	def flush(self):
+		if self.last_tag == None:
+			return
+		delivery_tag = self.last_tag
+		self.last_tag = None
+		self.pending = 0
+		self.ack_multiple(delivery_tag)
@@ -2,8 +2,12 @@ from ..errors import *
 from . import utils
 import logging
 import threading
+import time
 from ..routing.csv_message import CSVMessageBuilder, CSVMessage
-from ..routing.header_fields import BaseHeaders
+from ..routing.header_fields import BaseHeaders, FIELD_PARTITION_IND
+from .publish_batching import *
+from .prefetch import *
+from .ack_batching import *
 
 
 DEFAULT_EXCHANGE = ''
@@ -14,6 +18,37 @@ class RabbitMQChannel:
 		self.channel = channel
 		self.exch_name= DEFAULT_EXCHANGE
 
+		# Optional coalescing of small sends, flushed by size, on eof and once past its deadline.
+		# Producer only connections never run process_data_events, so a connection timer would not fire,
+		# the deadline is checked on each send instead.
+		self.batcher = PublishBatcher(self._publish)
+		self.flush_deadline = None
+		self.clock = time.monotonic
+		if PUBLISH_CONFIRMS:
+			# Blocking channel waits each publish confirm, with coalescing it is one confirm per batch.
+			self.channel.confirm_delivery()
+
+		self.prefetch_count = PREFETCH_COUNT
+		self.adaptive_prefetch = AdaptivePrefetch(PREFETCH_COUNT) if PREFETCH_ADAPTIVE else None
+
+		# Optional coalescing of acks, flushed by count, by timer, on eof, before a nack and on close.
+		self.acks = AckBatcher(self._ack_multiple)
+		self.acks.set_prefetch(self.prefetch_count)
+		self.ack_timer = None
+		self.call_later = None # (delay_s, callback), the connection timer when None.
+		# Flushes the outputs of the node, coalesced on other connections, before its inputs are acked.
+		self.before_ack = None
+
+	@property
+	def is_open(self):
+		return self.channel.is_open
+
+	def stop_consuming(self):
+		self.channel.stop_consuming()
+
+	def close(self):
+		self.channel.close()
+
 	def exchange_declare(self, exch_name, exch_type):
 		self.channel.exchange_declare(
 		    exchange=exch_name,
@@ -32,8 +67,86 @@ class RabbitMQChannel:
 		self.channel.queue_bind(queue=name, exchange=self.exch_name, routing_key=routing_key)
 
 
-	# Serial basic _send
 	def send(self, routing_key, headers, serial_msg):
+		if not self.batcher.is_enabled():
+			self._publish(routing_key, headers, serial_msg)
+			return
+
+		self.batcher.add(routing_key, headers, serial_msg)
+		if FIELD_PARTITION_IND in headers:
+			self.flush() # Eof or error, everything before it must be sent now.
+		elif not self.batcher.has_pending():
+			self.flush_deadline = None # Flushed by size
+		elif self.flush_deadline == None:
+			self.flush_deadline = self.clock() + PUBLISH_FLUSH_MS/1000
+		elif self.clock() >= self.flush_deadline:
+			self._flush_publishes()
+
+	def _flush_publishes(self):
+		self.flush_deadline = None
+		self.batcher.flush()
+
+	def flush(self):
+		self._flush_publishes()
+		self.acks.flush()
+
+	def ack(self, delivery_tag, flush_now = False):
+		if not self.acks.is_enabled():
+			self._flush_outputs()
+			self.channel.basic_ack(delivery_tag = delivery_tag)
+			return
+
+		self.acks.add(delivery_tag)
+		if flush_now:
+			self.acks.flush()
+		elif self.acks.has_pending() and self.ack_timer == None:
+			self.ack_timer = self._call_later(ACK_FLUSH_MS/1000, self._on_ack_timer)
+
+	# The consumer runs process_data_events on its connection, so its timers fire.
+	def _call_later(self, delay_s, callback):
+		if self.call_later != None:
+			return self.call_later(delay_s, callback)
+		return self.channel.connection.call_later(delay_s, callback)
+
+	def nack(self, delivery_tag, requeue):
+		# Handled deliveries before this one are acked first, a later multiple ack does not cover a nacked tag.
+		self.acks.flush()
+		self.channel.basic_nack(delivery_tag=delivery_tag, requeue=requeue)
+
+	def _on_ack_timer(self):
+		self.ack_timer = None
+		self.acks.flush()
+
+	def _ack_multiple(self, delivery_tag):
+		self._flush_outputs()
+		self.channel.basic_ack(delivery_tag = delivery_tag, multiple=True)
+
+	# Outputs of the acked deliveries must reach the broker before them, else a crash loses them.
+	def _flush_outputs(self):
+		self._flush_publishes()
+		if self.before_ack != None:
+			self.before_ack()
+
+	# Handles each message of a coalesced delivery, then acks the delivery once.
+	def handle_coalesced(self, callback, method, headers, body, r_type = None):
+		any_eof = False
+		for msg_headers, msg_body in iter_coalesced(headers, body):
+			headers_obj = BaseHeaders.from_headers(msg_headers)
+			if r_type != None:
+				headers_obj.types = [r_type]
+			any_eof = any_eof or headers_obj.is_eof()
+			try:
+				if callback(headers_obj, msg_body):
+					# Requeue only this one, the others were already handled.
+					self.channel.basic_publish(exchange=method.exchange, routing_key=method.routing_key, body=msg_body,
+						properties=utils.build_headers(msg_headers))
+			except Exception as e:
+				logging.error(f"Message handling failed {headers_obj}")
+				logging.error(f"payload: {msg_body[:min(50,len(msg_body))]} error: {e}")
+		self.ack(method.delivery_tag, any_eof)
+
+	# Serial basic _send
+	def _publish(self, routing_key, headers, serial_msg):
 		try:
 			self.channel.basic_publish(exchange=self.exch_name, routing_key=routing_key, body=serial_msg,  
 				properties=utils.build_headers(headers))
@@ -55,35 +168,65 @@ class RabbitMQChannel:
 		def real_callback(ch, method, properties, body):
 			#logging.info(f"action: msg_recv | result: success | queue: {self.queue_name} | method: {method} | props: {properties} | body:{body}")
 			#CSVMessage(properties.headers, body)
+			if is_coalesced(properties.headers):
+				self.handle_coalesced(callback, method, properties.headers, body)
+				return
+
 			headers = BaseHeaders.from_headers(properties.headers)
 			try:
 				msg_failed = callback(headers, body) # Handle msg
 
 				if msg_failed:
 					# If msg failed, requeue is desired else throw exception(for now?)
-					ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True) 				
+					self.nack(method.delivery_tag, requeue=True)
 				else:
-					ch.basic_ack(delivery_tag = method.delivery_tag)
+					self.ack(method.delivery_tag, headers.is_eof())
 
 			except Exception as e:
 				logging.error(f"Message handling failed {headers}")
 				logging.error(f"payload: {body[:min(50,len(body))]} error: {e}")
-				ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)	
+				self.nack(method.delivery_tag, requeue=False)
 
 
 		return real_callback
 
+	# Times each handled delivery when prefetch is adaptive.
+	def _timed_callback(self, callback):
+		if self.adaptive_prefetch == None:
+			return callback
+
+		def timed_callback(ch, method, properties, body):
+			start = time.monotonic()
+			callback(ch, method, properties, body)
+			self.observe_delivery(time.monotonic() - start, len(body))
+		return timed_callback
+
+	def observe_delivery(self, latency_s, msg_bytes):
+		new_count = self.adaptive_prefetch.observe(latency_s, msg_bytes)
+		if new_count == None:
+			return
+		logging.info(f"action: prefetch_adjust | result: success | {self.prefetch_metrics()}")
+		self.set_prefetch(new_count)
+
+	def prefetch_metrics(self):
+		if self.adaptive_prefetch == None:
+			return {"prefetch": self.prefetch_count}
+		return self.adaptive_prefetch.metrics()
+
 	def declare_consume(self, queue_name, on_message_callback):
 		self.channel.basic_consume(
-			queue=queue_name, on_message_callback=self._callback_wrapper(on_message_callback), auto_ack=False)
+			queue=queue_name, on_message_callback=self._timed_callback(self._callback_wrapper(on_message_callback)), auto_ack=False)
 
 	def declare_raw_consume(self, queue_name, on_message_callback):
 		self.channel.basic_consume(
-			queue=queue_name, on_message_callback=on_message_callback, auto_ack=False)
+			queue=queue_name, on_message_callback=self._timed_callback(on_message_callback), auto_ack=False)
 
-	def start_consume(self, prefetch_count = 2):
+	def start_consume(self, prefetch_count = None):
+		if prefetch_count != None:
+			self.prefetch_count = prefetch_count
+			self.acks.set_prefetch(prefetch_count)
 		try:
-			self.channel.basic_qos(prefetch_count=prefetch_count)
+			self.channel.basic_qos(prefetch_count=self.prefetch_count)
 			self.channel.start_consuming()
 		except utils.RoutingRestartError as e:
 			logging.error(f"Routing connection error happened at consume, restart connection {e}")
@@ -93,7 +236,9 @@ class RabbitMQChannel:
 		except Exception as e:
 			raise MessageMiddlewareMessageError(f"RabbitMQ message handling error: {e}") from e
 
-	def set_prefetch(self, prefetch_count = 2):
+	def set_prefetch(self, prefetch_count = PREFETCH_COUNT):
+		self.prefetch_count = prefetch_count
+		self.acks.set_prefetch(prefetch_count)
 		self.channel.basic_qos(prefetch_count=prefetch_count)
 
 
@@ -104,7 +249,7 @@ class RabbitMQManager:
 		self.is_consuming = threading.Event()
 		self.is_stopped = threading.Event()
 
-		utils.wait_middleware_init()
+		utils.wait_middleware_init(self.host)
 		self._start_connection()
 
 
@@ -116,6 +261,16 @@ class RabbitMQManager:
 		self.channels.append(channel)
 		return channel
 
+	# Whether the connection is still usable, serves pending heartbeats while idle.
+	def is_healthy(self):
+		if not self._conn.is_open:
+			return False
+		try:
+			self._conn.process_data_events(time_limit=0)
+		except utils.RoutingRestartError:
+			return False
+		return self._conn.is_open
+
 	def stop_channels(self):
 		for channel in self.channels:
 			if channel.is_open:
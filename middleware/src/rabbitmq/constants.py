@@ -4,6 +4,7 @@ from pika.exceptions import AMQPError, StreamLostError, ChannelClosedByBroker, C
 import socket
 
 RABBITMQ_HOST = "middleware"
+RABBITMQ_PORT = 5672
 
 RoutingRestartError = (
 	StreamLostError,
@@ -0,0 +1,65 @@
+import os
+import math
+
+# Prefetch window of each consumer channel, set per node type on its environment.
+PREFETCH_COUNT = int(os.getenv("PREFETCH_COUNT", "2"))
+# Adaptive mode tunes the window from the observed callback latency and message size.
+PREFETCH_ADAPTIVE = os.getenv("PREFETCH_ADAPTIVE", "0") != "0"
+PREFETCH_MIN = int(os.getenv("PREFETCH_MIN", "1"))
+PREFETCH_MAX = int(os.getenv("PREFETCH_MAX", "256"))
+# Work buffered at the consumer, enough to hide the broker round trip between messages.
+PREFETCH_TARGET_MS = float(os.getenv("PREFETCH_TARGET_MS", "200"))
+# Memory bound of the window, big messages get a smaller one.
+PREFETCH_MAX_BYTES = int(os.getenv("PREFETCH_MAX_BYTES", str(16 * 1024 * 1024)))
+
+ADJUST_EVERY_MSGS = 32
+EWMA_WEIGHT = 0.2
+
+
+class AdaptivePrefetch:
+	def __init__(self, initial = PREFETCH_COUNT, min_count = PREFETCH_MIN, max_count = PREFETCH_MAX,
+			target_ms = PREFETCH_TARGET_MS, max_bytes = PREFETCH_MAX_BYTES):
+		self.current = initial
+		self.min_count = min_count
+		self.max_count = max_count
+		self.target_ms = target_ms
+		self.max_bytes = max_bytes
+
+		self.latency_ms = None # ewma
+		self.msg_bytes = None # ewma
+		self.observed = 0
+
+	def _ewma(self, prev, value):
+		if prev == None:
+			return value
+		return prev + EWMA_WEIGHT * (value - prev)
+
+	def suggested(self):
+		if self.latency_ms == None:
+			return self.current
+		by_latency = math.ceil(self.target_ms / max(self.latency_ms, 0.01))
+		by_bytes = self.max_bytes // max(self.msg_bytes, 1)
+		return max(self.min_count, min(self.max_count, by_latency, by_bytes))
+
+	# Returns the new prefetch count when it should be changed, else None.
+	def observe(self, latency_s, msg_bytes):
+		self.latency_ms = self._ewma(self.latency_ms, latency_s * 1000)
+		self.msg_bytes = self._ewma(self.msg_bytes, msg_bytes)
+		self.observed += 1
+		if self.observed % ADJUST_EVERY_MSGS != 0:
+			return None
+
+		suggested = self.suggested()
+		# Ignore small changes, each one is a basic.qos round trip.
+		if abs(suggested - self.current) * 4 < self.current:
+			return None
+		self.current = suggested
+		return suggested
+
+	def metrics(self):
+		return {
+			"prefetch": self.current,
+			"latency_ms": round(self.latency_ms or 0, 3),
+			"msg_bytes": int(self.msg_bytes or 0),
+			"observed": self.observed,
+		}
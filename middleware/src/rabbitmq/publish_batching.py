@@ -0,0 +1,77 @@
+import os
+
+# Coalescing of small messages sent to the same routing key into a single AMQP message.
+# Headers of each coalesced message are kept in order in FIELD_COALESCED, with its body lengths,
+# consumers split it back and handle each message as if it was received alone. So counts are the same.
+FIELD_COALESCED = "coalesced"
+FIELD_COALESCED_LENS = "coalesced_lens"
+
+# Disabled by default, 0 bytes means each send is published right away.
+PUBLISH_BATCH_BYTES = int(os.getenv("PUBLISH_BATCH_BYTES", "0"))
+PUBLISH_BATCH_MSGS = int(os.getenv("PUBLISH_BATCH_MSGS", "64"))
+PUBLISH_FLUSH_MS = int(os.getenv("PUBLISH_FLUSH_MS", "50"))
+PUBLISH_CONFIRMS = os.getenv("PUBLISH_CONFIRMS", "0") != "0"
+
+
+def is_coalesced(headers):
+	return headers != None and FIELD_COALESCED in headers
+
+# Yields (headers, body) of each message in a delivery, coalesced or not.
+def iter_coalesced(headers, body):
+	if not is_coalesced(headers):
+		yield headers, body
+		return
+
+	start = 0
+	for msg_headers, length in zip(headers[FIELD_COALESCED], headers[FIELD_COALESCED_LENS]):
+		yield msg_headers, body[start:start+length]
+		start+= length
+
+
+class PublishBatcher:
+	def __init__(self, publish, max_bytes = PUBLISH_BATCH_BYTES, max_msgs = PUBLISH_BATCH_MSGS):
+		self.publish = publish # (routing_key, headers, body)
+		self.max_bytes = max_bytes
+		self.max_msgs = max_msgs
+		self.pending = {} # routing key -> ([headers], [bodies], bytes)
+
+	def is_enabled(self):
+		return self.max_bytes > 0
+
+	def has_pending(self):
+		return len(self.pending) > 0
+
+	def add(self, routing_key, headers, body):
+		batch = self.pending.get(routing_key, None)
+		if batch == None:
+			batch = ([], [], 0)
+
+		headers_list, bodies, size = batch
+		if len(bodies) > 0 and size + len(body) > self.max_bytes:
+			self.flush_key(routing_key) # Would not fit, send what was there first to keep order.
+			headers_list, bodies, size = [], [], 0
+
+		headers_list.append(headers)
+		bodies.append(body)
+		self.pending[routing_key] = (headers_list, bodies, size + len(body))
+
+		if size + len(body) >= self.max_bytes or len(bodies) >= self.max_msgs:
+			self.flush_key(routing_key)
+
+	def flush_key(self, routing_key):
+		batch = self.pending.pop(routing_key, None)
+		if batch == None:
+			return
+		headers_list, bodies, _ = batch
+		if len(bodies) == 1:
+			self.publish(routing_key, headers_list[0], bodies[0])
+			return
+
+		self.publish(routing_key, {
+			FIELD_COALESCED: headers_list,
+			FIELD_COALESCED_LENS: [len(body) for body in bodies],
+		}, b"".join(bodies))
+
+	def flush(self):
+		for routing_key in list(self.pending.keys()):
+			self.flush_key(routing_key)
@@ -1,4 +1,8 @@
 import pika
+import os
+import random
+import socket
+import threading
 import time
 import logging
 
@@ -11,26 +15,76 @@ def build_headers(headers):
 				headers=headers
 			)
 
-def wait_middleware_init():
-	time.sleep(5)
+# Startup waits for the broker with exponential backoff and full jitter, instead of fixed sleeps.
+BROKER_PROBE_TIMEOUT_S = float(os.getenv("BROKER_PROBE_TIMEOUT_S", "120"))
+BROKER_BACKOFF_BASE_S = float(os.getenv("BROKER_BACKOFF_BASE_S", "0.1"))
+BROKER_BACKOFF_MAX_S = float(os.getenv("BROKER_BACKOFF_MAX_S", "5"))
 
-	
-def try_open_connection(host,max_attempts):
-	for i in range(1,max_attempts):
+# Hosts already known to accept connections, later managers of the process do not wait again.
+_ready_hosts = set()
+_ready_lock = threading.Lock()
+
+def backoff_delay(attempt, base = BROKER_BACKOFF_BASE_S, cap = BROKER_BACKOFF_MAX_S):
+	return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def is_broker_ready(host):
+	with _ready_lock:
+		return host in _ready_hosts
+
+def mark_broker_ready(host):
+	with _ready_lock:
+		_ready_hosts.add(host)
+
+def forget_broker_ready(host):
+	with _ready_lock:
+		_ready_hosts.discard(host)
+
+def probe_broker(host, port = RABBITMQ_PORT, timeout = 1):
+	try:
+		with socket.create_connection((host, port), timeout=timeout):
+			return True
+	except OSError:
+		return False
+
+# Returns once the broker port accepts connections, or after BROKER_PROBE_TIMEOUT_S
+# letting the connection attempts report the error.
+def wait_middleware_init(host = RABBITMQ_HOST):
+	if is_broker_ready(host):
+		return
+
+	deadline = time.monotonic() + BROKER_PROBE_TIMEOUT_S
+	attempt = 0
+	while not probe_broker(host):
+		if time.monotonic() >= deadline:
+			logging.warning(f"action: wait_middleware_init | result: fail | host: {host}")
+			return
+		time.sleep(backoff_delay(attempt))
+		attempt += 1
+	mark_broker_ready(host)
+
+def _open_connection(host):
+	return pika.BlockingConnection(pika.ConnectionParameters(
+		host=host,
+		heartbeat=600 * 4,  # 40 minutes hearbeat, should guarantee no conn resets
+		blocked_connection_timeout=300,  # wait time before force close
+		))
+
+# Retries for at least max_attempts attempts and timeout seconds, a broker restarting
+# gets as long as one starting. A failed host is probed again by later managers.
+def try_open_connection(host,max_attempts, timeout = BROKER_PROBE_TIMEOUT_S):
+	deadline = time.monotonic() + timeout
+	attempt = 1
+	while True:
 		try:
-			return pika.BlockingConnection(pika.ConnectionParameters(
-				host=host,
-				heartbeat=600 * 4,  # 40 minutes hearbeat, should guarantee no conn resets
-				blocked_connection_timeout=300,  # wait time before force close
-				))
+			conn = _open_connection(host)
+			mark_broker_ready(host)
+			return conn
 		except Exception as e:
+			forget_broker_ready(host)
+			if attempt >= max_attempts and time.monotonic() >= deadline:
+				raise # Last attempt
 			logging.warning(
-				f"action: open_connection_middleware | result: in_progress | err:{e} | {i}"
+				f"action: open_connection_middleware | result: in_progress | err:{e} | {attempt}"
 			)
-			time.sleep(5)
-
-	# Last attempt
-	return pika.BlockingConnection(pika.ConnectionParameters(host=host, 
-				heartbeat=600 * 4,  # 40 minutes hearbeat, should guarantee no conn resets
-				blocked_connection_timeout=300,  # wait time before force close
-				))
\ No newline at end of file
+			time.sleep(backoff_delay(attempt))
+			attempt += 1
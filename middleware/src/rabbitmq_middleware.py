@@ -14,6 +14,24 @@ class BaseRabbitMiddleware(MessageMiddleware):
 		except Exception as e:
 			raise MessageMiddlewareConnectError(f"RabbitMQ connect failed: {e}") from e
 
+	# Current prefetch window and, when adaptive, the observed latency and size it was chosen from.
+	def prefetch_metrics(self):
+		return self._channel.prefetch_metrics()
+
+	def is_healthy(self):
+		return self._rabbit_manager.is_healthy()
+
+	# hook() runs before inputs are acked, it flushes the output middlewares of the node.
+	def set_before_ack(self, hook):
+		self._channel.before_ack = hook
+
+	# Sends coalesced messages still pending, the middleware stays open.
+	def flush(self):
+		try:
+			self._channel.flush()
+		except rbmq_utils.RoutingConnectionErrors as e:
+			raise MessageMiddlewareDisconnectedError(f"RabbitMQ connection error at flush: {e}") from e
+
 	def stop_consuming(self):
 		try:
 			self._rabbit_manager.stop_channels() # Asumming not async
@@ -23,6 +41,7 @@ class BaseRabbitMiddleware(MessageMiddleware):
 
 	def close(self):
 		try:
+			self._channel.flush() # Coalesced sends and acks still pending
 			self._rabbit_manager.stop_consuming()
 			self._rabbit_manager.close()
 		except Exception as e:
@@ -89,11 +108,13 @@ class RabbitHashedExchangeMiddleware(RabbitExchangeMiddleware):
 		self.node_count = int(node_count)
 
 	def send(self, hashed_message_builder): #: 
-		target = self.queue_name_base.format(IND= hashed_message_builder.hash_in(self.node_count))
-		headers = hashed_message_builder.get_headers()
-		payload = hashed_message_builder.serialize_payload()
+		# Usually a single target by hash, key partitioned builders split in one message per node.
+		for ind, builder in hashed_message_builder.split_in(self.node_count):
+			target = self.queue_name_base.format(IND= ind)
+			headers = builder.get_headers()
+			payload = builder.serialize_payload()
 
-		self._channel.send(target, headers,payload)
+			self._channel.send(target, headers,payload)
 
 
 
@@ -137,6 +158,10 @@ class RabbitMultiQueueExchangeMiddleware(BaseRabbitMiddleware):
 		def real_callback(ch, method, properties, body):
 			#logging.info(f"action: msg_recv | result: success | queue: {self.queue_name} | method: {method} | props: {properties} | body:{body}")
 			#CSVMessage(properties.headers, body)
+			if is_coalesced(properties.headers):
+				self._channel.handle_coalesced(callback, method, properties.headers, body, r_type)
+				return
+
 			headers = BaseHeaders.from_headers(properties.headers)
 
 			headers.types = [r_type]
@@ -145,14 +170,14 @@ class RabbitMultiQueueExchangeMiddleware(BaseRabbitMiddleware):
 
 				if msg_failed:
 					# If msg failed, requeue is desired else throw exception(for now?)
-					ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True) 				
+					self._channel.nack(method.delivery_tag, requeue=True)
 				else:
-					ch.basic_ack(delivery_tag = method.delivery_tag)
+					self._channel.ack(method.delivery_tag, headers.is_eof())
 
 			except Exception as e:
 				logging.error(f"Message handling failed {headers}")
 				logging.error(f"payload: {body[:min(50,len(body))]} error: {e}")
-				ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)	
+				self._channel.nack(method.delivery_tag, requeue=False)
 
 
 		return real_callback
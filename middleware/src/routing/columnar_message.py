@@ -0,0 +1,152 @@
+from .message import *
+from .message_building import *
+from .csv_message import CSVMessage
+import struct
+import sys
+from array import array
+from zlib import crc32
+
+# Binary columnar payload, rows are sent as one block per column instead of csv text.
+# The schema is a string with a type code per column, sent on the headers (FIELD_PAYLOAD_SCHEMA):
+#   "s" utf-8 string, "i" int32, "q" int64, "d" float64
+# Payload: row count (uint32) then each column in order,
+#   strings: byte length (uint32) + values joined by NUL, typed: packed little endian array.
+COL_STRING = "s"
+COL_INT32 = "i"
+COL_INT64 = "q"
+COL_FLOAT64 = "d"
+
+STRING_SEPARATOR = "\x00"
+COUNT_FORMAT = struct.Struct("<I")
+TYPED_PARSERS = {COL_INT32: int, COL_INT64: int, COL_FLOAT64: float}
+NEEDS_SWAP = sys.byteorder != "little"
+
+
+def _encode_column(col_type, values, out):
+    if col_type == COL_STRING:
+        blob = STRING_SEPARATOR.join(map(str, values)).encode()
+        out.append(COUNT_FORMAT.pack(len(blob)))
+        out.append(blob)
+        return
+    packed = array(col_type, map(TYPED_PARSERS[col_type], values))
+    if NEEDS_SWAP:
+        packed.byteswap()
+    out.append(packed.tobytes())
+
+
+def encode_columns(schema, rows):
+    columns = list(zip(*rows))
+    if len(columns) != len(schema):
+        raise ValueError(f"Rows do not match payload schema {schema}, {len(columns)} columns")
+
+    out = [COUNT_FORMAT.pack(len(rows))]
+    for col_type, values in zip(schema, columns):
+        _encode_column(col_type, values, out)
+    return b"".join(out)
+
+
+def decode_columns(schema, payload):
+    view = memoryview(payload)
+    count = COUNT_FORMAT.unpack_from(view, 0)[0]
+    offset = COUNT_FORMAT.size
+    columns = []
+    for col_type in schema:
+        if col_type == COL_STRING:
+            length = COUNT_FORMAT.unpack_from(view, offset)[0]
+            offset += COUNT_FORMAT.size
+            columns.append(str(view[offset:offset+length], "utf-8").split(STRING_SEPARATOR))
+            offset += length
+            continue
+        values = array(col_type)
+        size = values.itemsize * count
+        values.frombytes(view[offset:offset+size])
+        if NEEDS_SWAP:
+            values.byteswap()
+        columns.append(values.tolist())
+        offset += size
+    return columns
+
+
+class ColumnarMessage(Message):
+    def deserialize_payload(payload, schema):
+        if len(payload) == 0:
+            return None # Empty payload == None == eof signal
+        # Rows are lists, same as csv rows, some configs update them in place.
+        return map(list, zip(*decode_columns(schema, payload)))
+
+    def __init__(self, payload, schema):
+        super().__init__(ColumnarMessage.deserialize_payload(payload, schema))
+
+
+# Payload format is chosen by the sender per message, columnar payloads carry their schema on the headers.
+def deserialize_with(headers, payload, default_deserializer):
+    if headers.schema != None:
+        return ColumnarMessage(payload, headers.schema)
+    return default_deserializer(payload)
+
+
+# Columnar payload of a builder, rows are kept as lists and encoded by column when serialized.
+# Goes first in the bases, the schema is the last argument of the builder.
+class ColumnarPayloadMixin:
+    def __init__(self, *args):
+        *builder_args, self.schema = args # Set first, the builder headers take it
+        super().__init__(*builder_args)
+
+    def add_row(self, row):
+        self.payload.append(row)
+
+    def add_row_bytes(self, row):
+        self.payload.append([value.decode() for value in row])
+
+    def serialize_payload(self):
+        if self.should_be_eof or len(self.payload) == 0:
+            return b""
+        return encode_columns(self.schema, self.payload)
+
+
+class ColumnarHashedMessageBuilder(ColumnarPayloadMixin, HashedMessageBuilder):
+    def creator_with_type(new_type, schema):
+        def converter(headers):
+            headers.types[0] = new_type
+            return ColumnarHashedMessageBuilder(headers, headers.ids[0], schema)
+        return converter
+
+    def clone(self):
+        return ColumnarHashedMessageBuilder(self.headers.clone(), self.key_hash, self.schema)
+
+
+# Partitions rows by the hash of its key columns instead of by client id, so a single client is spread
+# over every node. Each data message is split in one sub message per node (even empty ones)
+# and eofs are sent to every node, so all nodes expect the same message count.
+class ColumnarKeyPartitionedMessageBuilder(ColumnarHashedMessageBuilder):
+    def creator_with_type(new_type, key_cols, schema):
+        def converter(headers):
+            headers.types[0] = new_type
+            return ColumnarKeyPartitionedMessageBuilder(headers, headers.ids[0], key_cols, schema)
+        return converter
+
+    def __init__(self, headers_obj, key_hash, key_cols, schema):
+        super().__init__(headers_obj, key_hash, schema)
+        self.key_cols = key_cols # Indexes of the key in the added rows
+        self.row_hashes = []
+
+    def add_row(self, row):
+        # Key cols are hashed as their csv text, stable between processes, all senders must choose the same node for a key.
+        self.row_hashes.append(crc32(",".join([str(row[col]) for col in self.key_cols]).encode()))
+        super().add_row(row)
+
+    def clear_payload(self):
+        super().clear_payload()
+        self.row_hashes = []
+
+    def split_in(self, count):
+        if self.is_eof():
+            return [(ind, self) for ind in range(count)] # Eof fan out.
+
+        parts = [self.clone() for _ in range(count)]
+        for row, row_hash in zip(self.payload, self.row_hashes):
+            parts[row_hash % count].payload.append(row)
+        return list(enumerate(parts))
+
+    def clone(self):
+        return ColumnarKeyPartitionedMessageBuilder(self.headers.clone(), self.key_hash, self.key_cols, self.schema)
@@ -49,6 +49,54 @@ class CSVMessageBuilder(MessageBuilder):
     def clone(self):
         return CSVMessageBuilder(self.headers.clone())
 
+# Csv payload built straight from byte fields, rows are appended to a single buffer
+# so no str is created for them and serializing does not join again.
+# Goes first in the bases, so it replaces the list payload of the builder.
+class CSVBytesPayloadMixin:
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.payload = bytearray()
+        self.rows = 0
+
+    def add_row(self,row):
+        self.add_row_bytes([str(value).encode() for value in row])
+    def add_row_bytes(self,row):
+        if self.rows > 0:
+            self.payload += b"\n"
+        self.payload += b",".join(row)
+        self.rows += 1
+
+    # Appends rows already formatted as csv lines, eg. projected by Model.parse_batch
+    def add_payload_bytes(self, payload, rows):
+        if rows == 0:
+            return
+        if self.rows > 0:
+            self.payload += b"\n"
+        self.payload += payload
+        self.rows += rows
+
+    def has_payload(self):
+        return self.rows > 0
+
+    def len_payload(self):
+        return self.rows
+
+    def clear_payload(self):
+        self.payload = bytearray()
+        self.rows = 0
+
+    def serialize_payload(self):
+        if self.should_be_eof or self.rows == 0:
+            return b""
+        return bytes(self.payload) # Single copy, the buffer can still grow after it.
+
+class CSVBytesMessageBuilder(CSVBytesPayloadMixin, CSVMessageBuilder):
+    def with_credentials(ids, types):
+        return CSVBytesMessageBuilder(BaseHeaders(ids, types))
+
+    def clone(self):
+        return CSVBytesMessageBuilder(self.headers.clone())
+
 class CSVHashedMessageBuilder(HashedMessageBuilder):
     def with_credentials(ids, types, key_hash):
         return CSVHashedMessageBuilder(BaseHeaders(ids, types), key_hash)
@@ -86,3 +134,11 @@ class CSVHashedMessageBuilder(HashedMessageBuilder):
 
     def clone(self):
         return CSVHashedMessageBuilder(self.headers.clone(), self.key_hash)
+
+
+class CSVBytesHashedMessageBuilder(CSVBytesPayloadMixin, CSVHashedMessageBuilder):
+    def with_credentials(ids, types, key_hash):
+        return CSVBytesHashedMessageBuilder(BaseHeaders(ids, types), key_hash)
+
+    def clone(self):
+        return CSVBytesHashedMessageBuilder(self.headers.clone(), self.key_hash)
@@ -1,6 +1,7 @@
 FIELD_QUERY_ID ="queries_id" 
 FIELD_QUERY_TYPE ="queries_type" 
 FIELD_PARTITION_IND ="partition_ind"
+FIELD_PAYLOAD_SCHEMA ="schema" # Only on columnar payloads, csv otherwise.
 DEFAULT_PARTITION_VALUE =-1
 DEFAULT_QUERY_TYPE =""
 
@@ -17,29 +18,33 @@ class BaseHeaders:
 		return BaseHeaders(
 			headers.get(FIELD_QUERY_ID, []),
 			headers.get(FIELD_QUERY_TYPE, [DEFAULT_QUERY_TYPE]),
-			headers.get(FIELD_PARTITION_IND, DEFAULT_PARTITION_VALUE)
+			headers.get(FIELD_PARTITION_IND, DEFAULT_PARTITION_VALUE),
+			headers.get(FIELD_PAYLOAD_SCHEMA, None)
 		)
 
 	def from_headers_typed(headers, q_type):
 		return BaseHeaders(
 			[headers.get(FIELD_QUERY_ID, None)],
 			[q_type],
-			headers.get(FIELD_PARTITION_IND, DEFAULT_PARTITION_VALUE)
+			headers.get(FIELD_PARTITION_IND, DEFAULT_PARTITION_VALUE),
+			headers.get(FIELD_PAYLOAD_SCHEMA, None)
 		)
 
-	def __init__(self, ids, types = [DEFAULT_QUERY_TYPE], msg_count = DEFAULT_PARTITION_VALUE):
+	def __init__(self, ids, types = [DEFAULT_QUERY_TYPE], msg_count = DEFAULT_PARTITION_VALUE, schema = None):
 		self.ids = ids
 		self.types = types
 		self.msg_count = msg_count
+		self.schema = schema
 
 	def __repr__(self):
-		return f"ids:{self.ids}, types:{self.types}, msg_count:{self.msg_count}"
+		return f"ids:{self.ids}, types:{self.types}, msg_count:{self.msg_count}, schema:{self.schema}"
 
 	def clone(self):
 		return BaseHeaders(
 			list(self.ids),
 			list(self.types),
-			self.msg_count
+			self.msg_count,
+			self.schema
 		)
 
 	def get_error_code(self):
@@ -64,10 +69,10 @@ class BaseHeaders:
 		return zip(self.ids, self.types)		
 
 	def sub_for(self, ind):
-		return BaseHeaders([self.ids[ind]], [self.types[ind]], self.msg_count)
+		return BaseHeaders([self.ids[ind]], [self.types[ind]], self.msg_count, self.schema)
 	def split(self):
 		for ide, type in zip(self.ids, self.types):
-			yield BaseHeaders([ide],[type],self.msg_count)
+			yield BaseHeaders([ide],[type],self.msg_count, self.schema)
 
 	def iter_type_headers(self):
 		if self.msg_count != DEFAULT_PARTITION_VALUE: #If eof add it, else ignore the header.		
@@ -94,6 +99,9 @@ class BaseHeaders:
 		if self.msg_count != DEFAULT_PARTITION_VALUE: # If it is the default one, then save it.
 			res[FIELD_PARTITION_IND]= self.msg_count
 
+		if self.schema != None:
+			res[FIELD_PAYLOAD_SCHEMA]= self.schema
+
 		return res
 
 	def to_dict_no_type(self):
@@ -104,4 +112,7 @@ class BaseHeaders:
 		if self.msg_count != DEFAULT_PARTITION_VALUE: # If it is the default one, then save it.
 			res[FIELD_PARTITION_IND]= self.msg_count
 
+		if self.schema != None:
+			res[FIELD_PAYLOAD_SCHEMA]= self.schema
+
 		return res
\ No newline at end of file
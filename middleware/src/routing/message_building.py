@@ -1,10 +1,16 @@
 
 from .header_fields import *
-from hashlib import sha256 as hash_function 
+from .partitioning import partition_for
 
 # Message builder
 class MessageBuilder:
+    schema = None # Schema of the built payload, None for csv. Set by builders with a columnar payload.
+
     def __init__(self,headers_obj : BaseHeaders):
+        if headers_obj.schema != self.schema:
+            # Eg. built from the headers of a received message, those keep their schema.
+            headers_obj = headers_obj.clone()
+            headers_obj.schema = self.schema
         self.headers = headers_obj
         self.payload = []
         self.should_be_eof = headers_obj.is_eof()
@@ -63,8 +69,11 @@ class HashedMessageBuilder(MessageBuilder):
         self.key_hash+= string
 
     def hash_in(self, count):
-        h = hash_function(self.key_hash.encode()).hexdigest()
-        return int(h, 16) % count
+        return partition_for(self.key_hash, count)
+
+    # Pairs of (target index, builder) to send, the whole message goes to the hashed target.
+    def split_in(self, count):
+        return [(self.hash_in(count), self)]
 
     def clone(self):
         return HashedMessageBuilder(self.headers.clone(), self.key_hash)
@@ -0,0 +1,24 @@
+from functools import lru_cache
+from zlib import crc32
+
+# Routing of a key to one of count nodes. Keys are mostly client ids, the same for a whole session,
+# so the partition is computed once per (key, count) and cached.
+PARTITION_CACHE_SIZE = 4096
+
+def stable_hash(key):
+    # Fast and equal between processes, unlike builtin hash() of str.
+    return crc32(key.encode())
+
+def jump_hash(key_hash, count):
+    # Jump consistent hash (Lamping, Veach). Going from n to n+1 nodes only moves 1/(n+1) of the keys.
+    b = -1
+    j = 0
+    while j < count:
+        b = j
+        key_hash = (key_hash * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * (float(1 << 31) / float((key_hash >> 33) + 1)))
+    return b
+
+@lru_cache(maxsize=PARTITION_CACHE_SIZE)
+def partition_for(key, count):
+    return jump_hash(stable_hash(key), count)
@@ -37,6 +37,9 @@ def initialize_config():  # type: ignore[no-untyped-def]
         config_params["logging_level"] = os.getenv(
             "LOGGING_LEVEL", config["DEFAULT"]["LOGGING_LEVEL"]
         )
+        config_params["prefetch_count"] = int(
+            os.getenv("PREFETCH_COUNT", config["DEFAULT"]["PREFETCH_COUNT"])
+        )
     except KeyError as e:
         raise KeyError("Key was not found. Error: {} .Aborting results".format(e))
     except ValueError as e:
@@ -69,17 +72,20 @@ def main() -> None:
     listen_backlog = config_params["listen_backlog"]
     dir_path = config_params["dir_path"]
     logging_level = config_params["logging_level"]
+    prefetch_count = config_params["prefetch_count"]
 
     initialize_log(logging_level)
 
     # Log config parameters at the beginning of the program to verify the configuration of the component
     logging.debug(
-        f"action: config | result: success | port: {port} | listen_backlog: {listen_backlog} | dir_path: {dir_path} | logging_level: {logging_level}"
+        f"action: config | result: success | port: {port} | listen_backlog: {listen_backlog} | dir_path: {dir_path} | logging_level: {logging_level} | prefetch_count: {prefetch_count}"
     )
 
     while True:
         try:
-            middleware = MessageMiddlewareQueue("middleware", "results")
+            middleware = MessageMiddlewareQueue(
+                "middleware", "results", prefetch_count=prefetch_count
+            )
             break
         except AMQPConnectionError:
             time.sleep(1)  # Reintentar hasta que RabbitMQ esté disponible
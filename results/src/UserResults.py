@@ -1,10 +1,12 @@
+import os
 import shutil
 import threading
 from io import BufferedReader
 from pathlib import Path
-from typing import Callable, Dict, List, Sequence, Tuple, TypedDict
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple, TypedDict
 
 from common import QueryId
+from common.protocol.batch import Reader
 from common.results.query import QueryResult
 
 
@@ -24,22 +26,58 @@ FILE_NAMES: List[Tuple[QueryId, str]] = [
 ]
 
 
+# Queries sent to the client while their results still arrive, with a tail reader of their file
+STREAMED_QUERIES: Set[QueryId] = {QueryId.Query1}
+
+
 class QueryState(TypedDict):
     lock: threading.Lock
     ready: bool
+    size: int  # Bytes written, synced for STREAMED_QUERIES, the ones a tail reader can serve
+
+
+class TailReader:
+    """
+    Reader of a result file that is still being appended
+    Each part reads the synced bytes up to the end given by until, readinto returns 0 at that end
+    """
+
+    def __init__(self, file: BufferedReader):
+        self._file = file
+        self._position = 0
+        self.end = 0
+
+    def until(self, end: int) -> "TailReader":
+        self.end = end
+        return self
+
+    def readinto(self, buffer: memoryview) -> int:
+        available = self.end - self._position
+        if available <= 0:
+            return 0
+        read = self._file.readinto(memoryview(buffer)[:min(len(buffer), available)])
+        self._position += read
+        return read
+
+    def close(self) -> None:
+        self._file.close()
 
 
 class UserResult:
-    def __init__(self, base_dir: Path):
+    def __init__(self, base_dir: Path, idle_timeout_s: Optional[float] = None):
         self._base_dir = base_dir
+        self._idle_timeout_s = idle_timeout_s
         self._query_states: Dict[QueryId, QueryState] = {
             query_id: {
                 "lock": threading.Lock(),
                 "ready": False,
+                "size": 0,
             }
             for query_id, _ in FILE_NAMES
         }
         self._all_queries_are_ready = threading.Condition()
+        self._ready_order: List[QueryId] = []  # Queries in the order they got ready
+        self._deleted = False
         self._base_dir.mkdir(exist_ok=True)
         for query_id, file_name in FILE_NAMES:
             path = self._base_dir / file_name
@@ -48,6 +86,10 @@ class UserResult:
                 path.touch()
             if ready_path.exists():
                 self._query_states[query_id]["ready"] = True
+                self._ready_order.append(query_id)
+                self._query_states[query_id]["size"] = ready_path.stat().st_size
+            else:
+                self._query_states[query_id]["size"] = path.stat().st_size
 
     def append(self, query_id: QueryId, results: Sequence[QueryResult]) -> None:
         if not results:
@@ -58,6 +100,14 @@ class UserResult:
                 for r in results:
                     line = r.to_bytes() + b"\n"
                     f.write(line)
+                if query_id in STREAMED_QUERIES:
+                    # Tail readers only serve what would survive a crash
+                    f.flush()
+                    os.fsync(f.fileno())
+                size = f.tell()
+            with self._all_queries_are_ready:
+                self._query_states[query_id]["size"] = size
+                self._all_queries_are_ready.notify_all()
 
     def mark_ready(self, query_id: QueryId) -> None:
         file_name = file_name_for(query_id)
@@ -69,23 +119,99 @@ class UserResult:
             src.rename(dst)
         with self._all_queries_are_ready:
             self._query_states[query_id]["ready"] = True
+            self._ready_order.append(query_id)
             self._all_queries_are_ready.notify_all()
 
-    def do_with_each_result_file_when_ready(
-        self, a_closure: Callable[[BufferedReader], None]
+    def do_with_each_result_file_as_ready(
+        self, a_closure: Callable[[str, Reader, bool], None]
     ) -> None:
+        """
+        Calls the closure with each part of the result files as soon as it is available:
+        the file name, a reader of the part and whether it is the last part of that file
+        Files are sent whole as their query gets ready, in readiness order. STREAMED_QUERIES are sent
+        in parts with the rows synced since their previous part, between the other files
+        Returns after the last part, raise an exception if the results were deleted meanwhile
+        """
+        sent: Set[QueryId] = set()
+        tails: Dict[QueryId, TailReader] = {}
+        try:
+            while len(sent) < len(FILE_NAMES):
+                with self._all_queries_are_ready:
+                    while not self._deleted and not self.__pending_parts(sent, tails):
+                        self.__wait()
+                    if self._deleted:
+                        raise Exception(f"Results of {self._base_dir.name} were deleted")
+                    parts = self.__pending_parts(sent, tails)
+
+                for query_id, end, last in parts:
+                    file_name = file_name_for(query_id)
+                    if query_id in STREAMED_QUERIES:
+                        if query_id not in tails:
+                            tails[query_id] = TailReader(self.__open_following(query_id, file_name))
+                        a_closure(file_name, tails[query_id].until(end), last)
+                    else:
+                        ready_path = self._base_dir / f"ready_{file_name}"
+                        with self._query_states[query_id]["lock"]:
+                            with ready_path.open("rb") as reader:
+                                a_closure(file_name, reader, True)
+                    if last:
+                        sent.add(query_id)
+        finally:
+            for tail in tails.values():
+                tail.close()
+
+    def __open_following(self, query_id: QueryId, file_name: str) -> BufferedReader:
+        """
+        Opens the query file whether it was already renamed by mark_ready or not
+        The opened file is the same after a later rename
+        """
+        ready_path = self._base_dir / f"ready_{file_name}"
+        with self._query_states[query_id]["lock"]:
+            if ready_path.exists():
+                return ready_path.open("rb")
+            return (self._base_dir / file_name).open("rb")
+
+    def is_empty(self) -> bool:
+        """
+        Whether no result of any query arrived yet
+        """
         with self._all_queries_are_ready:
-            while not all(
-                query_state["ready"] for query_state in self._query_states.values()
-            ):
-                self._all_queries_are_ready.wait()
+            return all(
+                state["size"] == 0 and not state["ready"]
+                for state in self._query_states.values()
+            )
 
-        for query_id, file_name in FILE_NAMES:
-            ready_path = self._base_dir / f"ready_{file_name}"
+    def __wait(self) -> None:
+        """
+        Waits for any change of these results, raise TimeoutError after idle_timeout_s without one
+        Must be called holding _all_queries_are_ready
+        """
+        if not self._all_queries_are_ready.wait(self._idle_timeout_s):
+            raise TimeoutError(f"No results of {self._base_dir.name} for {self._idle_timeout_s} s")
+
+    def __pending_parts(
+        self, sent: Set[QueryId], tails: Dict[QueryId, TailReader]
+    ) -> List[Tuple[QueryId, int, bool]]:
+        """
+        Parts not sent yet as (query, end, last): streamed queries with new rows or just ready first,
+        then the ready ones in the order they got ready
+        Must be called holding _all_queries_are_ready
+        """
+        parts = []
+        for query_id, _ in FILE_NAMES:
             state = self._query_states[query_id]
-            with state["lock"]:
-                with ready_path.open("rb") as reader:
-                    a_closure(reader)
+            sent_end = tails[query_id].end if query_id in tails else 0
+            if query_id in STREAMED_QUERIES and query_id not in sent and (state["size"] > sent_end or state["ready"]):
+                parts.append((query_id, state["size"], state["ready"]))
+        parts += [
+            (query_id, self._query_states[query_id]["size"], True)
+            for query_id in self._ready_order
+            if query_id not in STREAMED_QUERIES and query_id not in sent
+        ]
+        return parts
 
     def delete(self) -> None:
+        with self._all_queries_are_ready:
+            self._deleted = True
+            self._all_queries_are_ready.notify_all()
         shutil.rmtree(self._base_dir)
@@ -98,8 +98,8 @@ class ResultServer:
         protocol = ResultsProtocol(client_socket)
         try:
             protocol.handle_requests(
-                self._results_storage.assert_exists,
-                self._results_storage.do_with_results_when_ready,
+                self._results_storage.subscribe,
+                self._results_storage.do_with_results_as_ready,
             )
         except Exception as e:
             logging.error(f"action: error | result: fail | error: {e}")
@@ -1,18 +1,33 @@
 import logging
+import os
 import threading
-from io import BufferedReader
 from pathlib import Path
-from typing import Callable, Dict
+from typing import Callable, Dict, Set
 
 from common.middleware.tasks.result import ResultTask
+from common.protocol.batch import Reader
+from common.utils import is_uuid
 from results.src.UserResults import UserResult
 
+# Waiters of a client are woken with an error after this long without any of its results arriving
+RESULTS_IDLE_TIMEOUT_S = float(os.getenv("RESULTS_IDLE_TIMEOUT_S", "3600"))
+# Clients subscribed before any of their results arrived, more subscriptions are rejected
+MAX_PENDING_SUBSCRIPTIONS = int(os.getenv("MAX_PENDING_SUBSCRIPTIONS", "64"))
+
 
 class ResultStorage:
-    def __init__(self, dir_path: str):
+    def __init__(
+        self,
+        dir_path: str,
+        idle_timeout_s: float = RESULTS_IDLE_TIMEOUT_S,
+        max_pending_subscriptions: int = MAX_PENDING_SUBSCRIPTIONS,
+    ):
         self._dir_path = Path(f"results/{dir_path}")
         self._dir_path.mkdir(parents=True, exist_ok=True)
+        self._idle_timeout_s = idle_timeout_s
+        self._max_pending_subscriptions = max_pending_subscriptions
         self._users: Dict[str, UserResult] = self.__load_users()
+        self._pending_subscriptions: Set[str] = set()  # Subscribed users without results yet
         self._users_lock = threading.Lock()
 
     def handle(self, result_task: ResultTask) -> None:
@@ -20,38 +35,63 @@ class ResultStorage:
             self.__delete_results(result_task.user_id)
             return
 
-        self.__get_or_create_user(result_task.user_id).append(
-            result_task.query_id, result_task.data
-        )
+        user = self.__get_or_create_user(result_task.user_id, subscribing=False)
+        user.append(result_task.query_id, result_task.data)
         if result_task.eof:
-            self.__get_or_create_user(result_task.user_id).mark_ready(
-                result_task.query_id
-            )
+            user.mark_ready(result_task.query_id)
             logging.info(
                 f"action: query_ready | result: success | user: {result_task.user_id} | query:{result_task.query_id}"
             )
 
-    def do_with_results_when_ready(
-        self, user_id: str, a_closure: Callable[[BufferedReader], None]
+    def do_with_results_as_ready(
+        self, user_id: str, a_closure: Callable[[str, Reader, bool], None]
     ) -> None:
-        self._users[user_id].do_with_each_result_file_when_ready(a_closure)
+        """
+        A subscription that gets no result for idle_timeout_s is dropped, with its directory
+        """
+        user = self.__get_or_create_user(user_id, subscribing=True)
+        try:
+            user.do_with_each_result_file_as_ready(a_closure)
+        except TimeoutError:
+            self.__expire_subscription(user_id, user)
+            raise
+
+    def subscribe(self, user_id: str) -> None:
+        """
+        Registers the user if no result arrived yet, so a client can wait for its results right after uploading
+        Raise ValueError if the user id is not a uuid or too many subscriptions wait for their first result
+        """
+        self.__get_or_create_user(user_id, subscribing=True)
 
-    def assert_exists(self, user_id: str) -> None:
+    def __get_or_create_user(self, user_id: str, subscribing: bool) -> UserResult:
+        # The id names a directory, only the uuids issued by the dispatcher are accepted
+        if not is_uuid(user_id):
+            raise ValueError(f"Invalid client id: {user_id!r}")
         with self._users_lock:
-            if user_id not in self._users:
-                raise Exception(
-                    f"Does not exist user_id: '{user_id}' in the result storage"
-                )
+            user = self._users.get(user_id)
+            if user is None:
+                if subscribing and len(self._pending_subscriptions) >= self._max_pending_subscriptions:
+                    raise ValueError(f"Too many clients waiting for their first result, {user_id} rejected")
+                user = UserResult(self._dir_path / user_id, self._idle_timeout_s)
+                self._users[user_id] = user
+                if subscribing:
+                    self._pending_subscriptions.add(user_id)
+            if not subscribing:
+                self._pending_subscriptions.discard(user_id)
+            return user
 
-    def __get_or_create_user(self, user_id: str) -> UserResult:
+    def __expire_subscription(self, user_id: str, user: UserResult) -> None:
         with self._users_lock:
-            if user_id not in self._users:
-                user_dir = self._dir_path / user_id
-                self._users[user_id] = UserResult(user_dir)
-            return self._users[user_id]
+            if user_id not in self._pending_subscriptions or self._users.get(user_id) is not user:
+                return  # Results arrived meanwhile, they are kept
+            self._pending_subscriptions.discard(user_id)
+            del self._users[user_id]
+            user.delete()
+        logging.info(f"action: expire_subscription | result: success | user: {user_id}")
 
     def __delete_results(self, user_id: str) -> None:
         with self._users_lock:
+            self._pending_subscriptions.discard(user_id)
             user = self._users.pop(user_id, None)
             if user:
                 user.delete()
@@ -59,6 +99,14 @@ class ResultStorage:
     def __load_users(self) -> Dict[str, UserResult]:
         users = {}
         for user_dir in self._dir_path.iterdir():
-            if user_dir.is_dir():
-                users[user_dir.name] = UserResult(user_dir)
+            if not user_dir.is_dir():
+                continue
+            if not is_uuid(user_dir.name):
+                logging.warning(f"action: load_user | result: fail | error: not a client id: {user_dir.name}")
+                continue
+            user = UserResult(user_dir, self._idle_timeout_s)
+            if user.is_empty():
+                user.delete()  # Subscribed before a restart, its client subscribes again
+                continue
+            users[user_dir.name] = user
         return users
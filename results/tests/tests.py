@@ -0,0 +1,195 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from io import BufferedReader, BufferedWriter
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from common.middleware.tasks.result import ResultTask
+from common.protocol.batch import BatchProtocol
+from common.protocol.byte import ByteProtocol
+from common.protocol.client import ClientProtocol
+from common.protocol.results import ResultsProtocol
+from common.protocol.signal import SignalProtocol
+from common.results.query import QueryResult
+from common.utils import QueryId, new_uuid
+from results.src.storage import ResultStorage
+
+
+class Row(QueryResult):
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Row":
+        return cls(data.decode("utf-8"))
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class TestResultStorage(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)  # The storage lives under results/ of the working directory
+        self.storage = ResultStorage("storage", idle_timeout_s=5)
+        self.client_socket, self.server_socket = socket.socketpair()
+        self.client_socket.settimeout(5)
+
+    def tearDown(self) -> None:
+        self.client_socket.close()
+        self.server_socket.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def result(self, user_id: str, query_id: QueryId, rows: List[str], eof: bool = False) -> None:
+        self.storage.handle(ResultTask(user_id, query_id, eof, False, [Row(row) for row in rows]))
+
+    def serve(self) -> threading.Thread:
+        def handle() -> None:
+            ResultsProtocol(self.server_socket).handle_requests(
+                self.storage.subscribe, self.storage.do_with_results_as_ready
+            )
+        server = threading.Thread(target=handle, daemon=True)
+        server.start()
+        return server
+
+    def subscribe(self, user_id: str) -> None:
+        ByteProtocol(self.client_socket).send_bytes(user_id.encode("utf-8"))
+        BatchProtocol(self.client_socket).offer_compression([])
+        SignalProtocol(self.client_socket).wait_signal()
+
+    def wait_part(self) -> Tuple[str, bool, List[bytes]]:
+        """
+        File name, whether it is its last part and its rows. An empty name ends the results
+        """
+        file_name = ByteProtocol(self.client_socket).wait_bytes().decode("utf-8")
+        if not file_name:
+            return file_name, True, []
+        last = ByteProtocol(self.client_socket).wait_uint8() != 0
+        rows = []
+        batch = BatchProtocol(self.client_socket).wait_batch()
+        while batch:
+            rows += [bytes(line) for line in batch]
+            batch = BatchProtocol(self.client_socket).wait_batch()
+        return file_name, last, rows
+
+    def test_results_pushed_as_ready(self) -> None:
+        user_id = new_uuid()
+        server = self.serve()
+        self.subscribe(user_id)
+
+        self.result(user_id, QueryId.Query1, ["q1 a"])
+        self.assertEqual(self.wait_part(), ("query_1.csv", False, [b"q1 a"]))  # Streamed before it is ready
+        self.result(user_id, QueryId.Query1, ["q1 b"])
+        self.assertEqual(self.wait_part(), ("query_1.csv", False, [b"q1 b"]))
+
+        # Not held back by the streamed Q1
+        self.result(user_id, QueryId.Query2BestSelling, ["q2bs"], eof=True)
+        self.assertEqual(self.wait_part(), ("query_2_best_selling.csv", True, [b"q2bs"]))
+        self.result(user_id, QueryId.Query1, ["q1 c"])
+        self.assertEqual(self.wait_part(), ("query_1.csv", False, [b"q1 c"]))
+
+        # Files ready meanwhile are pushed in the order they got ready
+        self.result(user_id, QueryId.Query4, ["q4"], eof=True)
+        self.result(user_id, QueryId.Query2MostProfit, ["q2mp"], eof=True)
+        self.result(user_id, QueryId.Query3, ["q3"], eof=True)
+        self.result(user_id, QueryId.Query1, [], eof=True)
+        parts = [self.wait_part() for _ in range(4)]
+        self.assertIn(("query_1.csv", True, []), parts)
+        self.assertEqual([part for part in parts if part[0] != "query_1.csv"], [
+            ("query_4.csv", True, [b"q4"]),
+            ("query_2_most_profits.csv", True, [b"q2mp"]),
+            ("query_3.csv", True, [b"q3"]),
+        ])
+        self.assertEqual(self.wait_part(), ("", True, []))  # End of the results
+        server.join(5)
+        self.assertFalse(server.is_alive())
+
+    def test_client_downloads_interleaved_parts(self) -> None:
+        user_id = new_uuid()
+        server = self.serve()
+        output_dir = Path(self.tmp.name) / "output"
+        output_dir.mkdir()
+        opened: List[BufferedWriter] = []
+
+        def open_output_file(path: Path) -> BufferedWriter:
+            file = path.open("wb")
+            opened.append(file)
+            return file
+
+        def close_file(file: Union[BufferedWriter, BufferedReader]) -> None:
+            file.close()
+
+        self.result(user_id, QueryId.Query1, ["q1 a"])
+        self.result(user_id, QueryId.Query3, ["q3"], eof=True)
+        client = threading.Thread(
+            target=ClientProtocol(self.client_socket).download_results,
+            args=(output_dir, user_id, open_output_file, close_file),
+            daemon=True,
+        )
+        client.start()
+        self.result(user_id, QueryId.Query1, ["q1 b"])
+        for query_id in [QueryId.Query2BestSelling, QueryId.Query2MostProfit, QueryId.Query4]:
+            self.result(user_id, query_id, [query_id.value], eof=True)
+        self.result(user_id, QueryId.Query1, ["q1 c"], eof=True)
+        client.join(5)
+        server.join(5)
+        self.assertFalse(client.is_alive())
+
+        self.assertEqual((output_dir / "query_1.csv").read_bytes(), b"q1 a\nq1 b\nq1 c\n")
+        self.assertEqual((output_dir / "query_3.csv").read_bytes(), b"q3\n")
+        self.assertEqual((output_dir / "query_4.csv").read_bytes(), b"4\n")
+        self.assertEqual(len(opened), 5)
+        self.assertTrue(all(file.closed for file in opened))
+
+    def test_delete_wakes_waiter(self) -> None:
+        user_id = new_uuid()
+        self.storage.subscribe(user_id)
+        error: List[Optional[Exception]] = [None]
+
+        def wait() -> None:
+            try:
+                self.storage.do_with_results_as_ready(user_id, lambda file_name, reader, last: None)
+            except Exception as e:
+                error[0] = e
+        waiter = threading.Thread(target=wait, daemon=True)
+        waiter.start()
+
+        self.storage.handle(ResultTask(user_id, QueryId.Query3, False, True, []))
+        waiter.join(5)
+        self.assertFalse(waiter.is_alive())
+        self.assertIsNotNone(error[0])
+        self.assertEqual(os.listdir("results/storage"), [])
+
+    def test_only_uuid_client_ids(self) -> None:
+        for user_id in ["../../escaped", "", "c0ffee", new_uuid().upper()]:
+            with self.assertRaises(ValueError):
+                self.storage.subscribe(user_id)
+        self.assertEqual(os.listdir("results/storage"), [])
+        self.assertEqual(os.listdir("."), ["results"])
+
+    def test_subscription_without_results_expires(self) -> None:
+        storage = ResultStorage("expiring", idle_timeout_s=0.05, max_pending_subscriptions=1)
+        user_id = new_uuid()
+        storage.subscribe(user_id)
+        with self.assertRaises(ValueError):
+            storage.subscribe(new_uuid())  # Too many waiting for their first result
+        with self.assertRaises(TimeoutError):
+            storage.do_with_results_as_ready(user_id, lambda file_name, reader, last: None)
+        self.assertEqual(os.listdir("results/expiring"), [])
+        storage.subscribe(new_uuid())
+
+    def test_empty_subscriptions_dropped_on_restart(self) -> None:
+        subscribed, with_results = new_uuid(), new_uuid()
+        self.storage.subscribe(subscribed)
+        self.result(with_results, QueryId.Query3, ["q3"])
+        ResultStorage("storage")
+        self.assertEqual(os.listdir("results/storage"), [with_results])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -89,7 +89,9 @@ def main() -> None:
         groupby_middleware = GroupbyTasksMiddleware(groupby_node_count)
         add_selectnode_config(types_expander, result_middleware, groupby_middleware)
 
-        node = SelectNode(SelectTasksMiddleware(), CSVMessage, types_expander)
+        select_middleware = SelectTasksMiddleware()
+        select_middleware.set_before_ack(types_expander.flush_outputs) # Outputs are sent before inputs are acked
+        node = SelectNode(select_middleware, CSVMessage, types_expander)
 
         def close_handler(sig, frame):
             logging.info("Received close signal... gracefully finishing")
@@ -5,9 +5,11 @@ from middleware.routing.query_types import *
 from .select_type_config import *
 from common.config.row_filtering import *
 from common.config.row_mapping import *
+from common.config.row_combining import *
 
 
 from middleware.routing.csv_message import CSVMessageBuilder,CSVHashedMessageBuilder
+from middleware.routing.columnar_message import ColumnarHashedMessageBuilder, ColumnarKeyPartitionedMessageBuilder
 
 
 SELECT_TRANSACTION_ITEMS_IN_FIELDS = ["product_id", "year", "month", "revenue", "quantity"]
@@ -56,7 +58,8 @@ def add_selectnode_config(types_expander, result_middleware, groupby_middleware)
         QUERY_2,
         SelectTypeConfiguration(
             groupby_middleware,
-            CSVHashedMessageBuilder.creator_with_type(QUERY_2),
+            # Columnar payload, keys as strings and partial sums as float64.
+            ColumnarHashedMessageBuilder.creator_with_type(QUERY_2, "ssdd"),
             in_fields=SELECT_TRANSACTION_ITEMS_IN_FIELDS,  # In order
             filters_conf=[["year", EQUALS_ANY, ["2024", "2025"]]],
             out_conf={
@@ -73,6 +76,8 @@ def add_selectnode_config(types_expander, result_middleware, groupby_middleware)
                 ],
                 ROW_CONFIG_OUT_COLS: ["product_id", "month", "revenue", "quantity"],
             },
+            # Partial sums per batch, groupby sums them again.
+            combiner_conf=[["product_id", "month"], [[COMBINE_SUM, "revenue"], [COMBINE_SUM, "quantity"]]],
         ),
     )
 
@@ -84,7 +89,8 @@ def add_selectnode_config(types_expander, result_middleware, groupby_middleware)
     types_expander.add_configuration_to_many(
         SelectTypeConfiguration(
             groupby_middleware,
-            CSVHashedMessageBuilder.creator_with_type(QUERY_3),
+            # Partitioned by store_id, mapped_semester (out cols 0, 1) so one client uses every groupby node.
+            ColumnarKeyPartitionedMessageBuilder.creator_with_type(QUERY_3, [0, 1], "ssd"),
             in_fields=SELECT_TRANSACTION_SHARED_IN_FIELDS,  # In order
             filters_conf=[
                 ["year", EQUALS_ANY, ["2024", "2025"]],
@@ -108,6 +114,7 @@ def add_selectnode_config(types_expander, result_middleware, groupby_middleware)
                     "revenue",
                 ],
             },
+            combiner_conf=[["store_id", "mapped_semester"], [[COMBINE_SUM, "revenue"]]],
         ),
         ALL_FOR_TRANSACTIONS,
         QUERY_3,
@@ -120,13 +127,15 @@ def add_selectnode_config(types_expander, result_middleware, groupby_middleware)
     types_expander.add_configuration_to_many(
         SelectTypeConfiguration(
             groupby_middleware,
-            CSVHashedMessageBuilder.creator_with_type(QUERY_4),
+            ColumnarHashedMessageBuilder.creator_with_type(QUERY_4, "ssq"),
             in_fields=SELECT_TRANSACTION_SHARED_IN_FIELDS,  # In order
             filters_conf=[
                 ["year", EQUALS_ANY, ["2024", "2025"]],
                 ["user_id", NOT_EQUALS, ["", str(None)]],
             ],
-            out_conf={ROW_CONFIG_OUT_COLS: ["store_id", "user_id"]},
+            out_conf={ROW_CONFIG_OUT_COLS: ["store_id", "user_id", "purchase_count"]},
+            # Partial counts per batch, groupby merges them with count_merge.
+            combiner_conf=[["store_id", "user_id"], [[COMBINE_COUNT, "purchase_count"]]],
         ),
         ALL_FOR_TRANSACTIONS,
         QUERY_4
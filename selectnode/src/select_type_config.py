@@ -5,6 +5,7 @@ from common.config.base_type_config import (
     BaseTypeConfiguration,
 )
 from common.config.row_filtering import build_filter_from_config,load_all_filters, should_keep
+from common.config.row_combining import RowCombiner
 
 
 class SelectTypeConfiguration(BaseDictTypeConfiguration):
@@ -12,10 +13,12 @@ class SelectTypeConfiguration(BaseDictTypeConfiguration):
     # def __init__(self, out_middleware, builder_creator, in_fields_count):
     # def __init__(self, out_middleware, builder_creator, in_fields, out_conf = None):
     def __init__(
-        self, out_middleware, builder_creator, in_fields, filters_conf, out_conf=None
+        self, out_middleware, builder_creator, in_fields, filters_conf, out_conf=None, combiner_conf=None
     ):
         super().__init__(out_middleware, builder_creator, in_fields, out_conf)
         self.row_filter = build_filter_from_config(filters_conf) 
+        # Optional pre aggregation of each batch, out cols should be the combiner key and aggregated cols.
+        self.combiner = None if combiner_conf == None else RowCombiner(combiner_conf)
         #self.filters = load_all_filters(filters_conf)
 
     def should_keep(self, row):
@@ -31,3 +34,22 @@ class SelectTypeConfiguration(BaseDictTypeConfiguration):
 
         except Exception as e:
             logging.error(f"Failed filter map of row {row} invalid {e}")
+
+    def new_partials(self):
+        if self.combiner == None:
+            return None
+        return self.combiner.new_partials()
+
+    def filter_combine(self, row, partials):
+        try:
+            row = self.mapper.map_input(row)
+
+            if self.row_filter.should_keep(row):
+                self.combiner.add(partials, self.mapper.map(row))
+
+        except Exception as e:
+            logging.error(f"Failed filter combine of row {row} invalid {e}")
+
+    def add_partials(self, partials, msg_builder):
+        for row in self.combiner.iterate_rows(partials):
+            msg_builder.add_row(self.mapper.project_out(row))
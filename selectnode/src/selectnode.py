@@ -1,16 +1,23 @@
 # from .type_config import TypeConfiguration
 import logging
 from middleware.routing.query_types import *
+from middleware.routing.columnar_message import deserialize_with
 
 class TypeHandler:
     def __init__(self, type_conf, msg_builder):
         self.type_conf = type_conf
         self.msg_builder = msg_builder
+        self.partials = type_conf.new_partials() # None If the type has no combiner
     
     def check(self, row):
-        self.type_conf.filter_map(row, self.msg_builder)
+        if self.partials == None:
+            self.type_conf.filter_map(row, self.msg_builder)
+        else:
+            self.type_conf.filter_combine(row, self.partials)
     
     def send_built(self):
+        if self.partials != None:
+            self.type_conf.add_partials(self.partials, self.msg_builder)
         #logging.info(f"----------> {self.msg_builder.headers.types} message sent len:{self.msg_builder.len_payload()}")
         self.type_conf.send(self.msg_builder)
 
@@ -27,7 +34,7 @@ class SelectNode:
             self.type_expander.propagate_signal_in(headers)
             return False
             
-        msg = self.payload_deserializer(msg)
+        msg = deserialize_with(headers, msg, self.payload_deserializer)
         outputs = []
         for type_header in headers.split():
             for config in self.type_expander.get_configurations_for(type_header.types[0]):
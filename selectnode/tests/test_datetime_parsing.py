@@ -0,0 +1,40 @@
+import unittest
+from datetime import datetime
+
+from common.models.datetime_parsing import *
+from common.models.transaction import Transaction
+from common.models.transactionitem import TransactionItem
+
+
+class TestDatetimeParsing(unittest.TestCase):
+
+    def test_fixed_format_same_as_strptime(self):
+        values = ["2025-01-01 12:52:56", "2024-12-31 00:00:00", "2024-02-29 23:59:59", "2023-10-09 07:05:01"]
+        for value in values:
+            expected = datetime.strptime(value, DATETIME_FORMAT)
+            self.assertEqual(parse_datetime(value), expected)
+            self.assertEqual(parse_datetime(value.encode()), expected)
+            self.assertEqual(parse_year_month_hour(value.encode()),
+                (str(expected.year).encode(), str(expected.month).encode(), str(expected.hour).encode()))
+
+    def test_other_layouts_fallback_or_fail(self):
+        # Single digit fields are accepted by strptime, not by the fixed offsets.
+        self.assertEqual(parse_year_month_hour(b"2025-1-1 7:52:56"), (b"2025", b"1", b"7"))
+        self.assertEqual(parse_datetime(" 2025-01-01 12:52:56 "), datetime(2025, 1, 1, 12, 52, 56))
+
+        for value in [b"2023-02-29 10:00:00", b"2025-13-01 10:00:00", b"2025-01-01 24:00:00",
+                b"2025-01-01 12:60:00", b"2025/01/01 12:00:00", b"", b"2025-01-00 12:00:00", b"abcd-01-01 12:00:00"]:
+            with self.assertRaises(ValueError):
+                parse_year_month_hour(value)
+            with self.assertRaises(ValueError):
+                parse_datetime(value)
+
+    def test_models_parse_row(self):
+        row = Transaction.parse_row(b"86652dc6-f350-4aeb-8e41-ce3a94d27825,10,3,,13060.0,9.5,0.0,9.5,2025-01-01 07:52:56\n")
+        self.assertEqual(row, [b"86652dc6-f350-4aeb-8e41-ce3a94d27825", b"2025", b"10", b"13060", b"1", b"7", b"9.5"])
+
+        row = TransactionItem.parse_row(b"79e08e8a-488b-4b27-bf33-7095ddd52b29,6,3,9.5,28.5,2024-11-01 12:20:53")
+        self.assertEqual(row, [b"6", b"2024", b"11", b"28.5", b"3"])
+
+        item = TransactionItem.from_bytes_and_project(b"79e08e8a-488b-4b27-bf33-7095ddd52b29,6,3,9.5,28.5,2024-11-01 12:20:53")
+        self.assertEqual(item.created_at, datetime(2024, 11, 1, 12, 20, 53))
@@ -0,0 +1,95 @@
+import unittest
+
+from common.models.menuitem import MenuItem
+from common.models.model import Model
+from common.models.store import Store
+from common.models.transaction import Transaction
+from common.models.transactionitem import TransactionItem
+from common.models.user import User
+
+
+def parse_by_line(model, data):
+    rows = [b",".join(model.parse_row(line)) for line in data.split(b"\n") if line != b""]
+    return b"\n".join(rows), len(rows)
+
+
+class TestModelBatchParsing(unittest.TestCase):
+
+    def assert_same_as_by_line(self, model, data):
+        self.assertEqual(model.parse_batch(data), parse_by_line(model, data))
+
+    def test_transactions(self):
+        self.assert_same_as_by_line(Transaction, b"\n".join([
+            b"86652dc6-f350,10,3,,13060.0,9.5,0.0,9.5,2025-01-01 12:52:56",
+            b"86652dc6-f351,2,3,,,9.5,0.0,19.5,2024-02-29 00:02:56",
+            b"86652dc6-f352 ,2,3,,007,9.5,0.0,19.5,2024-12-31 23:02:56\r",
+            b"86652dc6-f353,2,3,,0.0,9.5,0.0,19.5,2024-04-30 09:02:56",
+        ]))
+        # Not matched by the pattern, parsed by line
+        self.assert_same_as_by_line(Transaction, b" 86652dc6-f350,10,3,,1e3,9.5,0.0,9.5,2025-1-1 12:52:56\n\n"
+            b"86652dc6-f351,10,3,,5,9.5,0.0,9.5,2025-01-01 12:52:56")
+
+        self.assertEqual(Transaction.parse_batch(b""), (b"", 0))
+        with self.assertRaises(ValueError):
+            Transaction.parse_batch(b"86652dc6-f350,10,3,,13060.0,9.5,0.0,9.5,2023-02-29 12:52:56")
+        # Days out of range are not matched, parse_row rejects them as before
+        for day in [b"00", b"32"]:
+            with self.assertRaises(ValueError):
+                Transaction.parse_batch(b"86652dc6-f350,10,3,,13060.0,9.5,0.0,9.5,2025-01-01 12:52:56\n"
+                    b"86652dc6-f351,10,3,,13060.0,9.5,0.0,9.5,2024-01-" + day + b" 10:00:00")
+
+    def test_transaction_items(self):
+        self.assert_same_as_by_line(TransactionItem, b"\n".join([
+            b"79e08e8a-488b,6,3,9.5,28.5,2025-01-01 12:20:53",
+            b"79e08e8a-488c,7,1,9.5,9.5,2024-10-31 02:20:53",
+        ]))
+        self.assert_same_as_by_line(TransactionItem, b"79e08e8a-488b,6,3,9.5,28.5,2025-06-30 12:20:53\n")
+        for day in [b"00", b"32"]:
+            with self.assertRaises(ValueError):
+                TransactionItem.parse_batch(b"79e08e8a-488b,6,3,9.5,28.5,2024-01-" + day + b" 10:00:00")
+
+    def test_dimension_tables(self):
+        self.assert_same_as_by_line(MenuItem, b"1,Espresso,coffee,6.0,,,\n2,Americano ,coffee,7.0,,,\n3,Flat white")
+        self.assert_same_as_by_line(Store, b"1,G Coffee @ USJ 89q,Jalan Dewan Bahasa 5/9,47610,USJ 89q,Selangor,3.1,101.5\n2,G Coffee @ Kondominium\r")
+        self.assert_same_as_by_line(User, b"1127889,male,1971-03-18,2025-01-01 07:31:48\n1127890,female,1980-01-01\r")
+
+    def test_projected_files(self):
+        header = Transaction._ORIGINAL_HEADER.encode()
+        rows = b"86652dc6-f350,10,3,,13060.0,9.5,0.0,9.5,2025-01-01 12:52:56\n86652dc6-f351,2,3,,,9.5,0.0,19.5,2024-02-29 00:02:56\n"
+        first = Transaction.project_batch(header + b"\n" + rows)
+        projected_header, _, payload = first.partition(b"\n")
+
+        self.assertIs(Model.projected_model_for(projected_header), Transaction)
+        self.assertIsNone(Model.projected_model_for(header))
+        self.assertEqual(payload, Transaction.parse_batch(rows.strip())[0] + b"\n")
+        # Later chunks have no header
+        self.assertEqual(Transaction.project_batch(rows), payload)
+        self.assertEqual(Transaction.project_batch(b"\n"), b"")
+
+        projections = Model.projections()
+        for model in (Transaction, TransactionItem, MenuItem, Store, User):
+            self.assertEqual(projections[model._ORIGINAL_HEADER], model._PROJECTED_HEADER)
+            self.assertEqual(len(model._PROJECTED_HEADER.split(",")), len(model.parse_row(
+                b"1,2,3,,5,6,7,8,2025-01-01 12:52:56" if model is Transaction else b"1,2,3,4,5,2025-01-01 12:52:56")))
+
+    def test_projected_rows_validated(self):
+        rows = b"86652dc6-f350,10,3,,13060.0,9.5,0.0,9.5,2025-01-01 12:52:56\n86652dc6-f351,2,3,,,9.5,0.0,19.5,2024-02-29 00:02:56\n"
+        payload = Transaction.project_batch(rows).strip(b"\n")
+        self.assertEqual(Transaction.count_projected_rows(payload), 2)
+        self.assertEqual(MenuItem.count_projected_rows(b"1,Espresso\n2,Americano "), 2)
+
+        for malformed in [
+            payload + b"\n86652dc6-f352,2025,3,,1,12", # Missing column
+            payload + b"\n86652dc6-f352,2025,3,,1,12,9.5,extra",
+            payload + b"\n\n" + payload, # Empty row
+            b"86652dc6-f352,25,3,,1,12,9.5", # Year
+            b"86652dc6-f352,2025,3,,13,12,9.5", # Month
+            b"86652dc6-f352,2025,3,,01,12,9.5", # Zero padded month, parse_row never sends it
+            b"86652dc6-f352,2025,3,,1,x,9.5", # Hour
+        ]:
+            with self.assertRaises(ValueError):
+                Transaction.count_projected_rows(malformed)
+        with self.assertRaises(ValueError):
+            TransactionItem.count_projected_rows(b"6,2025,0,28.5,3")
+        with self.assertRaises(ValueError):
+            MenuItem.count_projected_rows(b"1,Espresso,coffee")
@@ -4,6 +4,7 @@ from middleware.mocks.middleware import *
 
 from common.config.row_filtering import *
 from common.config.row_mapping import *
+from common.config.row_combining import *
 from common.config.type_expander import *
 from selectnode.src.select_type_config import *
 from selectnode.src.selectnode import *
@@ -594,6 +595,83 @@ class TestSelectNode(unittest.TestCase):
             ind += 1
 
 
+
+    def test_query_4_selectnode_with_combiner_sends_partial_counts(self):
+        in_cols = ["transaction_id", "store_id", "user_id", "year"]
+        out_cols = ["store_id", "user_id", "purchase_count"]
+
+        result_grouper = MockMiddleware()
+        type_conf = SelectTypeConfiguration(
+            result_grouper,
+            BareMockMessageBuilder,
+            in_fields=in_cols,
+            filters_conf=[["year", EQUALS_ANY, ["2024", "2025"]]],
+            out_conf={ROW_CONFIG_OUT_COLS: out_cols},
+            combiner_conf=[["store_id", "user_id"], [[COMBINE_COUNT, "purchase_count"]]],
+        )
+
+        in_middle = MockMiddleware()
+        type_exp = TypeExpander()
+        type_exp.add_configurations("t1", type_conf)
+
+        node = SelectNode(in_middle, MockMessage, type_exp)
+        node.start_single()
+
+        rows = [
+            ["tr1", "str1", "us1", "2024"],
+            ["tr2", "str1", "us1", "2025"],
+            ["tr3", "str2", "us1", "2025"],
+            ["tr4", "str1", "us1", "2023"],  # Filtered out
+            ["tr5", "str1", "us2", "2024"],
+        ]
+        message = BareMockMessageBuilder.for_payload(["query_3323"], ["t1"], rows, lambda r: r)
+        in_middle.push_msg(message)
+
+        self.assertEqual(len(result_grouper.msgs), 1)
+        self.assertEqual(result_grouper.msgs[0].payload, [
+            ["str1", "us1", "2"],
+            ["str2", "us1", "1"],
+            ["str1", "us2", "1"],
+        ])
+
+    def test_query_3_selectnode_with_combiner_sends_partial_sums(self):
+        in_cols = ["transaction_id", "store_id", "year", "month", "revenue"]
+        out_cols = ["store_id", "mapped_semester", "revenue"]
+
+        result_grouper = MockMiddleware()
+        type_conf = SelectTypeConfiguration(
+            result_grouper,
+            BareMockMessageBuilder,
+            in_fields=in_cols,
+            filters_conf=[["year", EQUALS_ANY, ["2024", "2025"]]],
+            out_conf={
+                ROW_CONFIG_ACTIONS: [[MAP_SEMESTER, {"init_year": 2024, "col_year": "year", "col_month": "month", "col_out": "mapped_semester"}]],
+                ROW_CONFIG_OUT_COLS: out_cols,
+            },
+            combiner_conf=[["store_id", "mapped_semester"], [[COMBINE_SUM, "revenue"]]],
+        )
+
+        in_middle = MockMiddleware()
+        type_exp = TypeExpander()
+        type_exp.add_configurations("t1", type_conf)
+
+        node = SelectNode(in_middle, MockMessage, type_exp)
+        node.start_single()
+
+        rows = [
+            ["tr1", "str1", "2024", "1", "10.5"],
+            ["tr2", "str1", "2024", "6", "4.5"],
+            ["tr3", "str1", "2024", "7", "3"],
+        ]
+        message = BareMockMessageBuilder.for_payload(["query_3323"], ["t1"], rows, lambda r: r)
+        in_middle.push_msg(message)
+
+        self.assertEqual(result_grouper.msgs[0].payload, [
+            ["str1", "0", "15.0"],
+            ["str1", "1", "3.0"],
+        ])
+
+
 """
     def test_multiquery_selectnode(self):
         in_fields = ["year", "hour", "sum"]
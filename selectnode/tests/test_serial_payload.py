@@ -1,7 +1,10 @@
 import unittest
+from zlib import crc32
 
 from middleware.routing.csv_message import *
 from middleware.routing.header_fields import *
+from middleware.routing.partitioning import *
+from middleware.routing.columnar_message import *
 
 from common.config.row_filtering import *
 
@@ -63,3 +66,132 @@ class TestSerialPayload(unittest.TestCase):
 
         for i in range(len(rows_pass)):
             self.assertTrue(rows_pass[i] == res[i])
+
+    def test_key_partitioned_message_splits_by_key_and_fans_out_eof(self):
+        msg_build = ColumnarKeyPartitionedMessageBuilder(BaseHeaders(["client_1"], ["t1"]), "client_1", [0, 1], "ssd")
+
+        rows = [["str1", "0", 10.0], ["str2", "1", 5.0], ["str1", "0", 3.0], ["str3", "2", 1.0], ["str2", "0", 7.0]]
+        for row in rows:
+            msg_build.add_row(row)
+
+        parts = msg_build.split_in(3)
+        self.assertEqual([ind for ind, _ in parts], [0, 1, 2]) # One message per node, even If empty
+
+        # Every row sent once, same key always on the same partition.
+        got = []
+        key_partition = {}
+        for ind, part in parts:
+            self.assertFalse(part.is_eof())
+            self.assertEqual(part.headers.to_dict(), msg_build.headers.to_dict())
+            for row in ColumnarMessage(part.serialize_payload(), "ssd").stream_rows() if part.has_payload() else []:
+                got.append(row)
+                self.assertEqual(key_partition.setdefault((row[0], row[1]), ind), ind)
+        self.assertEqual(sorted(got), sorted(rows))
+
+        eof = msg_build.clone()
+        eof.set_as_eof(4)
+        eof_parts = eof.split_in(3)
+        self.assertEqual(len(eof_parts), 3)
+        for ind, part in eof_parts:
+            self.assertTrue(part.is_eof())
+            self.assertEqual(part.headers.msg_count, 4)
+
+    def test_hashed_message_is_not_split(self):
+        msg_build = CSVHashedMessageBuilder(BaseHeaders(["client_1"], ["t1"]), "client_1")
+        msg_build.add_row(["a", "b"])
+        parts = msg_build.split_in(3)
+        self.assertEqual(parts, [(msg_build.hash_in(3), msg_build)])
+
+    def test_partition_is_stable_and_in_range(self):
+        keys = [f"client_{i}" for i in range(500)]
+        for key in keys:
+            ind = partition_for(key, 7)
+            self.assertTrue(0 <= ind < 7)
+            self.assertEqual(ind, jump_hash(stable_hash(key), 7))
+            self.assertEqual(partition_for(key, 1), 0)
+
+        builder = CSVHashedMessageBuilder(BaseHeaders(["client_1"], ["t1"]), "client_1")
+        self.assertEqual(builder.hash_in(7), partition_for("client_1", 7))
+
+    def test_partition_adding_a_node_moves_few_keys(self):
+        keys = [f"client_{i}" for i in range(1000)]
+        moved = 0
+        for key in keys:
+            before = partition_for(key, 4)
+            after = partition_for(key, 5)
+            if before != after:
+                self.assertEqual(after, 4) # Keys only move to the new node
+                moved += 1
+        # Around 1/5 of the keys should move, a modulo hash moves around 4/5.
+        self.assertTrue(100 < moved < 300)
+
+    def test_serial_deserial_columnar_message(self):
+        msg_build = ColumnarHashedMessageBuilder(BaseHeaders(["client_1"], ["t1"]), "client_1", "sqd")
+        rows = [["str1", 2024, 10.5], ["", "7", "3.25"], ["año,\n", -1, 0.0]]
+        for row in rows:
+            msg_build.add_row(row)
+
+        headers = BaseHeaders.from_headers(msg_build.get_headers())
+        self.assertEqual(headers.schema, "sqd")
+
+        res = list(deserialize_with(headers, msg_build.serialize_payload(), CSVMessage).stream_rows())
+        self.assertEqual(res, [["str1", 2024, 10.5], ["", 7, 3.25], ["año,\n", -1, 0.0]])
+
+        # Eof has no payload, csv headers keep using the default deserializer.
+        msg_build.set_as_eof(1)
+        self.assertEqual(msg_build.serialize_payload(), b"")
+        csv_build = CSVMessageBuilder(headers.clone())
+        self.assertEqual(csv_build.headers.schema, None)
+        csv_build.add_row(["a", "1"])
+        self.assertFalse(FIELD_PAYLOAD_SCHEMA in csv_build.get_headers())
+        res = list(deserialize_with(csv_build.headers, csv_build.serialize_payload(), CSVMessage).stream_rows())
+        self.assertEqual(res, [["a", "1"]])
+
+    def test_columnar_key_partitioned_by_key_csv_text(self):
+        # Same node for a key whatever the payload format, the key is hashed as its csv text.
+        rows = [["str1", "0", 10.0], ["str2", "1", 5.0], ["str1", "0", 3.0], ["str3", "2", 1.0]]
+        columnar = ColumnarKeyPartitionedMessageBuilder(BaseHeaders(["client_1"], ["t1"]), "client_1", [0, 1], "ssd")
+        for row in rows:
+            columnar.add_row(row)
+
+        for ind, part in columnar.split_in(3):
+            got = list(ColumnarMessage(part.serialize_payload(), "ssd").stream_rows()) if part.has_payload() else []
+            self.assertEqual(got, [row for row in rows if crc32(f"{row[0]},{row[1]}".encode()) % 3 == ind])
+
+    def test_builders_keep_input_headers(self):
+        columnar_headers = BaseHeaders(["client_1"], ["t1"], schema="sqd")
+        csv_build = CSVMessageBuilder(columnar_headers)
+        self.assertEqual(columnar_headers.schema, "sqd")
+        self.assertEqual(csv_build.headers.schema, None)
+
+        csv_headers = BaseHeaders(["client_1"], ["t1"])
+        columnar = ColumnarHashedMessageBuilder(csv_headers, "client_1", "ssd")
+        self.assertEqual(csv_headers.schema, None)
+        self.assertEqual(columnar.headers.schema, "ssd")
+        self.assertEqual(columnar.clone().headers.schema, "ssd")
+
+    def test_bytes_builder_matches_csv_builder(self):
+        rows = [[b"tr_1", b"2024", b"st_1", b"", b"1", b"13", b"88.5"], [b"tr_2", b"2025", b"st_2", b"u_2", b"3", b"7", b"10"]]
+        csv_build = CSVMessageBuilder(BaseHeaders(["client_1"], ["t1"]))
+        bytes_build = CSVBytesMessageBuilder.with_credentials(["client_1"], ["t1"])
+        hashed_build = CSVBytesHashedMessageBuilder.with_credentials(["client_1"], ["t1"], "client_1")
+        self.assertFalse(bytes_build.has_payload())
+        for row in rows:
+            csv_build.add_row_bytes(row)
+            bytes_build.add_row_bytes(row)
+            hashed_build.add_row_bytes(row)
+        bytes_build.add_row(["tr_3", 2024])
+        csv_build.add_row(["tr_3", 2024])
+
+        self.assertEqual(bytes_build.len_payload(), 3)
+        self.assertEqual(bytes_build.serialize_payload(), csv_build.serialize_payload())
+        self.assertEqual(list(CSVMessage(hashed_build.serialize_payload()).stream_rows()),
+            [[value.decode() for value in row] for row in rows])
+        self.assertEqual(hashed_build.split_in(3), [(partition_for("client_1", 3), hashed_build)])
+
+        eof = bytes_build.clone()
+        eof.set_as_eof(1)
+        self.assertEqual(eof.serialize_payload(), b"")
+        bytes_build.clear_payload()
+        self.assertFalse(bytes_build.has_payload())
+        self.assertEqual(bytes_build.serialize_payload(), b"")